@@ -1,20 +1,30 @@
 from django.contrib import admin
-from .models import Author, Genre, Book, BookInstance, Language
+from .models import Author, Genre, Book, BookInstance, Language, PageVisits, Hold
+from .aggregates import JSONGroupArray
+from .pagination import EstimatedCountPaginator
 
-admin.site.register(Language)
-admin.site.register(Genre)
+@admin.register(Language)
+class LanguageAdmin(admin.ModelAdmin):
+    search_fields = ['name']
+
+@admin.register(Genre)
+class GenreAdmin(admin.ModelAdmin):
+    search_fields = ['name']
 
 class BooksInstanceInline(admin.TabularInline):
     model = BookInstance
     extra = 0
+    autocomplete_fields = ['borrower']
 
 class BookInline(admin.TabularInline):
     model = Book
     extra = 0
+    autocomplete_fields = ['genre', 'language']
 
 class AuthorAdmin(admin.ModelAdmin):
     list_display = ('last_name', 'first_name', 'date_of_birth', 'date_of_death')
     fields = ['first_name', 'last_name', ('date_of_birth', 'date_of_death')]
+    search_fields = ['last_name', 'first_name']
     inlines = [BookInline]
 
 admin.site.register(Author, AuthorAdmin)
@@ -22,12 +32,26 @@ admin.site.register(Author, AuthorAdmin)
 @admin.register(Book)
 class BookAdmin(admin.ModelAdmin):
     list_display = ('title', 'author', 'display_genre')
+    list_select_related = ('author',)
+    search_fields = ['title', 'isbn']
+    autocomplete_fields = ['author', 'genre', 'language']
     inlines = [BooksInstanceInline]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(genre_names=JSONGroupArray('genre__name'))
+
+    @admin.display(description='Genre')
+    def display_genre(self, obj):
+        return ', '.join([name for name in obj.genre_names or [] if name is not None][:3])
+
 @admin.register(BookInstance)
 class BookInstanceAdmin(admin.ModelAdmin):
     list_display = ('book', 'status', 'borrower', 'due_back', 'id')
     list_filter = ('status', 'due_back')
+    list_select_related = ('book', 'borrower')
+    autocomplete_fields = ['book', 'borrower']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     fieldsets = (
         (None, {
@@ -36,4 +60,18 @@ class BookInstanceAdmin(admin.ModelAdmin):
         ('Availability', {
             'fields': ('status', 'due_back', 'borrower')
         }),
-    )
\ No newline at end of file
+    )
+
+@admin.register(PageVisits)
+class PageVisitsAdmin(admin.ModelAdmin):
+    list_display = ('page', 'date', 'count')
+    list_filter = ('page',)
+    date_hierarchy = 'date'
+
+@admin.register(Hold)
+class HoldAdmin(admin.ModelAdmin):
+    list_display = ('book', 'patron', 'status', 'placed', 'ready')
+    list_filter = ('status',)
+    list_select_related = ('book', 'patron')
+    autocomplete_fields = ['book', 'patron']
+    raw_id_fields = ['copy']
@@ -0,0 +1,15 @@
+from django.db.models import Aggregate, JSONField
+
+
+class JSONGroupArray(Aggregate):
+    """Collect the grouped values into a JSON array (JSON_GROUP_ARRAY / JSON_AGG).
+
+    Values come back intact whatever separators they contain; rows without
+    a match add a null.
+    """
+
+    function = 'JSON_GROUP_ARRAY'
+    output_field = JSONField()
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, function='JSON_AGG', **extra_context)
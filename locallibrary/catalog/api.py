@@ -0,0 +1,323 @@
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Prefetch, ProtectedError, RestrictedError
+from django.forms.models import model_to_dict, modelform_factory
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.gzip import gzip_page
+
+from .models import Author, Book, BookInstance, Genre, Language
+from .pagination import CursorPaginator
+
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
+API_MAX_IDS = 200
+COMPACT_JSON = {'separators': (',', ':')}
+
+
+class ApiField:
+    """One output field, with the columns and relations it reads.
+
+    Querysets are built from the fields a request asks for, so every
+    response costs a fixed number of queries whatever the page size.
+    """
+
+    def __init__(self, get, only=(), select_related=(), prefetch_related=(), permission=None):
+        self.get = get
+        self.only = only
+        self.select_related = select_related
+        self.prefetch_related = prefetch_related
+        self.permission = permission
+
+
+def column(name, permission=None):
+    return ApiField(lambda obj: getattr(obj, name), only=(name,), permission=permission)
+
+
+def foreign_key(name, permission=None):
+    return ApiField(lambda obj: getattr(obj, name + '_id'), only=(name,), permission=permission)
+
+
+def related(name, attr, permission=None):
+    def get(obj):
+        target = getattr(obj, name)
+        return None if target is None else getattr(target, attr)
+    return ApiField(get, only=(name, f'{name}__{attr}'), select_related=(name,), permission=permission)
+
+
+def related_ids(name, prefetch):
+    return ApiField(lambda obj: [item.pk for item in getattr(obj, name).all()], prefetch_related=(prefetch,))
+
+
+def url():
+    return ApiField(lambda obj: obj.get_absolute_url())
+
+
+class Resource:
+    model = None
+    fields = {}
+    create_fields = []
+    update_fields = []
+
+    def visible_fields(self, user):
+        return [name for name, field in self.fields.items()
+                if field.permission is None or user.has_perm(field.permission)]
+
+    def queryset(self, fields):
+        only = {'pk'}
+        select_related = set()
+        prefetch_related = []
+        for name in fields:
+            field = self.fields[name]
+            only.update(field.only)
+            select_related.update(field.select_related)
+            for lookup in field.prefetch_related:
+                if lookup not in prefetch_related:
+                    prefetch_related.append(lookup)
+
+        # The cursor paginator reads the ordering field from every page.
+        only.update(ordering.lstrip('-') for ordering in self.model._meta.ordering)
+        only.discard('pk')
+        queryset = self.model.objects.only(self.model._meta.pk.name, *only)
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        return queryset
+
+    def serialize(self, obj, fields):
+        return {name: self.fields[name].get(obj) for name in fields}
+
+
+class BookResource(Resource):
+    model = Book
+    fields = {
+        'id': column('id'),
+        'title': column('title'),
+        'author': foreign_key('author'),
+        'author_name': ApiField(lambda obj: str(obj.author) if obj.author else None,
+                                only=('author', 'author__first_name', 'author__last_name'),
+                                select_related=('author',)),
+        'summary': column('summary'),
+        'isbn': column('isbn'),
+        'language': foreign_key('language'),
+        'language_name': related('language', 'name'),
+        'genre': related_ids('genre', Prefetch('genre', queryset=Genre.objects.only('id'))),
+        'copies_total': column('copies_total'),
+        'copies_available': column('copies_available'),
+        'copies_on_loan': column('copies_on_loan'),
+        'url': url(),
+        'modified': column('modified'),
+    }
+    create_fields = update_fields = ['title', 'author', 'summary', 'isbn', 'genre', 'language']
+
+
+class AuthorResource(Resource):
+    model = Author
+    fields = {
+        'id': column('id'),
+        'first_name': column('first_name'),
+        'last_name': column('last_name'),
+        'date_of_birth': column('date_of_birth'),
+        'date_of_death': column('date_of_death'),
+        'books': related_ids('book_set', Prefetch('book_set', queryset=Book.objects.only('id', 'author_id'))),
+        'url': url(),
+        'modified': column('modified'),
+    }
+    create_fields = update_fields = ['first_name', 'last_name', 'date_of_birth', 'date_of_death']
+
+
+class GenreResource(Resource):
+    model = Genre
+    fields = {
+        'id': column('id'),
+        'name': column('name'),
+        'url': url(),
+        'modified': column('modified'),
+    }
+    create_fields = update_fields = ['name']
+
+
+class LanguageResource(GenreResource):
+    model = Language
+
+
+class BookInstanceResource(Resource):
+    model = BookInstance
+    fields = {
+        'id': column('id'),
+        'book': foreign_key('book'),
+        'book_title': related('book', 'title'),
+        'imprint': column('imprint'),
+        'status': column('status'),
+        'due_back': column('due_back'),
+        'borrower': foreign_key('borrower', permission='catalog.can_mark_returned'),
+        'borrower_username': related('borrower', 'username', permission='catalog.can_mark_returned'),
+        'url': url(),
+        'modified': column('modified'),
+    }
+    create_fields = ['book', 'imprint', 'due_back', 'borrower', 'status']
+    update_fields = ['imprint', 'due_back', 'borrower', 'status']
+
+
+API_RESOURCES = {
+    'books': BookResource(),
+    'authors': AuthorResource(),
+    'genres': GenreResource(),
+    'languages': LanguageResource(),
+    'bookinstances': BookInstanceResource(),
+}
+
+
+class ApiError(Exception):
+    def __init__(self, status, errors):
+        super().__init__(errors)
+        self.status = status
+        self.errors = errors
+
+
+def _json(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params=COMPACT_JSON)
+
+
+def _get_resource(name):
+    if name not in API_RESOURCES:
+        raise ApiError(404, {'__all__': [f'Unknown resource: {name}']})
+    return API_RESOURCES[name]
+
+
+def _requested_fields(request, resource):
+    visible = resource.visible_fields(request.user)
+    if not request.GET.get('fields'):
+        return visible
+    fields = [name.strip() for name in request.GET['fields'].split(',') if name.strip()]
+    unknown = [name for name in fields if name not in visible]
+    if unknown:
+        raise ApiError(400, {'fields': [f'Unknown field: {name}' for name in unknown]})
+    return fields
+
+
+def _parse_pk(resource, value):
+    try:
+        return resource.model._meta.pk.to_python(value)
+    except ValidationError:
+        return None
+
+
+def _require(request, resource, action):
+    if not request.user.has_perm(f'catalog.{action}_{resource.model._meta.model_name}'):
+        raise ApiError(403, {'__all__': ['Permission denied']})
+
+
+def _body(request):
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        raise ApiError(400, {'__all__': ['Invalid JSON']})
+    if not isinstance(data, dict):
+        raise ApiError(400, {'__all__': ['Expected a JSON object']})
+    return data
+
+
+def _page_size(request):
+    try:
+        limit = int(request.GET.get('limit', API_PAGE_SIZE))
+    except ValueError:
+        raise ApiError(400, {'limit': ['Expected an integer']})
+    return max(1, min(limit, API_MAX_PAGE_SIZE))
+
+
+def _page_url(request, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params['cursor'] = cursor
+    return request.build_absolute_uri('?' + params.urlencode())
+
+
+def _list(request, resource):
+    fields = _requested_fields(request, resource)
+    queryset = resource.queryset(fields)
+
+    if 'ids' in request.GET:
+        ids = [value for value in request.GET['ids'].split(',') if value]
+        if len(ids) > API_MAX_IDS:
+            raise ApiError(400, {'ids': [f'At most {API_MAX_IDS} ids per request']})
+        pks = [pk for pk in (_parse_pk(resource, value) for value in ids) if pk is not None]
+        objects = queryset.in_bulk(pks)
+        return _json({'results': [resource.serialize(objects[pk], fields) for pk in pks if pk in objects]})
+
+    paginator = CursorPaginator(queryset, _page_size(request))
+    page = paginator.page(request.GET.get('cursor'))
+    return _json({
+        'results': [resource.serialize(obj, fields) for obj in page],
+        'next': _page_url(request, page.next_cursor),
+        'previous': _page_url(request, page.previous_cursor),
+    })
+
+
+def _save(request, resource, instance=None):
+    data = _body(request)
+    if instance is None:
+        _require(request, resource, 'add')
+        form_fields = resource.create_fields
+    else:
+        _require(request, resource, 'change')
+        form_fields = resource.update_fields
+        # PATCH semantics: unspecified fields keep their current values.
+        current = model_to_dict(instance, form_fields)
+        for name, value in current.items():
+            if isinstance(value, list):
+                current[name] = [item.pk for item in value]
+        data = {**current, **data}
+
+    form = modelform_factory(resource.model, fields=form_fields)(data, instance=instance)
+    if not form.is_valid():
+        raise ApiError(400, form.errors)
+    obj = form.save()
+
+    fields = resource.visible_fields(request.user)
+    obj = resource.queryset(fields).get(pk=obj.pk)
+    return _json(resource.serialize(obj, fields), status=201 if instance is None else 200)
+
+
+@gzip_page
+def api_collection(request, resource):
+    try:
+        resource = _get_resource(resource)
+        if request.method == 'GET':
+            return _list(request, resource)
+        if request.method == 'POST':
+            return _save(request, resource)
+        raise ApiError(405, {'__all__': [f'Method {request.method} not allowed']})
+    except ApiError as e:
+        return _json({'errors': e.errors}, status=e.status)
+
+
+@gzip_page
+def api_item(request, resource, pk):
+    try:
+        resource = _get_resource(resource)
+        pk = _parse_pk(resource, pk)
+        if request.method == 'GET':
+            fields = _requested_fields(request, resource)
+            obj = resource.queryset(fields).filter(pk=pk).first() if pk is not None else None
+        else:
+            obj = resource.model.objects.filter(pk=pk).first() if pk is not None else None
+        if obj is None:
+            raise ApiError(404, {'__all__': ['Not found']})
+
+        if request.method == 'GET':
+            return _json(resource.serialize(obj, fields))
+        if request.method == 'PATCH':
+            return _save(request, resource, obj)
+        if request.method == 'DELETE':
+            _require(request, resource, 'delete')
+            try:
+                obj.delete()
+            except (ProtectedError, RestrictedError):
+                raise ApiError(409, {'__all__': ['Object is still referenced']})
+            return HttpResponse(status=204)
+        raise ApiError(405, {'__all__': [f'Method {request.method} not allowed']})
+    except ApiError as e:
+        return _json({'errors': e.errors}, status=e.status)
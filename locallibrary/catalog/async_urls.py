@@ -0,0 +1,23 @@
+from django.urls import path
+
+from . import async_views
+from .urls import urlpatterns as sync_urlpatterns
+
+ASYNC_VIEWS = {
+    'index': async_views.index,
+    'books': async_views.book_list,
+    'book-detail': async_views.book_detail,
+    'authors': async_views.author_list,
+    'author-detail': async_views.author_detail,
+    'genres': async_views.genre_list,
+    'genre-detail': async_views.genre_detail,
+    'languages': async_views.language_list,
+    'language-detail': async_views.language_detail,
+    'bookinstances': async_views.bookinstance_list,
+}
+
+urlpatterns = [
+    path(str(pattern.pattern), ASYNC_VIEWS[pattern.name], name=pattern.name)
+    if pattern.name in ASYNC_VIEWS else pattern
+    for pattern in sync_urlpatterns
+]
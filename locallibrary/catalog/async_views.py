@@ -0,0 +1,151 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.core.paginator import InvalidPage, Paginator
+from django.db.models import aprefetch_related_objects
+from django.http import Http404
+from django.shortcuts import aget_object_or_404, render
+
+from .conditional import aconditional_get, book_state, books_state, table_state, dated
+from .models import Book, Author, Genre, Language
+from .pagination import CursorPaginator
+from .statistics import aget_library_stats
+from .visits import record_visit, visitor_visits, set_visitor_visits
+from . import views
+
+# The ORM work below runs through Django's async API; templates are still
+# rendered in a worker thread because context processors and {% perms %}
+# lookups are synchronous. The conditional GET validators match the sync views.
+arender = sync_to_async(render)
+
+
+async def _list_items(queryset):
+    return [obj async for obj in queryset]
+
+
+async def paginate(request, view_class, queryset):
+    # The same pagination as the sync view class, cursors included.
+    per_page = view_class.paginate_by
+    cursor_pagination = view_class.cursor_pagination or view_class.cursor_query_param in request.GET
+    if cursor_pagination:
+        paginator = CursorPaginator(queryset, per_page)
+        page = await paginator.apage(request.GET.get(view_class.cursor_query_param))
+    else:
+        paginator = Paginator(queryset, per_page)
+        paginator.count = await queryset.acount()
+
+        page_number = request.GET.get('page') or 1
+        if page_number == 'last':
+            page_number = paginator.num_pages
+        try:
+            page = paginator.page(page_number)
+        except InvalidPage as e:
+            raise Http404(str(e)) from e
+        page.object_list = await _list_items(page.object_list)
+
+    return {
+        'paginator': paginator,
+        'page_obj': page,
+        'is_paginated': page.has_other_pages(),
+        'object_list': page.object_list,
+        'cursor_pagination': cursor_pagination,
+    }
+
+
+async def render_list(request, view_class, template_name, context_object_name):
+    queryset = view_class().get_queryset()
+    context = await paginate(request, view_class, queryset)
+    context[context_object_name] = context['object_list']
+    return await arender(request, template_name, context)
+
+
+async def index(request):
+    search_for_book = 'book1'
+    search_for_genre = 'fantasy'
+
+    num_visits = visitor_visits(request)
+    stats, _ = await asyncio.gather(
+        aget_library_stats(search_for_book, search_for_genre),
+        sync_to_async(record_visit)('index'),
+    )
+
+    response = await arender(
+        request,
+        'index.html',
+        context={**stats, 'search_for_book':search_for_book,'search_for_genre':search_for_genre,
+                 'num_visits':num_visits},
+    )
+    set_visitor_visits(response, num_visits + 1)
+    return response
+
+
+@aconditional_get(table_state('book', 'author'))
+async def book_list(request):
+    return await render_list(request, views.BookListView, 'catalog/book_list.html', 'book_list')
+
+
+@aconditional_get(table_state('author'))
+async def author_list(request):
+    return await render_list(request, views.AuthorListView, 'catalog/author_list.html', 'author_list')
+
+
+@aconditional_get(table_state('genre'))
+async def genre_list(request):
+    return await render_list(request, views.GenreListView, 'catalog/genre_list.html', 'genre_list')
+
+
+@aconditional_get(table_state('language'))
+async def language_list(request):
+    return await render_list(request, views.LanguageListView, 'catalog/language_list.html', 'language_list')
+
+
+@aconditional_get(dated(table_state('bookinstance', 'book', 'user')))
+async def bookinstance_list(request):
+    return await render_list(request, views.BookInstanceListView, 'catalog/bookinstance_list.html', 'bookinstance_list')
+
+
+@aconditional_get(book_state)
+async def book_detail(request, pk):
+    book = await aget_object_or_404(Book.objects.select_related('author', 'language'), pk=pk)
+
+    copies = book.bookinstance_set.order_by('due_back', 'id')
+    summary, _ = await asyncio.gather(book.acopies_summary(), aprefetch_related_objects([book], 'genre'))
+    paginator = Paginator(copies, views.BookDetailView.copies_paginate_by)
+    paginator.count = summary['total']
+    copies_page = paginator.get_page(request.GET.get('copies_page'))
+    copies_page.object_list = await _list_items(copies_page.object_list)
+
+    return await arender(request, 'catalog/book_detail.html', {
+        'book': book, 'object': book,
+        'copies_summary': summary, 'copies': copies_page, 'copies_page': copies_page,
+    })
+
+
+@aconditional_get(books_state(Author, 'author'))
+async def author_detail(request, pk):
+    author = await aget_object_or_404(Author, pk=pk)
+    books = await _list_items(author.book_set.all())
+    return await arender(request, 'catalog/author_detail.html', {'author': author, 'object': author, 'books': books})
+
+
+async def books_page(request, view_class, obj):
+    books = view_class(object=obj).get_books()
+    paginator = Paginator(books, view_class.books_paginate_by)
+    paginator.count = await books.acount()
+    page = paginator.get_page(request.GET.get('books_page'))
+    page.object_list = await _list_items(page.object_list)
+    return {'books': page, 'books_page': page, 'has_books': paginator.count > 0}
+
+
+@aconditional_get(books_state(Genre, 'genre'))
+async def genre_detail(request, pk):
+    genre = await aget_object_or_404(Genre, pk=pk)
+    context = await books_page(request, views.GenreDetailView, genre)
+    return await arender(request, 'catalog/genre_detail.html', {'genre': genre, 'object': genre, **context})
+
+
+@aconditional_get(books_state(Language, 'language'))
+async def language_detail(request, pk):
+    language = await aget_object_or_404(Language, pk=pk)
+    context = await books_page(request, views.LanguageDetailView, language)
+    return await arender(request, 'catalog/language_detail.html', {'language': language, 'object': language, **context})
@@ -0,0 +1,259 @@
+import bisect
+import heapq
+import re
+import threading
+import time
+from array import array
+from itertools import accumulate, islice
+
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .fragments import model_version
+from .models import Author, Book, Genre, Language
+
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+LOAD_CHUNK_SIZE = 5000
+AUTOCOMPLETE_RELOAD_SECONDS = 15 * 60
+
+
+def normalize(text):
+    return ' '.join(re.findall(r'\w+', text.casefold()))
+
+
+class KeyTable:
+    """Sorted search keys packed into one UTF-8 buffer.
+
+    Key i is buffer[offsets[i]:offsets[i + 1]] and belongs to pks[i]. UTF-8
+    bytes sort in code point order, so the table can be bisected with an
+    encoded prefix.
+    """
+
+    def __init__(self, rows):
+        self.buffer = b''.join(key for key, _ in rows)
+        self.offsets = array('q', [0])
+        self.offsets.extend(accumulate(len(key) for key, _ in rows))
+        self.pks = array('q', (pk for _, pk in rows))
+
+    def __len__(self):
+        return len(self.pks)
+
+    def __getitem__(self, position):
+        return self.buffer[self.offsets[position]:self.offsets[position + 1]]
+
+    def rows(self, start=0):
+        for position in range(start, len(self)):
+            yield self[position], self.pks[position]
+
+
+class PrefixIndex:
+    """Sorted in-memory prefix index over the labels of one model.
+
+    Search keys live in a KeyTable, so a lookup is a binary search plus a
+    short scan and each key costs its UTF-8 length plus 16 bytes of
+    offset and pk. The field values of each row are kept in a dict and
+    labels are built on output.
+
+    Changes committed in this process go to a small sorted overlay, and the
+    table rows of changed pks are hidden, so a commit does not shift the
+    whole table; the overlay is merged back into a new table after
+    COMPACT_AFTER changes. Reloads are built outside the lock that searches
+    take and swapped in whole, so searches keep using the old index while
+    a reload runs.
+
+    The index loads on first use and follows this process's saves through
+    signals. Other workers' changes bump the model version counter in the
+    shared cache (see CACHES), which forces a reload. Writes that bypass
+    signals, such as queryset.update(), are picked up after
+    AUTOCOMPLETE_RELOAD_SECONDS at the latest.
+    """
+    model = None
+    fields = ()
+    version_name = None
+    permission = None
+
+    COMPACT_AFTER = 1000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._table = None
+        self._added = []
+        self._hidden = set()
+        self._entries = None
+        self._version = None
+        self._loaded_at = None
+
+    def label(self, *values):
+        return values[0]
+
+    def search_keys(self, *values):
+        return [self.label(*values)]
+
+    def _current_version(self):
+        return model_version(self.version_name)
+
+    def _search_keys(self, values):
+        return sorted({normalize(key).encode() for key in self.search_keys(*values)} - {b''})
+
+    def _is_fresh(self, version):
+        return (self._table is not None and self._version == version
+                and time.monotonic() - self._loaded_at < AUTOCOMPLETE_RELOAD_SECONDS)
+
+    def _ensure_loaded(self):
+        version = self._current_version()
+        if self._is_fresh(version):
+            return
+        with self._load_lock:
+            if self._is_fresh(version):
+                return
+            entries = {}
+            rows = []
+            for pk, *values in self.model.objects.values_list('pk', *self.fields).order_by().iterator(LOAD_CHUNK_SIZE):
+                entries[pk] = tuple(values)
+                rows.extend((key, pk) for key in self._search_keys(values))
+            rows.sort()
+            table = KeyTable(rows)
+            del rows
+            with self._lock:
+                self._table = table
+                self._added = []
+                self._hidden = set()
+                self._entries = entries
+                self._version = version
+                self._loaded_at = time.monotonic()
+
+    def _remove(self, pk):
+        values = self._entries.pop(pk, None)
+        self._hidden.add(pk)
+        for key in self._search_keys(values) if values is not None else ():
+            position = bisect.bisect_left(self._added, (key, pk))
+            if position < len(self._added) and self._added[position] == (key, pk):
+                del self._added[position]
+
+    def _insert(self, pk, values):
+        for key in self._search_keys(values):
+            bisect.insort(self._added, (key, pk))
+        self._entries[pk] = tuple(values)
+
+    def _rows(self, prefix=b''):
+        table_rows = (
+            (key, pk) for key, pk in self._table.rows(bisect.bisect_left(self._table, prefix))
+            if pk not in self._hidden
+        )
+        added_rows = islice(self._added, bisect.bisect_left(self._added, (prefix,)), None)
+        return heapq.merge(table_rows, added_rows)
+
+    def _compact(self):
+        self._table = KeyTable(list(self._rows()))
+        self._added = []
+        self._hidden = set()
+
+    def _apply(self, version, pk, values):
+        with self._lock:
+            if self._table is None or self._version is None:
+                return
+            if version != self._version + 1:
+                # Another process changed the table too; reload on next use.
+                self._version = None
+                return
+            self._version = version
+            if pk is not None:
+                self._remove(pk)
+                if values is not None:
+                    self._insert(pk, values)
+                if len(self._hidden) > self.COMPACT_AFTER:
+                    self._compact()
+
+    def changed(self, pk=None, values=None):
+        """Follow a change once its transaction commits.
+
+        Call right after bump_model_version(), whose commit callback then
+        runs first. `values` are the new `fields`, or None for a deleted
+        row; without `pk` only the version moves on.
+        """
+        transaction.on_commit(lambda: self._apply(self._current_version(), pk, values))
+
+    def search(self, query, limit=AUTOCOMPLETE_LIMIT):
+        prefix = normalize(query).encode()
+        if not prefix:
+            return []
+        self._ensure_loaded()
+        results = []
+        seen = set()
+        with self._lock:
+            for key, pk in self._rows(prefix):
+                if not key.startswith(prefix):
+                    break
+                if pk not in seen:
+                    seen.add(pk)
+                    results.append((pk, self.label(*self._entries[pk])))
+                    if len(results) == limit:
+                        break
+        return results
+
+    def labels(self, pks):
+        self._ensure_loaded()
+        with self._lock:
+            return {pk: self.label(*self._entries[pk]) for pk in pks if pk in self._entries}
+
+
+class AuthorIndex(PrefixIndex):
+    model = Author
+    fields = ('first_name', 'last_name')
+    version_name = 'author'
+
+    def label(self, first_name, last_name):
+        return f'{last_name}, {first_name}'
+
+    def search_keys(self, first_name, last_name):
+        return [f'{last_name} {first_name}', f'{first_name} {last_name}']
+
+
+class BookIndex(PrefixIndex):
+    model = Book
+    fields = ('title',)
+    version_name = 'book'
+
+
+class GenreIndex(PrefixIndex):
+    model = Genre
+    fields = ('name',)
+    version_name = 'genre'
+
+
+class LanguageIndex(PrefixIndex):
+    model = Language
+    fields = ('name',)
+    version_name = 'language'
+
+
+class BorrowerIndex(PrefixIndex):
+    model = User
+    fields = ('username', 'first_name', 'last_name')
+    version_name = 'user'
+    permission = 'catalog.can_mark_returned'
+
+    def label(self, username, first_name, last_name):
+        full_name = f'{first_name} {last_name}'.strip()
+        return f'{username} ({full_name})' if full_name else username
+
+    def search_keys(self, username, first_name, last_name):
+        return [username, f'{first_name} {last_name}', f'{last_name} {first_name}']
+
+
+AUTOCOMPLETE_INDEXES = {
+    'authors': AuthorIndex(),
+    'books': BookIndex(),
+    'genres': GenreIndex(),
+    'languages': LanguageIndex(),
+    'borrowers': BorrowerIndex(),
+}
+
+
+def index_for_model(model):
+    for index in AUTOCOMPLETE_INDEXES.values():
+        if index.model is model:
+            return index
+    return None
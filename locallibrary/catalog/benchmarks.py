@@ -0,0 +1,222 @@
+import datetime
+import random
+import statistics
+import time
+import tracemalloc
+
+from django.contrib import admin
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, reset_queries
+from django.conf import settings
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+
+from catalog import urls as catalog_urls
+from .counters import STATUS_COUNTERS
+from .models import Author, Book, BookInstance, Genre, Language
+from .search import rebuild_index
+from .statistics import invalidate_library_stats
+
+SEED_BATCH_SIZE = 5000
+BENCHMARK_PASSWORD = 'benchmark'
+
+# Views that only accept POST are left to the functional tests.
+SKIPPED_URLS = {'circulation-batch', 'book-hold', 'hold-cancel'}
+QUERY_STRINGS = {'autocomplete': '?q=last00001'}
+
+
+def _batches(objects, size=SEED_BATCH_SIZE):
+    for start in range(0, len(objects), size):
+        yield objects[start:start + size]
+
+
+def seed_library(books=1000, copies=3, users=100, authors=None, genres=50, languages=10, seed=0):
+    """Bulk-create a synthetic library; `copies` is the number of copies per book."""
+    rng = random.Random(seed)
+    authors = authors or max(1, books // 10)
+    today = datetime.date.today()
+
+    Language.objects.bulk_create([Language(name=f'Language {n}') for n in range(languages)])
+    Genre.objects.bulk_create([Genre(name=f'Genre {n}') for n in range(genres)])
+    Author.objects.bulk_create(
+        [Author(first_name=f'First{n}', last_name=f'Last{n:07d}') for n in range(authors)],
+        batch_size=SEED_BATCH_SIZE,
+    )
+    password = make_password(BENCHMARK_PASSWORD)
+    User.objects.bulk_create(
+        [User(username=f'reader{n}', password=password) for n in range(users)],
+        batch_size=SEED_BATCH_SIZE,
+    )
+
+    language_ids = list(Language.objects.values_list('pk', flat=True))
+    genre_ids = list(Genre.objects.values_list('pk', flat=True))
+    author_ids = list(Author.objects.values_list('pk', flat=True))
+    user_ids = list(User.objects.values_list('pk', flat=True))
+
+    statuses = ['a', 'o', 'm', 'r']
+    for batch in _batches(range(books)):
+        book_rows = []
+        copy_statuses = []
+        for n in batch:
+            states = [rng.choice(statuses) for _ in range(copies)]
+            copy_statuses.append(states)
+            book_rows.append(Book(
+                title=f'Book {n:07d}', summary=f'Synthetic summary {n}', isbn=f'{n:013d}',
+                author_id=rng.choice(author_ids), language_id=rng.choice(language_ids),
+                copies_total=len(states),
+                **{field: states.count(status) for status, field in STATUS_COUNTERS.items()},
+            ))
+        created = Book.objects.bulk_create(book_rows)
+
+        Book.genre.through.objects.bulk_create([
+            Book.genre.through(book_id=book.pk, genre_id=genre_id)
+            for book in created
+            for genre_id in rng.sample(genre_ids, min(2, len(genre_ids)))
+        ])
+        copy_rows = []
+        for book, states in zip(created, copy_statuses):
+            for status in states:
+                on_loan = status == 'o'
+                copy_rows.append(BookInstance(
+                    book_id=book.pk, imprint='Synthetic imprint', status=status,
+                    due_back=today + datetime.timedelta(days=rng.randint(-30, 30)) if on_loan else None,
+                    borrower_id=rng.choice(user_ids) if on_loan and user_ids else None,
+                ))
+        for copy_batch in _batches(copy_rows):
+            BookInstance.objects.bulk_create(copy_batch)
+
+    rebuild_index()
+    invalidate_library_stats()
+    cache.clear()
+
+
+def _url_kwargs(name, pattern):
+    book = Book.objects.order_by('pk').only('pk').first()
+    copy = BookInstance.objects.order_by('pk').only('pk').first()
+    samples = {
+        'book': book.pk,
+        'author': Author.objects.order_by('pk').values_list('pk', flat=True).first(),
+        'genre': Genre.objects.order_by('pk').values_list('pk', flat=True).first(),
+        'language': Language.objects.order_by('pk').values_list('pk', flat=True).first(),
+        'bookinstance': copy.pk,
+        'renew': copy.pk,
+        'catalog': None,
+        'api': book.pk,
+    }
+    kwargs = {}
+    for key in pattern.pattern.converters:
+        if key == 'pk':
+            kwargs[key] = samples[name.split('-')[0]]
+        elif key == 'dataset' or key == 'resource':
+            kwargs[key] = 'books'
+        elif key == 'fmt':
+            kwargs[key] = 'csv'
+        elif key == 'source':
+            kwargs[key] = 'authors'
+    return kwargs
+
+
+def benchmark_urls():
+    """Concrete GET URLs for every named catalog URL and each catalog admin changelist."""
+    urls = {}
+    for pattern in catalog_urls.urlpatterns:
+        if not isinstance(pattern, URLPattern) or not pattern.name or pattern.name in SKIPPED_URLS:
+            continue
+        urls[pattern.name] = (reverse(pattern.name, kwargs=_url_kwargs(pattern.name, pattern))
+                              + QUERY_STRINGS.get(pattern.name, ''))
+    for model in admin.site._registry:
+        if model._meta.app_label == 'catalog':
+            name = f'admin:catalog_{model._meta.model_name}_changelist'
+            urls[name] = reverse(name)
+    return urls
+
+
+def _fetch(client, url):
+    response = client.get(url)
+    if response.streaming:
+        response.size = sum(len(chunk) for chunk in response.streaming_content)
+    else:
+        response.size = len(response.content)
+    return response
+
+
+def measure(client, url, iterations=5, cold=False):
+    if not cold:
+        _fetch(client, url)
+
+    timings = []
+    for _ in range(iterations):
+        if cold:
+            cache.clear()
+        # The query log is a bounded deque; once full its length stops growing.
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = _fetch(client, url)
+            timings.append((time.perf_counter() - started) * 1000)
+    # captured_queries reads the live log, which the next request clears.
+    query_count = len(queries)
+
+    # Memory is traced in a separate request, tracemalloc slows everything down.
+    if cold:
+        cache.clear()
+    tracemalloc.start()
+    try:
+        _fetch(client, url)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'status': response.status_code,
+        'ms': round(statistics.median(timings), 3),
+        'max_ms': round(max(timings), 3),
+        'queries': query_count,
+        'peak_kb': round(peak / 1024, 1),
+        'size_kb': round(response.size / 1024, 1),
+    }
+
+
+def run_benchmarks(iterations=5, cold=False, only=None):
+    user, _ = User.objects.get_or_create(username='benchmark-admin', defaults={
+        'is_staff': True, 'is_superuser': True,
+    })
+    client = Client()
+    client.force_login(user)
+
+    results = {}
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        for name, url in benchmark_urls().items():
+            if only and not any(part in name for part in only):
+                continue
+            results[name] = {'url': url, **measure(client, url, iterations, cold)}
+    return results
+
+
+def compare_results(results, baseline, threshold=0.25, min_ms=1.0, min_kb=64):
+    """Regressions of `results` against `baseline`, as human-readable strings.
+
+    Latency and memory may grow by `threshold` (plus a small absolute floor to
+    ignore timer and allocator noise); query counts and statuses may not change.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current['status'] != previous['status']:
+            regressions.append(f'{name}: status {previous["status"]} -> {current["status"]}')
+        if current['queries'] > previous['queries']:
+            regressions.append(f'{name}: {previous["queries"]} -> {current["queries"]} queries')
+        if current['ms'] > previous['ms'] * (1 + threshold) and current['ms'] - previous['ms'] > min_ms:
+            regressions.append(f'{name}: {previous["ms"]:.1f} -> {current["ms"]:.1f} ms')
+        if (current['peak_kb'] > previous['peak_kb'] * (1 + threshold)
+                and current['peak_kb'] - previous['peak_kb'] > min_kb):
+            regressions.append(f'{name}: {previous["peak_kb"]:.0f} -> {current["peak_kb"]:.0f} KiB peak')
+        if 'size_kb' in previous and (current['size_kb'] > previous['size_kb'] * (1 + threshold)
+                                      and current['size_kb'] - previous['size_kb'] > min_kb):
+            regressions.append(f'{name}: {previous["size_kb"]:.0f} -> {current["size_kb"]:.0f} KiB response')
+    return regressions
@@ -0,0 +1,104 @@
+import uuid
+
+from django.db import transaction
+from django.utils import timezone
+
+from .counters import apply_copy_changes
+from .fragments import bump_model_version
+from .holds import allocate_copies, fulfil_holds
+from .ledger import LoanLedger
+from .models import BookInstance
+from .statistics import invalidate_library_stats
+
+# action: (statuses the copy may be in, fields written by bulk_update)
+CIRCULATION_ACTIONS = {
+    'checkout': (('a', 'r'), ['status', 'borrower', 'due_back', 'modified']),
+    'return': (('o',), ['status', 'borrower', 'due_back', 'modified']),
+    'renew': (('o',), ['due_back', 'modified']),
+}
+
+
+def _apply(action, copy, due_back, borrower):
+    copy.modified = timezone.now()
+    if action == 'checkout':
+        copy.status = 'o'
+        copy.borrower = borrower
+        copy.due_back = due_back
+    elif action == 'return':
+        copy.status = 'a'
+        copy.borrower = None
+        copy.due_back = None
+    elif action == 'renew':
+        copy.due_back = due_back
+
+
+def circulate(action, ids, due_back=None, borrower=None):
+    """Check out, return or renew many copies in one transaction.
+
+    Returns one result dict per requested id, in request order.
+    """
+    allowed_statuses, fields = CIRCULATION_ACTIONS[action]
+
+    valid_ids = {}
+    for copy_id in ids:
+        try:
+            valid_ids[copy_id] = uuid.UUID(copy_id)
+        except ValueError:
+            pass
+
+    with transaction.atomic():
+        copies = BookInstance.objects.select_for_update().only(
+            'book_id', 'status', 'borrower_id', 'due_back', 'modified',
+        ).in_bulk(valid_ids.values())
+
+        results = []
+        changed = []
+        seen = set()
+        state_changes = []
+        results_by_copy = {}
+        ledger = LoanLedger()
+        for copy_id in ids:
+            copy = copies.get(valid_ids.get(copy_id))
+            if copy is None:
+                results.append({'id': copy_id, 'ok': False, 'error': 'Unknown book copy'})
+                continue
+            if copy.pk in seen:
+                results.append({'id': copy_id, 'ok': False, 'error': 'Duplicate book copy'})
+                continue
+            if copy.status not in allowed_statuses:
+                results.append({'id': copy_id, 'ok': False,
+                                'error': f'Copy is {copy.get_status_display().lower()}'})
+                continue
+            if copy.status == 'r' and copy.borrower_id != getattr(borrower, 'pk', None):
+                results.append({'id': copy_id, 'ok': False, 'error': 'Copy is reserved for another patron'})
+                continue
+
+            seen.add(copy.pk)
+            old_state = (copy.book_id, copy.status)
+            ended_loan = (copy.borrower_id, copy.due_back)
+            _apply(action, copy, due_back, borrower)
+            # A return is recorded against the loan it ends.
+            ledger.record(action, copy, *(ended_loan if action == 'return' else (copy.borrower_id, copy.due_back)))
+            changed.append(copy)
+            state_changes.append((old_state, (copy.book_id, copy.status)))
+            results_by_copy[copy.pk] = {'id': copy_id, 'ok': True}
+            results.append(results_by_copy[copy.pk])
+
+        if changed:
+            BookInstance.objects.bulk_update(changed, fields)
+            apply_copy_changes(state_changes)
+            if action == 'checkout':
+                fulfil_holds(changed)
+            elif action == 'return':
+                # Returned copies go straight to the next patron in the queue.
+                allocate_copies(changed)
+            ledger.flush()
+
+        for copy in changed:
+            results_by_copy[copy.pk].update(status=copy.status,
+                                            due_back=copy.due_back.isoformat() if copy.due_back else None)
+
+    if changed:
+        invalidate_library_stats()
+        bump_model_version('bookinstance')
+    return results
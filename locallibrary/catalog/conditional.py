@@ -0,0 +1,106 @@
+import datetime
+import hashlib
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db.models import Func, OuterRef, Subquery
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+from .fragments import permissions_key
+from .models import Book, BookInstance, Genre, TableVersion
+
+
+def _latest(queryset):
+    return Subquery(queryset.order_by('-modified').values('modified')[:1])
+
+
+def _count(queryset):
+    return Subquery(queryset.order_by().annotate(count=Func('pk', function='COUNT')).values('count'))
+
+
+def book_state(pk):
+    return Book.objects.filter(pk=pk).values_list(
+        'modified', 'author__modified', 'language__modified', 'copies_total',
+        _latest(Genre.objects.filter(book=OuterRef('pk'))),
+        _latest(BookInstance.objects.filter(book=OuterRef('pk'))),
+    ).first()
+
+
+def books_state(model, lookup):
+    """State of a row of `model` plus the books that reference it through `lookup`."""
+    def state(pk):
+        books = Book.objects.filter(**{lookup: OuterRef('pk')})
+        return model.objects.filter(pk=pk).values_list('modified', _latest(books), _count(books)).first()
+    return state
+
+
+def table_state(*model_names):
+    def state():
+        return list(TableVersion.objects.filter(table__in=model_names).order_by('table').values_list(
+            'table', 'version', 'modified'))
+    return state
+
+
+def dated(state_func):
+    """Add today's date to a state, for pages that show which loans are overdue."""
+    def state(**kwargs):
+        midnight = timezone.make_aware(datetime.datetime.combine(datetime.date.today(), datetime.time()))
+        return [*(state_func(**kwargs) or []), ('today', midnight)]
+    return state
+
+
+def _validators(state_func):
+    """Return condition() arguments that compute the ETag and Last-Modified
+    of a request together, from one state query, and memoise them on it."""
+    def validators(request, **kwargs):
+        if not hasattr(request, '_conditional_validators'):
+            state = state_func(**kwargs) or None
+            if state is None:
+                request._conditional_validators = (None, None)
+            else:
+                # The ETag also covers the user and their permissions, which
+                # change the sidebar.
+                key = f'{state}:{request.user.pk}:{permissions_key(request.user)}'
+                values = [value for row in state for value in row] if isinstance(state, list) else state
+                request._conditional_validators = (
+                    hashlib.md5(key.encode()).hexdigest(),
+                    max((value for value in values if isinstance(value, datetime.datetime)), default=None),
+                )
+        return request._conditional_validators
+
+    return validators, {
+        'etag_func': lambda request, *args, **kwargs: validators(request, **kwargs)[0],
+        'last_modified_func': lambda request, *args, **kwargs: validators(request, **kwargs)[1],
+    }
+
+
+def conditional_get(state_func):
+    """Answer If-None-Match / If-Modified-Since for a view from one query.
+
+    `state_func` receives the view's URL kwargs and returns a tuple (or list
+    of tuples) of the row versions the page is rendered from, or None when
+    there is nothing to validate against.
+    """
+    _, arguments = _validators(state_func)
+    return method_decorator(condition(**arguments), name='get')
+
+
+def aconditional_get(state_func):
+    """conditional_get for coroutine views.
+
+    condition() calls the validators on the event loop, so they are worked
+    out in a thread first.
+    """
+    validators, arguments = _validators(state_func)
+
+    def decorator(view):
+        view = condition(**arguments)(view)
+
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            await sync_to_async(validators)(request, **kwargs)
+            return await view(request, *args, **kwargs)
+        return inner
+    return decorator
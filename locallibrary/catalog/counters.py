@@ -0,0 +1,80 @@
+from collections import Counter
+
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Book
+
+STATUS_COUNTERS = {
+    'a': 'copies_available',
+    'o': 'copies_on_loan',
+}
+COUNTER_FIELDS = ['copies_total', *STATUS_COUNTERS.values()]
+
+
+def _copy_delta(state, sign, deltas):
+    book_id, status = state
+    if book_id is None:
+        return
+    deltas.setdefault(book_id, Counter())['copies_total'] += sign
+    if status in STATUS_COUNTERS:
+        deltas[book_id][STATUS_COUNTERS[status]] += sign
+
+
+def apply_copy_change(old_state, new_state):
+    """Move one copy between (book_id, status) states in the Book counters."""
+    apply_copy_changes([(old_state, new_state)])
+
+
+def apply_copy_changes(changes):
+    """Apply many (old_state, new_state) moves with one UPDATE per affected book."""
+    deltas = {}
+    for old_state, new_state in changes:
+        if old_state:
+            _copy_delta(old_state, -1, deltas)
+        if new_state:
+            _copy_delta(new_state, 1, deltas)
+
+    for book_id, changes in deltas.items():
+        # A counter that has drifted low stays at zero rather than failing
+        # the write on its CHECK constraint; reconcile_copy_counters repairs it.
+        updates = {field: F(field) + delta if delta > 0 else Greatest(F(field) + delta, Value(0))
+                   for field, delta in changes.items() if delta}
+        if updates:
+            Book.objects.filter(pk=book_id).update(**updates, modified=timezone.now())
+
+
+def actual_copy_counts(queryset):
+    return queryset.annotate(
+        actual_copies_total=Count('bookinstance'),
+        actual_copies_available=Count('bookinstance', filter=Q(bookinstance__status='a')),
+        actual_copies_on_loan=Count('bookinstance', filter=Q(bookinstance__status='o')),
+    )
+
+
+def reconcile_copy_counters(queryset=None, batch_size=1000, fix=True):
+    """Recompute the counters from BookInstance rows; returns (checked, drifted)."""
+    if queryset is None:
+        queryset = Book.objects.all()
+    queryset = actual_copy_counts(queryset.order_by('pk').only('pk', *COUNTER_FIELDS))
+
+    checked = drifted = 0
+    last_pk = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return checked, drifted
+        last_pk = batch[-1].pk
+        checked += len(batch)
+
+        changed = []
+        for book in batch:
+            if any(getattr(book, field) != getattr(book, 'actual_' + field) for field in COUNTER_FIELDS):
+                for field in COUNTER_FIELDS:
+                    setattr(book, field, getattr(book, 'actual_' + field))
+                book.modified = timezone.now()
+                changed.append(book)
+        drifted += len(changed)
+        if fix and changed:
+            Book.objects.bulk_update(changed, [*COUNTER_FIELDS, 'modified'])
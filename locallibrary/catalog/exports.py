@@ -0,0 +1,91 @@
+import csv
+import json
+from itertools import islice
+
+from .models import Author, Book, BookInstance
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _person(first_name, last_name):
+    if last_name is None:
+        return ''
+    return f'{last_name}, {first_name}'
+
+
+def book_rows(chunk_size=EXPORT_CHUNK_SIZE):
+    yield ['id', 'title', 'author', 'summary', 'isbn', 'language', 'genres']
+
+    books = Book.objects.order_by('pk').values_list(
+        'pk', 'title', 'author__first_name', 'author__last_name', 'summary', 'isbn', 'language__name',
+    ).iterator(chunk_size=chunk_size)
+    for chunk in _chunks(books, chunk_size):
+        genres = {}
+        for book_id, name in Book.genre.through.objects.filter(
+                book_id__in=[row[0] for row in chunk]).order_by('genre__name').values_list('book_id', 'genre__name'):
+            genres.setdefault(book_id, []).append(name)
+
+        for pk, title, first_name, last_name, summary, isbn, language in chunk:
+            yield [pk, title, _person(first_name, last_name), summary, isbn, language or '',
+                   '; '.join(genres.get(pk, []))]
+
+
+def author_rows(chunk_size=EXPORT_CHUNK_SIZE):
+    yield ['id', 'first_name', 'last_name', 'date_of_birth', 'date_of_death']
+
+    yield from Author.objects.order_by('pk').values_list(
+        'pk', 'first_name', 'last_name', 'date_of_birth', 'date_of_death',
+    ).iterator(chunk_size=chunk_size)
+
+
+def bookinstance_rows(chunk_size=EXPORT_CHUNK_SIZE):
+    yield ['id', 'book_id', 'book', 'imprint', 'status', 'due_back', 'borrower']
+
+    yield from BookInstance.objects.order_by('pk').values_list(
+        'pk', 'book_id', 'book__title', 'imprint', 'status', 'due_back', 'borrower__username',
+    ).iterator(chunk_size=chunk_size)
+
+
+EXPORTS = {
+    'books': (Book, book_rows),
+    'authors': (Author, author_rows),
+    'bookinstances': (BookInstance, bookinstance_rows),
+}
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def _value(value):
+    return '' if value is None else value
+
+
+def encode_csv(rows):
+    writer = csv.writer(Echo())
+    for row in rows:
+        yield writer.writerow([_value(value) for value in row])
+
+
+def encode_jsonl(rows):
+    header = next(rows)
+    for row in rows:
+        yield json.dumps(dict(zip(header, row)), default=str) + '\n'
+
+
+def export_lines(dataset, fmt, chunk_size=EXPORT_CHUNK_SIZE):
+    model, rows = EXPORTS[dataset]
+    encode = encode_jsonl if fmt == 'jsonl' else encode_csv
+    return encode(rows(chunk_size))
@@ -1,24 +1,124 @@
+from django import forms
 from django.forms import ModelForm
-from .models import BookInstance
+from django.contrib.auth.models import User
+from django.urls import reverse
+from .models import Book, BookInstance
+from .autocomplete import AUTOCOMPLETE_INDEXES
 
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 import datetime
 
-class RenewBookModelForm(ModelForm):
-    def clean_due_back(self):
-       data = self.cleaned_data['due_back']
+def validate_due_back(data):
+    if data < datetime.date.today():
+        raise ValidationError(_('Invalid date - renewal in past'))
+
+    if data > datetime.date.today() + datetime.timedelta(weeks=4):
+        raise ValidationError(_('Invalid date - renewal more than 4 weeks ahead'))
+
+class AutocompleteWidget(forms.Widget):
+    """Type-ahead input backed by an autocomplete endpoint.
+
+    Only the selected values are rendered, with labels from the in-memory
+    index, so the page never lists the whole table.
+    """
+    template_name = 'catalog/widgets/autocomplete.html'
 
-       if data < datetime.date.today():
-           raise ValidationError(_('Invalid date - renewal in past'))
+    class Media:
+        js = ['js/autocomplete.js']
 
-       if data > datetime.date.today() + datetime.timedelta(weeks=4):
-           raise ValidationError(_('Invalid date - renewal more than 4 weeks ahead'))
+    def __init__(self, source, multiple=False, attrs=None):
+        super().__init__(attrs)
+        self.source = source
+        self.allow_multiple_selected = multiple
+
+    def format_value(self, value):
+        if value is None or value == '':
+            return []
+        values = value if isinstance(value, (list, tuple)) else [value]
+        return [str(item) for item in values if item not in (None, '')]
+
+    def value_from_datadict(self, data, files, name):
+        if self.allow_multiple_selected and hasattr(data, 'getlist'):
+            return data.getlist(name)
+        return data.get(name)
+
+    def value_omitted_from_data(self, data, files, name):
+        # An empty multiple selection submits nothing at all.
+        return not self.allow_multiple_selected and name not in data
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        pks = [int(item) for item in context['widget']['value'] if item.isdigit()]
+        labels = AUTOCOMPLETE_INDEXES[self.source].labels(pks)
+        context['widget'].update(
+            url=reverse('autocomplete', args=[self.source]),
+            multiple=self.allow_multiple_selected,
+            selected=[(pk, labels.get(pk, pk)) for pk in pks],
+        )
+        return context
+
+class BookForm(ModelForm):
+    class Meta:
+        model = Book
+        fields = ['title', 'author', 'summary', 'isbn', 'genre', 'language']
+        widgets = {
+            'author': AutocompleteWidget('authors'),
+            'genre': AutocompleteWidget('genres', multiple=True),
+            'language': AutocompleteWidget('languages'),
+        }
 
+class BookInstanceForm(ModelForm):
+    class Meta:
+        model = BookInstance
+        fields = ['book', 'imprint', 'due_back', 'borrower', 'status']
+        widgets = {
+            'book': AutocompleteWidget('books'),
+            'borrower': AutocompleteWidget('borrowers'),
+        }
+
+class BookInstanceUpdateForm(BookInstanceForm):
+    class Meta(BookInstanceForm.Meta):
+        fields = ['imprint', 'due_back', 'borrower', 'status']
+
+class RenewBookModelForm(ModelForm):
+    def clean_due_back(self):
+       data = self.cleaned_data['due_back']
+       validate_due_back(data)
        return data
 
     class Meta:
         model = BookInstance
         fields = ['due_back',]
         labels = { 'due_back': _('Renewal date'), }
-        help_texts = { 'due_back': _('Enter a date between now and 4 weeks (default 3).'), }
\ No newline at end of file
+        help_texts = { 'due_back': _('Enter a date between now and 4 weeks (default 3).'), }
+
+class CirculationForm(forms.Form):
+    ACTIONS = (
+        ('checkout', 'Check out'),
+        ('return', 'Return'),
+        ('renew', 'Renew'),
+    )
+    MAX_ITEMS = 200
+
+    action = forms.ChoiceField(choices=ACTIONS)
+    ids = forms.JSONField()
+    due_back = forms.DateField(required=False, validators=[validate_due_back])
+    borrower = forms.ModelChoiceField(queryset=User.objects.all(), required=False)
+
+    def clean_ids(self):
+        data = self.cleaned_data['ids']
+        if not isinstance(data, list) or not data:
+            raise ValidationError(_('Provide a list of book copy ids'))
+        if len(data) > self.MAX_ITEMS:
+            raise ValidationError(_('At most %(max)s copies per request'), params={'max': self.MAX_ITEMS})
+        return [str(item) for item in data]
+
+    def clean(self):
+        cleaned_data = super().clean()
+        action = cleaned_data.get('action')
+        if action in ('checkout', 'renew') and not cleaned_data.get('due_back'):
+            cleaned_data['due_back'] = datetime.date.today() + datetime.timedelta(weeks=3)
+        if action == 'checkout' and not cleaned_data.get('borrower'):
+            self.add_error('borrower', _('A borrower is required to check out copies'))
+        return cleaned_data
@@ -0,0 +1,76 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+
+from .models import TableVersion
+
+VERSION_KEY = 'catalog:version:{}'
+FRAGMENT_CACHE_TIMEOUT = 60 * 10
+
+
+def initial_version():
+    # Counters restart from a fresh value after a cache flush, so a version
+    # remembered from before the flush is never mistaken for a current one.
+    return time.time_ns()
+
+
+def model_version(model_name):
+    return cache.get_or_set(VERSION_KEY.format(model_name), initial_version, None)
+
+
+def bump_model_version(*model_names):
+    # After commit: a render that read the rows before the write must not
+    # cache them under the new version, and concurrent writers must not
+    # queue on the shared version rows for the length of their transactions.
+    transaction.on_commit(lambda: bump_cache_versions(*model_names), robust=True)
+    transaction.on_commit(lambda: bump_table_versions(*model_names), robust=True)
+
+
+def bump_cache_versions(*model_names):
+    for model_name in model_names:
+        cache.add(VERSION_KEY.format(model_name), initial_version(), None)
+        cache.incr(VERSION_KEY.format(model_name))
+
+
+def bump_table_versions(*model_names):
+    # Unlike the cache counters these survive a cache flush, so they are
+    # safe to derive HTTP validators from.
+    now = timezone.now()
+    updated = TableVersion.objects.filter(table__in=model_names).update(version=F('version') + 1, modified=now)
+    if updated < len(set(model_names)):
+        TableVersion.objects.bulk_create(
+            [TableVersion(table=model_name, version=1, modified=now) for model_name in model_names],
+            ignore_conflicts=True,
+        )
+
+
+class ModelVersions:
+    """Per-request view of the model version counters, for fragment cache keys."""
+
+    def __init__(self):
+        self._versions = {}
+
+    def __getitem__(self, model_name):
+        if model_name not in self._versions:
+            self._versions[model_name] = model_version(model_name)
+        return self._versions[model_name]
+
+
+def permissions_key(user):
+    if not user.is_authenticated:
+        return 'anonymous'
+    perms = ','.join(sorted(user.get_all_permissions()))
+    return hashlib.md5(f'{user.is_staff}:{perms}'.encode()).hexdigest()
+
+
+def fragment_cache(request):
+    return {
+        'fragment_cache_timeout': FRAGMENT_CACHE_TIMEOUT,
+        'model_versions': ModelVersions(),
+        'perms_key': SimpleLazyObject(lambda: permissions_key(request.user)),
+    }
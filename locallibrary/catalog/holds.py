@@ -0,0 +1,130 @@
+import datetime
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .counters import apply_copy_changes
+from .fragments import bump_model_version
+from .models import BookInstance, Hold
+from .statistics import invalidate_library_stats
+
+HOLD_PICKUP_DAYS = 7
+ACTIVE_HOLD_STATUSES = ('w', 'r')
+
+
+def allocate_copies(copies):
+    """Reserve each available copy for the oldest waiting hold on its book.
+
+    Call inside the transaction that made the copies available, with the
+    copies locked. Waiting holds are claimed with SKIP LOCKED, so concurrent
+    returns of the same book take successive holds from the head of the queue
+    instead of queueing behind each other. Returns the holds made ready.
+    """
+    by_book = {}
+    for copy in copies:
+        if copy.status == 'a' and copy.book_id is not None:
+            by_book.setdefault(copy.book_id, []).append(copy)
+    if not by_book:
+        return []
+
+    now = timezone.now()
+    pickup_by = timezone.localdate(now) + datetime.timedelta(days=HOLD_PICKUP_DAYS)
+    ready = []
+    reserved = []
+    state_changes = []
+    for book_id, book_copies in by_book.items():
+        holds = Hold.objects.select_for_update(skip_locked=True).filter(
+            book_id=book_id, status='w',
+        ).order_by('placed', 'id').only('patron_id')[:len(book_copies)]
+        for hold, copy in zip(holds, book_copies):
+            hold.status = 'r'
+            hold.copy = copy
+            hold.ready = now
+            state_changes.append(((copy.book_id, copy.status), (copy.book_id, 'r')))
+            copy.status = 'r'
+            copy.borrower_id = hold.patron_id
+            copy.due_back = pickup_by
+            copy.modified = now
+            ready.append(hold)
+            reserved.append(copy)
+
+    if ready:
+        Hold.objects.bulk_update(ready, ['status', 'copy', 'ready'])
+        BookInstance.objects.bulk_update(reserved, ['status', 'borrower', 'due_back', 'modified'])
+        apply_copy_changes(state_changes)
+    return ready
+
+
+def place_hold(book, patron):
+    """Queue `patron` for `book`, reserving a copy at once if one is available.
+
+    Returns (hold, created); a patron has at most one active hold per book.
+    """
+    hold = Hold.objects.filter(book=book, patron=patron, status__in=ACTIVE_HOLD_STATUSES).first()
+    if hold is not None:
+        return hold, False
+    try:
+        with transaction.atomic():
+            hold = Hold.objects.create(book=book, patron=patron)
+            copies = BookInstance.objects.select_for_update(skip_locked=True).filter(
+                book=book, status='a',
+            ).only('book_id', 'status', 'borrower_id', 'due_back', 'modified')[:1]
+            ready = allocate_copies(list(copies))
+    except IntegrityError:
+        return Hold.objects.get(book=book, patron=patron, status__in=ACTIVE_HOLD_STATUSES), False
+    if ready:
+        # The reserved copy was saved with bulk_update, which sends no signals.
+        invalidate_library_stats()
+        bump_model_version('bookinstance')
+    hold.refresh_from_db(fields=['status', 'copy', 'ready'])
+    return hold, True
+
+
+def cancel_hold(hold):
+    """Cancel an active hold; a copy it was holding goes to the next in line."""
+    with transaction.atomic():
+        hold = Hold.objects.select_for_update().get(pk=hold.pk)
+        if hold.status not in ACTIVE_HOLD_STATUSES:
+            return hold
+        copy = None
+        if hold.status == 'r' and hold.copy_id:
+            copy = BookInstance.objects.select_for_update().only(
+                'book_id', 'status', 'borrower_id', 'due_back', 'modified',
+            ).get(pk=hold.copy_id)
+        hold.status = 'c'
+        hold.save(update_fields=['status'])
+        if copy is not None and copy.status == 'r':
+            copy.status = 'a'
+            copy.borrower = None
+            copy.due_back = None
+            copy.save()
+    return hold
+
+
+def fulfil_holds(copies):
+    """Mark ready holds as collected once their copies are checked out."""
+    return Hold.objects.filter(copy__in=copies, status='r').update(status='f')
+
+
+def requeue_holds(copies):
+    """Send the ready holds on copies about to be deleted back to the queue.
+
+    The holds keep their place at the head of the queue and take another
+    available copy of the book if there is one.
+    """
+    holds = Hold.objects.select_for_update().filter(copy__in=copies, status='r')
+    book_ids = list(holds.values_list('book_id', flat=True))
+    if not book_ids:
+        return 0
+    holds.update(status='w', copy=None, ready=None)
+
+    available = []
+    for book_id, count in Counter(book_ids).items():
+        available += BookInstance.objects.select_for_update(skip_locked=True).filter(
+            book_id=book_id, status='a',
+        ).exclude(pk__in=[copy.pk for copy in copies]).only(
+            'book_id', 'status', 'borrower_id', 'due_back', 'modified',
+        )[:count]
+    allocate_copies(available)
+    return len(book_ids)
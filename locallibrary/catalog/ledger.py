@@ -0,0 +1,166 @@
+import datetime
+import re
+import threading
+from collections import Counter, defaultdict
+
+from django.apps.registry import Apps
+from django.db import connection, models, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import LoanEventBase
+
+PARTITION_TABLE = 'catalog_loanevent_{:%Y%m}'
+PARTITION_TABLE_RE = re.compile(r'^catalog_loanevent_(\d{4})(\d{2})$')
+LEDGER_BATCH_SIZE = 500
+
+# Partition models live outside the project's app registry, so migrations
+# never see them; their tables are created on first write.
+_partition_apps = Apps()
+_partition_models = {}
+_partition_lock = threading.Lock()
+# Months whose table this process knows to exist.
+_known_partitions = set()
+
+
+def partition_month(time):
+    time = timezone.localtime(time, datetime.timezone.utc) if timezone.is_aware(time) else time
+    return datetime.date(time.year, time.month, 1)
+
+
+def next_month(month):
+    return datetime.date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def partition_model(month):
+    """The LoanEvent model for the monthly table holding `month`."""
+    month = month.replace(day=1)
+    with _partition_lock:
+        if month not in _partition_models:
+            table = PARTITION_TABLE.format(month)
+            meta = type('Meta', (), {
+                'app_label': 'catalog',
+                'apps': _partition_apps,
+                'db_table': table,
+                'indexes': [
+                    models.Index(fields=['book_id', 'time'], name=f'{table}_book'),
+                    models.Index(fields=['borrower_id', 'time'], name=f'{table}_borrower'),
+                ],
+            })
+            _partition_models[month] = type(f'LoanEvent{month:%Y%m}', (LoanEventBase,), {
+                '__module__': __name__,
+                'Meta': meta,
+            })
+        return _partition_models[month]
+
+
+def existing_partitions():
+    """Months that have a partition table, in order."""
+    months = []
+    for table in connection.introspection.table_names():
+        match = PARTITION_TABLE_RE.match(table)
+        if match:
+            months.append(datetime.date(int(match[1]), int(match[2]), 1))
+    return sorted(months)
+
+
+def _create_partition(model):
+    # Plain DDL rather than a schema editor context, which SQLite refuses
+    # inside a transaction; the tables have no foreign keys to defer.
+    # IF NOT EXISTS lets two workers make the first write of a month at once.
+    editor = connection.schema_editor()
+    sql, params = editor.table_sql(model)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(sql.replace('CREATE TABLE', 'CREATE TABLE IF NOT EXISTS', 1), params)
+        for index in model._meta.indexes:
+            cursor.execute(str(index.create_sql(model, editor)).replace('CREATE INDEX', 'CREATE INDEX IF NOT EXISTS', 1))
+
+
+def ensure_partitions(months):
+    """Create the partitions for `months` that this process has not seen yet."""
+    for month in months:
+        month = month.replace(day=1)
+        if month not in _known_partitions:
+            _create_partition(partition_model(month))
+            # Remember the table only once it is committed; a rolled back
+            # transaction takes it away again.
+            transaction.on_commit(lambda month=month: _known_partitions.add(month))
+
+
+def write_loan_events(events):
+    """Insert event dicts with one bulk insert per month, creating partitions as needed."""
+    by_month = defaultdict(list)
+    for event in events:
+        by_month[partition_month(event['time'])].append(event)
+
+    ensure_partitions(by_month)
+    for month, month_events in sorted(by_month.items()):
+        model = partition_model(month)
+        model.objects.bulk_create([model(**event) for event in month_events], batch_size=LEDGER_BATCH_SIZE)
+
+
+def loan_event(action, copy, borrower_id, due_back, time=None):
+    return {
+        'action': action,
+        'time': time or timezone.now(),
+        'copy_id': copy.pk,
+        'book_id': copy.book_id,
+        'borrower_id': borrower_id,
+        'due_back': due_back,
+    }
+
+
+class LoanLedger:
+    """Collects the events of one unit of work for a single bulk write.
+
+    Flush inside the transaction that changed the copies, so the history
+    commits or rolls back with them.
+    """
+
+    def __init__(self):
+        self.events = []
+
+    def record(self, action, copy, borrower_id, due_back, time=None):
+        self.events.append(loan_event(action, copy, borrower_id, due_back, time))
+
+    def flush(self):
+        events, self.events = self.events, []
+        write_loan_events(events)
+
+
+def loan_action(old_status, old_due_back, new_status, new_due_back):
+    """The ledger action for a copy moving between states, if any."""
+    if new_status == 'o' and old_status != 'o':
+        return 'checkout'
+    if old_status == 'o' and new_status != 'o':
+        return 'return'
+    if new_status == 'o' and new_due_back != old_due_back:
+        return 'renew'
+    return None
+
+
+def _partitions(start, end, filters):
+    existing = set(existing_partitions())
+    month = partition_month(start)
+    last = partition_month(end - datetime.timedelta(microseconds=1))
+    while month <= last:
+        if month in existing:
+            yield month, partition_model(month).objects.filter(time__gte=start, time__lt=end, **filters)
+        month = next_month(month)
+
+
+def loan_events(start, end, **filters):
+    """Events with start <= time < end, as one queryset per partition in range.
+
+    Only the months in range are read; filter on book_id or borrower_id to
+    use the per-month indexes.
+    """
+    return [queryset.order_by('time', 'id') for _, queryset in _partitions(start, end, filters)]
+
+
+def circulation_report(start, end, **filters):
+    """{month: Counter of actions} for events with start <= time < end."""
+    return {
+        month: Counter(dict(queryset.order_by().values_list('action').annotate(count=Count('id'))))
+        for month, queryset in _partitions(start, end, filters)
+    }
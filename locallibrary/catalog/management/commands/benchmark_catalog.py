@@ -0,0 +1,70 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from catalog.models import Book
+from catalog.benchmarks import seed_library, run_benchmarks, compare_results
+
+
+class Command(BaseCommand):
+    help = ('Seed a synthetic library in a scratch database, then measure latency, query count and '
+            'peak memory for every catalog URL and admin changelist.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=1000)
+        parser.add_argument('--copies', type=int, default=3, help='Copies per book.')
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--authors', type=int, help='Defaults to one per ten books.')
+        parser.add_argument('--genres', type=int, default=50)
+        parser.add_argument('--iterations', type=int, default=5)
+        parser.add_argument('--cold', action='store_true', help='Clear the cache before every request.')
+        parser.add_argument('--only', action='append', help='Only URL names containing this text.')
+        parser.add_argument('--output', help='Write the results to this JSON file.')
+        parser.add_argument('--baseline', help='Compare against results from an earlier --output.')
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help='Allowed relative growth in latency and memory.')
+        parser.add_argument('--current-db', action='store_true',
+                            help='Seed the configured database instead of a scratch copy. '
+                                 'Only use this with a dedicated benchmark database.')
+        parser.add_argument('--keepdb', action='store_true',
+                            help='Reuse the scratch database, and skip seeding if it already has books.')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            try:
+                baseline = json.loads(Path(options['baseline']).read_text())['results']
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(f'Cannot read baseline {options["baseline"]}: {e}')
+
+        old_name = None
+        if not options['current_db']:
+            old_name = connection.settings_dict['NAME']
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            if not options['keepdb'] or not Book.objects.exists():
+                self.stdout.write('Seeding %d books with %d copies each...' % (options['books'], options['copies']))
+                seed_library(books=options['books'], copies=options['copies'], users=options['users'],
+                             authors=options['authors'], genres=options['genres'])
+            results = run_benchmarks(options['iterations'], options['cold'], options['only'])
+        finally:
+            if old_name is not None:
+                connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+
+        self.stdout.write(f'{"url":<48}{"status":>7}{"ms":>10}{"queries":>9}{"peak KiB":>10}{"size KiB":>10}')
+        for name, result in results.items():
+            self.stdout.write(f'{name:<48}{result["status"]:>7}{result["ms"]:>10.2f}'
+                              f'{result["queries"]:>9}{result["peak_kb"]:>10.0f}{result["size_kb"]:>10.1f}')
+
+        if options['output']:
+            meta = {key: options[key] for key in ('books', 'copies', 'users', 'authors', 'genres',
+                                                   'iterations', 'cold')}
+            Path(options['output']).write_text(json.dumps({'meta': meta, 'results': results}, indent=2))
+
+        if baseline is not None:
+            regressions = compare_results(results, baseline, options['threshold'])
+            if regressions:
+                raise CommandError('Performance regressions:\n  ' + '\n  '.join(regressions))
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
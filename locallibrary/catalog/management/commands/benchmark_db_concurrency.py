@@ -0,0 +1,120 @@
+import datetime
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction, OperationalError
+from django.utils import timezone
+
+from catalog.models import Book, BookInstance
+from locallibrary.database import SQLITE_PRAGMAS, sqlite_init_command
+
+# Django's stock SQLite settings next to the tuned ones from database.py.
+SQLITE_MODES = {
+    'default': {'init_command': 'PRAGMA journal_mode=DELETE'},
+    'tuned': None,
+}
+
+
+class Command(BaseCommand):
+    help = 'Run concurrent catalog reads and renewals against a copy of the SQLite database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--operations', type=int, default=400, help='Operations per mode.')
+        parser.add_argument('--write-ratio', type=float, default=0.2)
+
+    def read(self, alias):
+        books = Book.objects.using(alias).select_related('author').order_by('title')
+        list(books[:10])
+        books.count()
+
+    def renew(self, alias, pk):
+        due_back = timezone.localdate() + datetime.timedelta(weeks=3)
+        with transaction.atomic(using=alias):
+            BookInstance.objects.using(alias).filter(pk=pk).update(due_back=due_back)
+
+    def run_mode(self, alias, copy_ids, threads, operations, write_ratio):
+        timings = {'read': [], 'renew': []}
+        errors = []
+        lock = threading.Lock()
+
+        def worker(n):
+            kind = 'renew' if copy_ids and random.random() < write_ratio else 'read'
+            started = time.perf_counter()
+            try:
+                if kind == 'renew':
+                    self.renew(alias, random.choice(copy_ids))
+                else:
+                    self.read(alias)
+            except OperationalError as e:
+                with lock:
+                    errors.append(str(e))
+                return
+            finally:
+                connections[alias].close_if_unusable_or_obsolete()
+            with lock:
+                timings[kind].append(time.perf_counter() - started)
+
+        def close(_):
+            connections[alias].close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(threads) as pool:
+            list(pool.map(worker, range(operations)))
+            list(pool.map(close, range(threads)))
+        elapsed = time.perf_counter() - started
+        return timings, errors, elapsed
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('This benchmark compares SQLite journal settings; the database is %s.'
+                               % connection.vendor)
+
+        copy_ids = list(BookInstance.objects.values_list('pk', flat=True))
+        fd, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        connection.ensure_connection()
+        target = sqlite3.connect(path)
+        connection.connection.backup(target)
+        target.close()
+
+        self.stdout.write(f'{"mode":<10}{"ops/s":>9}{"read p50":>10}{"read p99":>10}'
+                          f'{"renew p50":>11}{"renew p99":>11}{"errors":>8}')
+        try:
+            for mode, options_ in SQLITE_MODES.items():
+                alias = f'benchmark_{mode}'
+                if options_ is None:
+                    options_ = {'init_command': sqlite_init_command({'journal_mode': 'WAL', **SQLITE_PRAGMAS}),
+                                'transaction_mode': 'IMMEDIATE'}
+                connections.settings[alias] = connections.configure_settings({
+                    'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': path, 'OPTIONS': options_},
+                })['default']
+                try:
+                    timings, errors, elapsed = self.run_mode(
+                        alias, copy_ids, options['threads'], options['operations'], options['write_ratio'])
+                finally:
+                    del connections.settings[alias]
+                self.stdout.write(
+                    f'{mode:<10}{(len(timings["read"]) + len(timings["renew"])) / elapsed:>9.0f}'
+                    f'{_ms(timings["read"], 50):>10}{_ms(timings["read"], 99):>10}'
+                    f'{_ms(timings["renew"], 50):>11}{_ms(timings["renew"], 99):>11}{len(errors):>8}'
+                )
+        finally:
+            for suffix in ('', '-wal', '-shm', '-journal'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+
+def _ms(samples, percentile):
+    if not samples:
+        return '-'
+    if len(samples) == 1:
+        return f'{samples[0] * 1000:.1f}'
+    return f'{statistics.quantiles(samples, n=100)[percentile - 1] * 1000:.1f}'
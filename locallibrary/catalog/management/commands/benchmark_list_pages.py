@@ -0,0 +1,46 @@
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+LIST_PAGES = ['books', 'authors', 'genres', 'languages', 'bookinstances']
+
+
+class Command(BaseCommand):
+    help = 'Compare list page render times with a cold and a warm fragment cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+
+    def render(self, path):
+        request = RequestFactory().get(path)
+        request.user = AnonymousUser()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            resolve(path).func(request).render()
+            elapsed = time.perf_counter() - started
+        return elapsed, len(queries)
+
+    def measure(self, path, iterations, warm):
+        total = 0
+        for _ in range(iterations):
+            if not warm:
+                cache.clear()
+            elapsed, queries = self.render(path)
+            total += elapsed
+        return total / iterations * 1000, queries
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        self.stdout.write(f'{"page":<16}{"cold ms":>10}{"queries":>9}{"warm ms":>10}{"queries":>9}')
+        for name in LIST_PAGES:
+            path = reverse(name)
+            cold_ms, cold_queries = self.measure(path, iterations, warm=False)
+            self.render(path)
+            warm_ms, warm_queries = self.measure(path, iterations, warm=True)
+            self.stdout.write(f'{name:<16}{cold_ms:>10.2f}{cold_queries:>9}{warm_ms:>10.2f}{warm_queries:>9}')
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from catalog.ledger import ensure_partitions, next_month, partition_month
+
+
+class Command(BaseCommand):
+    help = 'Create the loan ledger tables for the current month and the months ahead.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=3, help='Months to create, starting with the current one.')
+
+    def handle(self, *args, **options):
+        months = [partition_month(timezone.now())]
+        while len(months) < options['months']:
+            months.append(next_month(months[-1]))
+        ensure_partitions(months)
+        self.stdout.write(self.style.SUCCESS(
+            f'Loan ledger partitions exist from {months[0]:%Y-%m} to {months[-1]:%Y-%m}.'
+        ))
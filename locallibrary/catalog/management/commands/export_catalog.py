@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from catalog.exports import EXPORTS, EXPORT_FORMATS, EXPORT_CHUNK_SIZE, export_lines
+
+
+class Command(BaseCommand):
+    help = 'Stream books, authors or book copies to CSV or JSONL.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=list(EXPORTS))
+        parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--output', help='Output file (standard output by default).')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        lines = export_lines(options['dataset'], options['format'], options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+                output.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from catalog.visits import flush_visits
+
+
+class Command(BaseCommand):
+    help = ('Write pending page visit counters from the cache to the database. '
+            'Schedule it every minute or so; it needs the shared cache configured by CACHES.')
+
+    def handle(self, *args, **options):
+        flushed = flush_visits()
+        self.stdout.write(self.style.SUCCESS(f'Flushed {flushed} visits.'))
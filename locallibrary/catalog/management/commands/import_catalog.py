@@ -0,0 +1,216 @@
+import csv
+import json
+import sys
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from catalog.models import Author, Book, BookInstance, Genre, Language
+from catalog.counters import STATUS_COUNTERS
+from catalog.fragments import bump_model_version
+from catalog.search import reindex_books
+from catalog.statistics import invalidate_library_stats
+
+
+def read_csv(stream):
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def read_jsonl(stream):
+    for line_num, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            raise CommandError(f'Line {line_num}: invalid JSON ({e}).')
+        yield line_num, row
+
+
+def clean_row(line_num, row):
+    """Check one input row, converting 'copies' to an int."""
+    if not isinstance(row, dict):
+        raise CommandError(f'Line {line_num}: expected an object, got {type(row).__name__}.')
+    if not isinstance(row.get('title'), str) or not row['title'].strip():
+        raise CommandError(f'Line {line_num}: missing title.')
+    copies = row.get('copies') or 0
+    if isinstance(copies, str) and copies.strip().isdecimal():
+        copies = int(copies)
+    if type(copies) is not int or copies < 0:
+        raise CommandError(f"Line {line_num}: copies must be a non-negative integer, got {row.get('copies')!r}.")
+    status = row.get('status') or 'a'
+    if status not in dict(BookInstance.LOAN_STATUS):
+        raise CommandError(f'Line {line_num}: unknown status {status!r}.')
+
+    last_name, first_name = CatalogImporter.parse_author(row.get('author'))
+    values = [
+        ('title', row['title'], Book, 'title'),
+        ('isbn', row.get('isbn'), Book, 'isbn'),
+        ('imprint', row.get('imprint'), BookInstance, 'imprint'),
+        ('author last name', last_name, Author, 'last_name'),
+        ('author first name', first_name, Author, 'first_name'),
+        ('language', (row.get('language') or '').strip(), Language, 'name'),
+    ]
+    values += [('genre', name, Genre, 'name') for name in CatalogImporter.parse_genres(row.get('genres'))]
+    for label, value, model, field in values:
+        max_length = model._meta.get_field(field).max_length
+        if value is not None and len(str(value)) > max_length:
+            raise CommandError(f'Line {line_num}: {label} is longer than {max_length} characters.')
+    return {**row, 'copies': copies}
+
+
+class CatalogImporter:
+    """Creates catalog rows in bulk, resolving related names through lookup maps."""
+
+    def __init__(self):
+        self.authors = {(a.last_name, a.first_name): a for a in Author.objects.only('first_name', 'last_name')}
+        self.genres = {g.name.lower(): g for g in Genre.objects.only('name')}
+        self.languages = {l.name.lower(): l for l in Language.objects.only('name')}
+
+    @staticmethod
+    def parse_author(value):
+        last_name, _, first_name = (value or '').partition(',')
+        return last_name.strip(), first_name.strip()
+
+    @staticmethod
+    def parse_genres(value):
+        if isinstance(value, list):
+            names = value
+        else:
+            names = (value or '').split(';')
+        return [name.strip() for name in names if name.strip()]
+
+    def _resolve(self, lookup, model, keys, make):
+        missing = {}
+        for key, value in keys.items():
+            if key not in lookup and key not in missing:
+                missing[key] = make(value)
+        for key, obj in zip(missing, model.objects.bulk_create(missing.values())):
+            lookup[key] = obj
+
+    def import_rows(self, rows):
+        author_keys = {}
+        genre_keys = {}
+        language_keys = {}
+        for row in rows:
+            author = self.parse_author(row.get('author'))
+            if author[0]:
+                author_keys[author] = author
+            for name in self.parse_genres(row.get('genres')):
+                genre_keys[name.lower()] = name
+            language = (row.get('language') or '').strip()
+            if language:
+                language_keys[language.lower()] = language
+
+        self._resolve(self.authors, Author, author_keys,
+                      lambda name: Author(last_name=name[0], first_name=name[1]))
+        self._resolve(self.genres, Genre, genre_keys, lambda name: Genre(name=name))
+        self._resolve(self.languages, Language, language_keys, lambda name: Language(name=name))
+
+        books = Book.objects.bulk_create([
+            Book(
+                title=row['title'],
+                summary=row.get('summary') or '',
+                isbn=row.get('isbn') or '',
+                author=self.authors.get(self.parse_author(row.get('author'))),
+                language=self.languages.get((row.get('language') or '').strip().lower()),
+                **self.copy_counters(row),
+            )
+            for row in rows
+        ])
+
+        Book.genre.through.objects.bulk_create([
+            Book.genre.through(book_id=book.pk, genre_id=self.genres[name.lower()].pk)
+            for book, row in zip(books, rows)
+            for name in {name.lower(): name for name in self.parse_genres(row.get('genres'))}.values()
+        ])
+
+        copies = BookInstance.objects.bulk_create([
+            BookInstance(book=book, imprint=row.get('imprint') or '', status=self.copy_status(row))
+            for book, row in zip(books, rows)
+            for _ in range(int(row.get('copies') or 0))
+        ])
+        return books, copies
+
+    @staticmethod
+    def copy_status(row):
+        return row.get('status') or 'a'
+
+    def copy_counters(self, row):
+        copies = int(row.get('copies') or 0)
+        counters = {'copies_total': copies}
+        if self.copy_status(row) in STATUS_COUNTERS:
+            counters[STATUS_COUNTERS[self.copy_status(row)]] = copies
+        return counters
+
+
+class Command(BaseCommand):
+    help = 'Bulk import books, authors, genres, languages and copies from CSV or JSONL.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or JSONL file, or '-' for standard input.")
+        parser.add_argument('--format', choices=['csv', 'jsonl'])
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--progress-file',
+                            help='Records committed rows here and skips them when the import is rerun.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.json')) else 'csv')
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be positive.')
+
+        progress_file = options['progress_file'] and Path(options['progress_file'])
+        done = int(progress_file.read_text()) if progress_file and progress_file.exists() else 0
+
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        try:
+            reader = read_jsonl(stream) if fmt == 'jsonl' else read_csv(stream)
+            rows = (clean_row(line_num, row) for line_num, row in islice(reader, done, None))
+            if done:
+                self.stdout.write(f'Resuming after {done} rows.')
+
+            importer = CatalogImporter()
+            started = time.monotonic()
+            imported = copies = 0
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+
+                with transaction.atomic():
+                    books, instances = importer.import_rows(batch)
+                    reindex_books(Book.objects.filter(pk__in=[book.pk for book in books]))
+                # Per batch, so the batches committed before a bad row are
+                # not left out of cached pages.
+                invalidate_library_stats()
+                bump_model_version('author', 'genre', 'language', 'book', 'bookinstance')
+
+                imported += len(books)
+                copies += len(instances)
+                done += len(batch)
+                if progress_file:
+                    progress_file.write_text(str(done))
+
+                elapsed = time.monotonic() - started
+                self.stdout.write(f'{done} rows committed ({self.rate(imported, elapsed):.0f} rows/sec).')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} books and {copies} copies in {elapsed:.2f}s '
+            f'({self.rate(imported, elapsed):.0f} rows/sec).'
+        ))
+
+    @staticmethod
+    def rate(rows, elapsed):
+        return rows / elapsed if elapsed else 0
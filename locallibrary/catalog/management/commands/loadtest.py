@@ -0,0 +1,77 @@
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PATHS = [
+    '/catalog/',
+    '/catalog/books/',
+    '/catalog/authors/',
+    '/catalog/genres/',
+    '/catalog/languages/',
+    '/catalog/bookinstances/',
+]
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test running deployments over HTTP and compare requests/sec and latency, '
+        'e.g. --target wsgi=http://127.0.0.1:8000 --target asgi=http://127.0.0.1:8001'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', required=True, metavar='NAME=URL')
+        parser.add_argument('--path', action='append', dest='paths')
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--timeout', type=float, default=10)
+
+    def fetch(self, url, timeout):
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=timeout) as response:
+                response.read()
+                ok = response.status == 200
+        except OSError:
+            ok = False
+        return time.perf_counter() - started, ok
+
+    def run_target(self, base_url, paths, requests, concurrency, timeout):
+        urls = [base_url.rstrip('/') + paths[i % len(paths)] for i in range(requests)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(lambda url: self.fetch(url, timeout), urls))
+        elapsed = time.perf_counter() - started
+
+        latencies = [latency for latency, ok in results if ok]
+        errors = len(results) - len(latencies)
+        if not latencies:
+            return {'rps': 0, 'p50': 0, 'p99': 0, 'errors': errors}
+        return {
+            'rps': len(latencies) / elapsed,
+            'p50': percentile(latencies, 0.50) * 1000,
+            'p99': percentile(latencies, 0.99) * 1000,
+            'errors': errors,
+        }
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options['target']:
+            name, sep, url = target.partition('=')
+            if not sep or not url:
+                raise CommandError(f'Expected NAME=URL, got {target!r}.')
+            targets.append((name, url))
+        paths = options['paths'] or DEFAULT_PATHS
+
+        self.stdout.write(f'{"target":<10}{"req/s":>10}{"p50 ms":>10}{"p99 ms":>10}{"errors":>8}')
+        for name, url in targets:
+            result = self.run_target(url, paths, options['requests'], options['concurrency'], options['timeout'])
+            self.stdout.write(
+                f'{name:<10}{result["rps"]:>10.1f}{result["p50"]:>10.2f}{result["p99"]:>10.2f}{result["errors"]:>8}'
+            )
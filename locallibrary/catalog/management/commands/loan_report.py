@@ -0,0 +1,38 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from catalog.ledger import circulation_report, next_month
+from catalog.models import LoanEventBase
+
+
+def month(value):
+    return datetime.datetime.strptime(value, '%Y-%m').date()
+
+
+class Command(BaseCommand):
+    help = 'Count checkouts, renewals and returns per month from the loan ledger.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=month, help='First month (YYYY-MM). Defaults to the current month.')
+        parser.add_argument('--end', type=month, help='Last month (YYYY-MM). Defaults to --start.')
+        parser.add_argument('--book', type=int, help='Only events for this book id.')
+        parser.add_argument('--borrower', type=int, help='Only events for this user id.')
+
+    def handle(self, *args, **options):
+        start = options['start'] or timezone.now().date().replace(day=1)
+        end = next_month(options['end'] or start)
+        if end <= start:
+            raise CommandError('--end must not be before --start.')
+        filters = {f'{key}_id': options[key] for key in ('book', 'borrower') if options[key] is not None}
+
+        report = circulation_report(self.month_start(start), self.month_start(end), **filters)
+        actions = [action for action, _ in LoanEventBase.LOAN_ACTIONS]
+        self.stdout.write(f'{"month":<10}' + ''.join(f'{action:>10}' for action in actions))
+        for partition, counts in report.items():
+            self.stdout.write(f'{partition:%Y-%m}'.ljust(10) + ''.join(f'{counts[action]:>10}' for action in actions))
+
+    def month_start(self, month):
+        # Partitions are split on UTC months.
+        return datetime.datetime.combine(month, datetime.time(), datetime.timezone.utc)
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+TRIGRAM_INDEXES = [
+    ('catalog_book_title_trgm_idx', 'catalog_book', 'title'),
+    ('catalog_genre_name_trgm_idx', 'catalog_genre', 'name'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # icontains compiles to UPPER(col) LIKE UPPER(%s) on PostgreSQL, which
+    # only a trigram index can serve. Other backends have no equivalent.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (UPPER({column}::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bookinstance',
+            index=models.Index(fields=['status', 'due_back'], name='bookinstance_status_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookinstance',
+            index=models.Index(fields=['borrower', 'status', 'due_back'], name='bookinstance_borrower_due_idx'),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS catalog_book_search "
+        "USING fts5(title, summary, isbn, author, genres, tokenize='unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        "INSERT INTO catalog_book_search (rowid, title, summary, isbn, author, genres) "
+        "SELECT b.id, b.title, b.summary, b.isbn, "
+        "COALESCE(a.first_name || ' ' || a.last_name, ''), "
+        "COALESCE((SELECT group_concat(g.name, ' ') FROM catalog_book_genre bg "
+        "JOIN catalog_genre g ON g.id = bg.genre_id WHERE bg.book_id = b.id), '') "
+        "FROM catalog_book b LEFT JOIN catalog_author a ON a.id = b.author_id"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS catalog_book_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0002_bookinstance_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:17
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_copy_counters(apps, schema_editor):
+    Book = apps.get_model('catalog', 'Book')
+    BookInstance = apps.get_model('catalog', 'BookInstance')
+
+    def copies(**filters):
+        counts = (BookInstance.objects.filter(book=OuterRef('pk'), **filters)
+                  .order_by().values('book').annotate(count=Count('pk')).values('count'))
+        return Coalesce(Subquery(counts), 0)
+
+    Book.objects.update(
+        copies_total=copies(),
+        copies_available=copies(status='a'),
+        copies_on_loan=copies(status='o'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0003_book_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='copies_available',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='copies_on_loan',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='copies_total',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_copy_counters, migrations.RunPython.noop),
+    ]
@@ -1,14 +1,16 @@
-from django.db import models
+from django.db import models, transaction
 from django.urls import reverse
-from django.db.models import UniqueConstraint
+from django.db.models import UniqueConstraint, Count, Q
 from django.db.models.functions import Lower
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from datetime import date
 import uuid
 from django.contrib.auth.models import User
 
 class Genre(models.Model):
     name = models.CharField(max_length=200, help_text="Enter a book genre (e.g. Science Fiction, French Poetry etc.)")
+    modified = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -29,6 +31,7 @@ class Language(models.Model):
     name = models.CharField(max_length=200,
                             unique=True,
                             help_text="Enter the book's natural language (e.g. English, French, Japanese etc.)")
+    modified = models.DateTimeField(auto_now=True)
 
     def get_absolute_url(self):
         return reverse('language-detail', args=[str(self.id)])
@@ -53,6 +56,11 @@ class Book(models.Model):
     genre = models.ManyToManyField('Genre', help_text="Select a genre for this book")
     language = models.ForeignKey('Language', on_delete=models.SET_NULL, null=True)
 
+    copies_total = models.PositiveIntegerField(default=0, editable=False)
+    copies_available = models.PositiveIntegerField(default=0, editable=False)
+    copies_on_loan = models.PositiveIntegerField(default=0, editable=False)
+    modified = models.DateTimeField(auto_now=True)
+
     def __str__(self):
         return self.title
 
@@ -66,15 +74,36 @@ class Book(models.Model):
 
     display_genre.short_description = 'Genre'
 
+    COPIES_SUMMARY = {
+        'total': Count('id'),
+        'available': Count('id', filter=Q(status='a')),
+        'on_loan': Count('id', filter=Q(status='o')),
+        'maintenance': Count('id', filter=Q(status='m')),
+        'reserved': Count('id', filter=Q(status='r')),
+    }
+
+    def copies_summary(self):
+        return self.bookinstance_set.aggregate(**self.COPIES_SUMMARY)
+
+    async def acopies_summary(self):
+        return await self.bookinstance_set.aaggregate(**self.COPIES_SUMMARY)
+
     class Meta:
         ordering = ['title']
 
+class BookInstanceQuerySet(models.QuerySet):
+    def overdue(self, today=None):
+        return self.filter(status__exact='o', due_back__lt=today or date.today())
+
 class BookInstance(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, help_text="Unique ID for this particular book across whole library")
     book = models.ForeignKey('Book', on_delete=models.RESTRICT, null=True)
     imprint = models.CharField(max_length=200)
     due_back = models.DateField(null=True, blank=True)
     borrower = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    modified = models.DateTimeField(auto_now=True)
+
+    objects = BookInstanceQuerySet.as_manager()
 
     @property
     def is_overdue(self):
@@ -91,9 +120,17 @@ class BookInstance(models.Model):
 
     status = models.CharField(max_length=1, choices=LOAN_STATUS, blank=True, default='m', help_text='Book availability')
 
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
     class Meta:
         ordering = ["due_back"]
         permissions = (("can_mark_returned", "Set book as returned"),)
+        indexes = [
+            models.Index(fields=['status', 'due_back'], name='bookinstance_status_due_idx'),
+            models.Index(fields=['borrower', 'status', 'due_back'], name='bookinstance_borrower_due_idx'),
+        ]
 
     def __str__(self):
         return f'{self.id} ({self.book.title})'
@@ -107,6 +144,7 @@ class Author(models.Model):
     last_name = models.CharField(max_length=100)
     date_of_birth = models.DateField(null=True, blank=True)
     date_of_death = models.DateField('died', null=True, blank=True)
+    modified = models.DateTimeField(auto_now=True)
 
     def clean(self):
         super().clean()
@@ -138,4 +176,87 @@ class Author(models.Model):
         return f'{self.last_name}, {self.first_name}'
 
     class Meta:
-        ordering = ['last_name']
\ No newline at end of file
+        ordering = ['last_name']
+
+
+class Hold(models.Model):
+    """A patron's place in the FIFO queue for a book.
+
+    When a copy is returned it goes to the oldest waiting hold, see catalog.holds.
+    """
+    book = models.ForeignKey('Book', on_delete=models.CASCADE)
+    patron = models.ForeignKey(User, on_delete=models.CASCADE)
+    placed = models.DateTimeField(default=timezone.now)
+    copy = models.ForeignKey('BookInstance', on_delete=models.SET_NULL, null=True, blank=True)
+    ready = models.DateTimeField(null=True, blank=True)
+
+    HOLD_STATUS = (
+        ('w', 'Waiting'),
+        ('r', 'Ready for pickup'),
+        ('f', 'Fulfilled'),
+        ('c', 'Cancelled'),
+    )
+
+    status = models.CharField(max_length=1, choices=HOLD_STATUS, default='w')
+
+    def __str__(self):
+        return f'{self.patron} ({self.book.title})'
+
+    class Meta:
+        ordering = ['placed', 'id']
+        constraints = [
+            UniqueConstraint(fields=['book', 'patron'], condition=Q(status__in=['w', 'r']),
+                             name='hold_one_active_per_patron'),
+            UniqueConstraint(fields=['copy'], condition=Q(status='r'), name='hold_one_ready_per_copy'),
+        ]
+        indexes = [
+            # Head of a book's queue: an index seek however many holds it has.
+            models.Index(fields=['book', 'status', 'placed', 'id'], name='hold_queue_idx'),
+            models.Index(fields=['patron', 'status'], name='hold_patron_idx'),
+        ]
+
+class LoanEventBase(models.Model):
+    """One checkout, renewal or return.
+
+    Events live in one table per month, created by catalog.ledger; plain ids
+    rather than foreign keys keep the history when copies or users go.
+    """
+    LOAN_ACTIONS = (
+        ('checkout', 'Checkout'),
+        ('renew', 'Renewal'),
+        ('return', 'Return'),
+    )
+
+    action = models.CharField(max_length=8, choices=LOAN_ACTIONS)
+    time = models.DateTimeField(default=timezone.now)
+    copy_id = models.UUIDField()
+    book_id = models.IntegerField(null=True)
+    borrower_id = models.IntegerField(null=True)
+    due_back = models.DateField(null=True)
+
+    class Meta:
+        abstract = True
+
+class PageVisits(models.Model):
+    """Daily hit count for a page, written in batches by catalog.visits."""
+    page = models.CharField(max_length=50)
+    date = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.page} {self.date}: {self.count}'
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=['page', 'date'], name='pagevisits_page_date_unique'),
+        ]
+
+
+class TableVersion(models.Model):
+    """Change counter for a catalog table, used as the validator for list pages."""
+    table = models.CharField(max_length=50, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    modified = models.DateTimeField()
+
+    def __str__(self):
+        return f'{self.table} v{self.version}'
@@ -0,0 +1,190 @@
+from django.core import signing
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import F, Q
+from django.http import Http404
+from django.utils.functional import cached_property
+
+CURSOR_SALT = 'catalog.pagination.cursor'
+
+
+class CursorPage:
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Keyset paginator ordered by one model field plus the primary key.
+
+    Pages are addressed by opaque cursors instead of page numbers, so no
+    COUNT(*) is issued and every page is a single indexed range scan.
+    """
+
+    def __init__(self, queryset, per_page, ordering=None):
+        self.queryset = queryset
+        self.per_page = per_page
+
+        if ordering is None:
+            ordering = (list(queryset.query.order_by) or list(queryset.model._meta.ordering) or ['pk'])[0]
+        self.descending = ordering.startswith('-')
+        self.field_name = ordering.lstrip('-')
+        if self.field_name == 'pk':
+            self.field = queryset.model._meta.pk
+        else:
+            self.field = queryset.model._meta.get_field(self.field_name)
+        self.pk_field = queryset.model._meta.pk
+
+    def _order_by(self, reverse):
+        descending = self.descending != reverse
+        nulls = {'nulls_last': True} if descending else {'nulls_first': True}
+        if descending:
+            return [F(self.field_name).desc(**nulls), '-pk']
+        return [F(self.field_name).asc(**nulls), 'pk']
+
+    def _after(self, value, pk, reverse):
+        descending = self.descending != reverse
+        beyond = 'lt' if descending else 'gt'
+
+        if value is None:
+            after = Q(pk__lt=pk) if descending else Q(pk__gt=pk)
+            after &= Q(**{f'{self.field_name}__isnull': True})
+            if not descending:
+                after |= Q(**{f'{self.field_name}__isnull': False})
+            return after
+
+        after = Q(**{f'{self.field_name}__{beyond}': value})
+        after |= Q(**{self.field_name: value, f'pk__{beyond}': pk})
+        if descending:
+            after |= Q(**{f'{self.field_name}__isnull': True})
+        return after
+
+    def encode_cursor(self, obj, reverse):
+        value = getattr(obj, self.field.attname)
+        payload = [
+            reverse,
+            None if value is None else self.field.value_to_string(obj),
+            self.pk_field.value_to_string(obj),
+        ]
+        return signing.dumps(payload, salt=CURSOR_SALT, compress=True)
+
+    def decode_cursor(self, cursor):
+        try:
+            reverse, value, pk = signing.loads(cursor, salt=CURSOR_SALT)
+            if value is not None:
+                value = self.field.to_python(value)
+            return reverse, value, self.pk_field.to_python(pk)
+        except (signing.BadSignature, TypeError, ValueError) as e:
+            raise Http404('Invalid cursor') from e
+
+    def _page_queryset(self, cursor):
+        reverse = False
+        queryset = self.queryset
+        if cursor:
+            reverse, value, pk = self.decode_cursor(cursor)
+            queryset = queryset.filter(self._after(value, pk, reverse))
+        return queryset.order_by(*self._order_by(reverse))[:self.per_page + 1], reverse
+
+    def page(self, cursor=None):
+        queryset, reverse = self._page_queryset(cursor)
+        return self._make_page(list(queryset), cursor, reverse)
+
+    async def apage(self, cursor=None):
+        queryset, reverse = self._page_queryset(cursor)
+        return self._make_page([obj async for obj in queryset], cursor, reverse)
+
+    def _make_page(self, rows, cursor, reverse):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            if has_more or reverse:
+                next_cursor = self.encode_cursor(rows[-1], False)
+            if (has_more and reverse) or (cursor and not reverse):
+                previous_cursor = self.encode_cursor(rows[0], True)
+        return CursorPage(rows, next_cursor, previous_cursor)
+
+
+class CursorPaginationMixin:
+    cursor_pagination = False
+    cursor_query_param = 'cursor'
+
+    def use_cursor_pagination(self):
+        return self.cursor_pagination or self.cursor_query_param in self.request.GET
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.use_cursor_pagination():
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = CursorPaginator(queryset, page_size)
+        page = paginator.page(self.request.GET.get(self.cursor_query_param))
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['cursor_pagination'] = isinstance(context.get('paginator'), CursorPaginator)
+        return context
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that reads the row count of an unfiltered table from planner statistics.
+
+    Small tables and filtered querysets are still counted exactly.
+    """
+
+    exact_count_threshold = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if getattr(queryset, 'query', None) is None or queryset.query.where:
+            return super().count
+
+        estimate = estimated_row_count(queryset.model, queryset.db)
+        if estimate is None or estimate < self.exact_count_threshold:
+            return super().count
+        return estimate
+
+
+def estimated_row_count(model, using='default'):
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+        elif connection.vendor == 'mysql':
+            cursor.execute(
+                'SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s',
+                [table],
+            )
+        elif connection.vendor == 'sqlite':
+            cursor.execute(f'SELECT MAX(rowid) FROM {connection.ops.quote_name(table)}')
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None or row[0] is None:
+        return 0
+    # reltuples is -1 on PostgreSQL until the table has been analyzed.
+    return row[0] if row[0] >= 0 else None
@@ -0,0 +1,126 @@
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .models import Book
+
+SEARCH_TABLE = 'catalog_book_search'
+SEARCH_COLUMNS = ('title', 'summary', 'isbn', 'author', 'genres')
+
+
+def search_index_enabled():
+    return connection.vendor == 'sqlite'
+
+
+def match_expression(query):
+    terms = re.findall(r'\w+', query)
+    return ' '.join('"%s"*' % term for term in terms)
+
+
+def _index_row(book):
+    author = f'{book.author.first_name} {book.author.last_name}' if book.author else ''
+    genres = ' '.join(genre.name for genre in book.genre.all())
+    return (book.pk, book.title, book.summary, book.isbn, author, genres)
+
+
+def index_books(books):
+    if not search_index_enabled():
+        return
+    rows = [_index_row(book) for book in books]
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [(row[0],) for row in rows])
+        cursor.executemany(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, {", ".join(SEARCH_COLUMNS)}) VALUES (%s, %s, %s, %s, %s, %s)',
+            rows,
+        )
+
+
+def reindex_books(queryset, batch_size=1000):
+    if not search_index_enabled():
+        return 0
+    queryset = queryset.select_related('author').prefetch_related('genre').order_by('pk')
+    last_pk = 0
+    indexed = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return indexed
+        index_books(batch)
+        indexed += len(batch)
+        last_pk = batch[-1].pk
+
+
+def remove_books(book_ids):
+    if not search_index_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [(pk,) for pk in book_ids])
+
+
+def rebuild_index(batch_size=1000):
+    if not search_index_enabled():
+        return 0
+    # One transaction, so searches meanwhile see the old index rather than
+    # an empty or partial one.
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        indexed = reindex_books(Book.objects.all(), batch_size)
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')")
+    return indexed
+
+
+class BookSearchResults:
+    """Ranked full-text matches, sliceable like a queryset for Paginator."""
+
+    ordered = True
+
+    def __init__(self, query):
+        self.match = match_expression(query)
+
+    def count(self):
+        if not self.match:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s', [self.match])
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, k):
+        if not isinstance(k, slice):
+            return self[k:k + 1][0]
+        if not self.match:
+            return []
+        start = k.start or 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s ORDER BY rank LIMIT %s OFFSET %s',
+                [self.match, k.stop - start, start],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        books = Book.objects.select_related('author').in_bulk(ids)
+        return [books[pk] for pk in ids if pk in books]
+
+
+def search_books(query):
+    if search_index_enabled():
+        return BookSearchResults(query)
+
+    terms = re.findall(r'\w+', query)
+    if not terms:
+        return Book.objects.none()
+    condition = Q()
+    for term in terms:
+        condition &= (
+            Q(title__icontains=term) | Q(summary__icontains=term) | Q(isbn__icontains=term)
+            | Q(author__first_name__icontains=term) | Q(author__last_name__icontains=term)
+            | Q(genre__name__icontains=term)
+        )
+    matches = Book.objects.filter(condition).values('pk')
+    return Book.objects.filter(pk__in=matches).select_related('author')
@@ -0,0 +1,215 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Book, Author, BookInstance, Genre, Language
+from .statistics import invalidate_library_stats
+from .fragments import bump_model_version
+from .counters import apply_copy_change
+from .holds import allocate_copies, fulfil_holds, requeue_holds
+from .ledger import loan_action, loan_event, write_loan_events
+from .autocomplete import AUTOCOMPLETE_INDEXES, index_for_model
+from . import search
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+@receiver(post_save, sender=BookInstance)
+@receiver(post_delete, sender=BookInstance)
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def library_stats_changed(sender, **kwargs):
+    invalidate_library_stats()
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+@receiver(post_save, sender=BookInstance)
+@receiver(post_delete, sender=BookInstance)
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+@receiver(post_save, sender=Language)
+@receiver(post_delete, sender=Language)
+def model_changed(sender, **kwargs):
+    bump_model_version(sender._meta.model_name)
+
+
+@receiver(m2m_changed, sender=Book.genre.through)
+def book_genres_version_changed(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_model_version('book', 'genre')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, update_fields=None, **kwargs):
+    # Logins only touch last_login, which nothing in the catalog shows.
+    if update_fields is None or set(AUTOCOMPLETE_INDEXES['borrowers'].fields) & set(update_fields):
+        bump_model_version('user')
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+@receiver(post_save, sender=Language)
+@receiver(post_delete, sender=Language)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def autocomplete_changed(sender, instance, signal, update_fields=None, **kwargs):
+    index = index_for_model(sender)
+    if update_fields is not None and not set(index.fields) & set(update_fields):
+        if sender is not User:
+            # model_changed bumped the version all the same.
+            index.changed()
+        return
+    if signal is post_delete:
+        index.changed(instance.pk)
+    else:
+        index.changed(instance.pk, [getattr(instance, field) for field in index.fields])
+
+
+@receiver(m2m_changed, sender=Book.genre.through)
+def autocomplete_genres_changed(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        AUTOCOMPLETE_INDEXES['books'].changed()
+        AUTOCOMPLETE_INDEXES['genres'].changed()
+
+
+# Book detail pages show author, language and genre names, so a change to
+# any of them refreshes the book's modified timestamp.
+@receiver(post_save, sender=Author)
+@receiver(post_save, sender=Genre)
+@receiver(post_save, sender=Language)
+@receiver(pre_delete, sender=Genre)
+@receiver(pre_delete, sender=Language)
+def related_changed(sender, instance, created=False, raw=False, **kwargs):
+    if created or raw:
+        return
+    lookup = 'genre' if sender is Genre else sender._meta.model_name
+    Book.objects.filter(**{lookup: instance}).update(modified=timezone.now())
+
+
+@receiver(m2m_changed, sender=Book.genre.through)
+def book_genres_touched(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        books = Book.objects.filter(pk=instance.pk)
+    elif action == 'pre_clear':
+        books = Book.objects.filter(genre=instance)
+    else:
+        books = Book.objects.filter(pk__in=pk_set)
+    books.update(modified=timezone.now())
+
+
+@receiver(post_save, sender=Book)
+def book_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.reindex_books(Book.objects.filter(pk=instance.pk))
+
+
+@receiver(post_delete, sender=Book)
+def book_deleted(sender, instance, **kwargs):
+    search.remove_books([instance.pk])
+
+
+@receiver(m2m_changed, sender=Book.genre.through)
+def book_genres_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            search.reindex_books(Book.objects.filter(pk=instance.pk))
+    elif action == 'pre_clear':
+        instance._cleared_book_ids = list(instance.book_set.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        search.reindex_books(Book.objects.filter(pk__in=instance.__dict__.pop('_cleared_book_ids', [])))
+    elif action in ('post_add', 'post_remove'):
+        search.reindex_books(Book.objects.filter(pk__in=pk_set))
+
+
+@receiver(post_save, sender=Author)
+def author_saved(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        search.reindex_books(Book.objects.filter(author=instance))
+
+
+@receiver(post_save, sender=Genre)
+def genre_saved(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        search.reindex_books(Book.objects.filter(genre=instance))
+
+
+# Deleting a genre drops its m2m rows without sending m2m_changed, so the
+# books that carried it are collected first and reindexed afterwards.
+# Authors are indexed too, although RESTRICT only lets bookless ones go.
+@receiver(pre_delete, sender=Genre)
+@receiver(pre_delete, sender=Author)
+def indexed_relation_deleting(sender, instance, **kwargs):
+    lookup = 'genre' if sender is Genre else 'author'
+    instance._indexed_book_ids = list(Book.objects.filter(**{lookup: instance}).values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Genre)
+@receiver(post_delete, sender=Author)
+def indexed_relation_deleted(sender, instance, **kwargs):
+    book_ids = instance.__dict__.pop('_indexed_book_ids', None)
+    if book_ids:
+        search.reindex_books(Book.objects.filter(pk__in=book_ids))
+
+
+def _locked_copy_row(pk):
+    # Runs inside the save or delete transaction: the lock keeps a concurrent
+    # save of the same copy from applying its counter delta from the same
+    # old state.
+    return BookInstance.objects.select_for_update().filter(pk=pk).values_list(
+        'book_id', 'status', 'borrower_id', 'due_back',
+    ).first()
+
+
+@receiver(pre_save, sender=BookInstance)
+def copy_state_before_save(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        return
+    row = _locked_copy_row(instance.pk)
+    instance._loaded_copy_state = row and row[:2]
+    instance._loaded_loan = row and row[2:]
+
+
+@receiver(post_save, sender=BookInstance)
+def copy_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old_state = None if created else instance.__dict__.pop('_loaded_copy_state', None)
+    new_state = (instance.book_id, instance.status)
+    old_loan = (None, None) if created else instance.__dict__.pop('_loaded_loan', None) or (None, None)
+    action = loan_action(old_state and old_state[1], old_loan[1], instance.status, instance.due_back)
+    if action:
+        loan = old_loan if action == 'return' else (instance.borrower_id, instance.due_back)
+        write_loan_events([loan_event(action, instance, *loan)])
+    if old_state != new_state:
+        apply_copy_change(old_state, new_state)
+        if instance.status == 'a':
+            allocate_copies([instance])
+        elif instance.status == 'o' and old_state and old_state[1] == 'r':
+            fulfil_holds([instance])
+
+
+@receiver(pre_delete, sender=BookInstance)
+def copy_state_before_delete(sender, instance, **kwargs):
+    row = _locked_copy_row(instance.pk)
+    instance._loaded_copy_state = row and row[:2]
+    if row and row[1] == 'r':
+        requeue_holds([instance])
+
+
+@receiver(post_delete, sender=BookInstance)
+def copy_deleted(sender, instance, **kwargs):
+    # A copy another transaction already deleted has nothing left to count.
+    apply_copy_change(instance.__dict__.pop('_loaded_copy_state', None), None)
@@ -0,0 +1,70 @@
+(function () {
+  'use strict';
+
+  function choice(name, id, label) {
+    var span = document.createElement('span');
+    span.className = 'autocomplete-choice';
+    var input = document.createElement('input');
+    input.type = 'hidden';
+    input.name = name;
+    input.value = id;
+    var remove = document.createElement('a');
+    remove.href = '#';
+    remove.className = 'autocomplete-remove';
+    remove.setAttribute('aria-label', 'Remove');
+    remove.textContent = '×';
+    span.appendChild(input);
+    span.appendChild(document.createTextNode(label + ' '));
+    span.appendChild(remove);
+    return span;
+  }
+
+  function setUp(widget) {
+    var input = widget.querySelector('input[type=text]');
+    var options = widget.querySelector('datalist');
+    var selected = widget.querySelector('.autocomplete-selected');
+    var ids = {};
+    var timer = null;
+
+    input.addEventListener('input', function () {
+      var id = ids[input.value];
+      if (id !== undefined) {
+        if (!widget.hasAttribute('data-multiple')) {
+          selected.innerHTML = '';
+        }
+        selected.appendChild(choice(widget.dataset.name, id, input.value));
+        input.value = '';
+        return;
+      }
+      clearTimeout(timer);
+      timer = setTimeout(function () {
+        if (!input.value.trim()) {
+          return;
+        }
+        fetch(widget.dataset.url + '?q=' + encodeURIComponent(input.value), {credentials: 'same-origin'})
+          .then(function (response) { return response.json(); })
+          .then(function (data) {
+            ids = {};
+            options.innerHTML = '';
+            data.results.forEach(function (result) {
+              var option = document.createElement('option');
+              option.value = result.text;
+              ids[result.text] = result.id;
+              options.appendChild(option);
+            });
+          });
+      }, 150);
+    });
+
+    selected.addEventListener('click', function (event) {
+      if (event.target.classList.contains('autocomplete-remove')) {
+        event.preventDefault();
+        event.target.parentNode.remove();
+      }
+    });
+  }
+
+  document.addEventListener('DOMContentLoaded', function () {
+    document.querySelectorAll('.autocomplete').forEach(setUp);
+  });
+})();
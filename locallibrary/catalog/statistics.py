@@ -0,0 +1,78 @@
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from .fragments import initial_version
+from .models import Book, Author, BookInstance, Genre
+
+STATS_CACHE_KEY = 'catalog:library-stats'
+STATS_VERSION_KEY = 'catalog:library-stats-version'
+STATS_CACHE_TIMEOUT = 60 * 60
+
+
+def _count_sql(queryset):
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    return f'(SELECT COUNT(*) FROM ({sql}) U)', params
+
+
+def compute_library_stats(search_for_book, search_for_genre):
+    counters = {
+        'num_books': Book.objects.all(),
+        'num_instances': BookInstance.objects.all(),
+        'num_instances_available': BookInstance.objects.filter(status__exact='a'),
+        'num_authors': Author.objects.all(),
+        'num_books_contain_search': Book.objects.filter(title__icontains=search_for_book),
+        'num_genres_contain_search': Genre.objects.filter(name__icontains=search_for_genre),
+    }
+
+    columns = []
+    params = []
+    for queryset in counters.values():
+        sql, query_params = _count_sql(queryset)
+        columns.append(sql)
+        params.extend(query_params)
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT ' + ', '.join(columns), params)
+        row = cursor.fetchone()
+
+    return dict(zip(counters, row))
+
+
+def stats_version():
+    return cache.get_or_set(STATS_VERSION_KEY, initial_version, None)
+
+
+def bump_stats_version():
+    # Never restart an evicted counter at a value it has had before, or
+    # stats cached under that version would come back.
+    cache.add(STATS_VERSION_KEY, initial_version(), None)
+    cache.incr(STATS_VERSION_KEY)
+
+
+def invalidate_library_stats():
+    # After commit, or a concurrent request could cache counts from before
+    # the write under the new version.
+    transaction.on_commit(bump_stats_version, robust=True)
+
+
+def get_library_stats(search_for_book, search_for_genre):
+    key = f'{STATS_CACHE_KEY}:{search_for_book}:{search_for_genre}'
+    version = stats_version()
+
+    stats = cache.get(key, version=version)
+    if stats is None:
+        stats = compute_library_stats(search_for_book, search_for_genre)
+        cache.set(key, stats, STATS_CACHE_TIMEOUT, version=version)
+    return stats
+
+
+async def aget_library_stats(search_for_book, search_for_genre):
+    key = f'{STATS_CACHE_KEY}:{search_for_book}:{search_for_genre}'
+    version = await cache.aget_or_set(STATS_VERSION_KEY, initial_version, None)
+
+    stats = await cache.aget(key, version=version)
+    if stats is None:
+        stats = await sync_to_async(compute_library_stats)(search_for_book, search_for_genre)
+        await cache.aset(key, stats, STATS_CACHE_TIMEOUT, version=version)
+    return stats
@@ -0,0 +1,24 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryCountMixin:
+    """Assertions that a page's query count does not depend on how many rows it shows."""
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return captured
+
+    def assertQueryCountConstant(self, url, add_rows):
+        before = self.count_queries(url)
+        add_rows()
+        after = self.count_queries(url)
+        self.assertEqual(
+            len(before), len(after),
+            'Query count for %s grew from %d to %d when more rows were shown:\n%s' % (
+                url, len(before), len(after), '\n'.join(q['sql'] for q in after.captured_queries)),
+        )
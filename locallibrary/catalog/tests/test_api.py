@@ -0,0 +1,125 @@
+from django.test import TestCase
+
+from catalog.models import Author, BookInstance, Book, Genre, Language
+from django.urls import reverse
+from django.contrib.auth.models import User, Permission
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+import gzip
+import json
+
+
+class CatalogApiTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(first_name='Ursula', last_name='Le Guin')
+        cls.genre = Genre.objects.create(name='Fantasy')
+        cls.language = Language.objects.create(name='English')
+        cls.books = []
+        for book_num in range(5):
+            book = Book.objects.create(title='Book %s' % book_num, summary='summary', isbn='ABCDEFG',
+                                       author=cls.author, language=cls.language)
+            book.genre.add(cls.genre)
+            BookInstance.objects.create(book=book, imprint='Imprint', status='a')
+            cls.books.append(book)
+
+        cls.librarian = User.objects.create_user(username='librarian', password='secret')
+        cls.librarian.user_permissions.add(*Permission.objects.filter(codename__in=[
+            'add_book', 'change_book', 'delete_book', 'can_mark_returned']))
+        cls.reader = User.objects.create_user(username='reader', password='secret')
+
+    def get(self, resource, **params):
+        resp = self.client.get(reverse('api-collection', args=[resource]), params)
+        return resp, json.loads(resp.content)
+
+    def send(self, method, url, data):
+        return getattr(self.client, method)(url, json.dumps(data), content_type='application/json')
+
+    def test_sparse_fields(self):
+        resp, data = self.get('books', fields='title,author_name,genre')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(data['results'][0], {'title': 'Book 0', 'author_name': 'Le Guin, Ursula',
+                                              'genre': [self.genre.pk]})
+
+        resp, data = self.get('books', fields='title,secret')
+        self.assertEqual(resp.status_code, 400)
+
+    def test_borrower_needs_permission(self):
+        resp, data = self.get('bookinstances')
+        self.assertNotIn('borrower', data['results'][0])
+        self.assertEqual(self.get('bookinstances', fields='borrower')[0].status_code, 400)
+
+        self.client.login(username='librarian', password='secret')
+        resp, data = self.get('bookinstances')
+        self.assertIn('borrower', data['results'][0])
+
+    def test_cursor_pagination(self):
+        resp, data = self.get('books', fields='id', limit=2)
+        ids = [row['id'] for row in data['results']]
+        while data['next']:
+            data = json.loads(self.client.get(data['next']).content)
+            ids += [row['id'] for row in data['results']]
+        self.assertEqual(ids, [book.pk for book in self.books])
+
+    def test_batch_fetch_by_ids(self):
+        wanted = [self.books[3].pk, 999, self.books[1].pk]
+        resp, data = self.get('books', ids=','.join(map(str, wanted)), fields='id')
+        self.assertEqual([row['id'] for row in data['results']], [self.books[3].pk, self.books[1].pk])
+
+    def test_query_count_is_constant(self):
+        for resource in ['books', 'bookinstances']:
+            with CaptureQueriesContext(connection) as small:
+                self.get(resource, limit=1)
+            with CaptureQueriesContext(connection) as large:
+                resp, data = self.get(resource, limit=5)
+            self.assertEqual(len(data['results']), 5)
+            self.assertEqual(len(small), len(large), resource)
+
+    def test_gzip_and_compact(self):
+        resp = self.client.get(reverse('api-collection', args=['books']), headers={'accept-encoding': 'gzip'})
+        self.assertEqual(resp['Content-Encoding'], 'gzip')
+        body = gzip.decompress(resp.content)
+        self.assertNotIn(b'": ', body)
+
+    def test_detail(self):
+        url = reverse('api-item', args=['books', self.books[0].pk])
+        data = json.loads(self.client.get(url + '?fields=title,copies_available').content)
+        self.assertEqual(data, {'title': 'Book 0', 'copies_available': 1})
+        self.assertEqual(self.client.get(reverse('api-item', args=['books', 'x'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('api-item', args=['bookinstances', 999])).status_code, 404)
+
+    def test_writes_need_permissions(self):
+        url = reverse('api-collection', args=['books'])
+        payload = {'title': 'New', 'summary': 's', 'isbn': '123', 'author': self.author.pk,
+                   'genre': [self.genre.pk], 'language': self.language.pk}
+        self.assertEqual(self.send('post', url, payload).status_code, 403)
+
+        self.client.login(username='reader', password='secret')
+        self.assertEqual(self.send('post', url, payload).status_code, 403)
+
+        self.client.login(username='librarian', password='secret')
+        resp = self.send('post', url, payload)
+        self.assertEqual(resp.status_code, 201)
+        book = Book.objects.get(pk=json.loads(resp.content)['id'])
+        self.assertEqual(list(book.genre.all()), [self.genre])
+
+        resp = self.send('post', url, {'title': 'Missing fields'})
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('summary', json.loads(resp.content)['errors'])
+
+    def test_patch_and_delete(self):
+        self.client.login(username='librarian', password='secret')
+        book = self.books[0]
+        url = reverse('api-item', args=['books', book.pk])
+
+        resp = self.send('patch', url, {'title': 'Renamed'})
+        self.assertEqual(resp.status_code, 200)
+        book.refresh_from_db()
+        self.assertEqual(book.title, 'Renamed')
+        self.assertEqual(list(book.genre.all()), [self.genre])
+
+        self.assertEqual(self.client.delete(url).status_code, 409)
+        book.bookinstance_set.all().delete()
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertFalse(Book.objects.filter(pk=book.pk).exists())
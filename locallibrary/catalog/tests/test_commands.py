@@ -0,0 +1,255 @@
+from django.test import TestCase, TransactionTestCase
+
+from catalog.models import Author, Book, BookInstance, Genre, Language, PageVisits
+from catalog.visits import pending_visits, record_visit
+from catalog.ledger import LoanLedger, existing_partitions, next_month, partition_month
+from django.core.cache import cache
+from catalog.fragments import model_version
+from django.core.management import call_command, CommandError
+from django.core import mail
+from django.utils import timezone
+from django.contrib.auth.models import User
+import datetime
+import io
+import json
+import os
+import tempfile
+
+class ImportCatalogCommandTest(TestCase):
+
+    def setUp(self):
+        Genre.objects.create(name='Fantasy')
+        Author.objects.create(first_name='Ursula', last_name='Le Guin')
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_import_csv(self):
+        path = self.write('catalog.csv', (
+            'title,summary,isbn,author,genres,language,copies,imprint\n'
+            'A Wizard of Earthsea,A young mage,9780553383041,"Le Guin, Ursula",fantasy; Coming of age,English,2,Parnassus\n'
+            'Dune,Spice,9780441013593,"Herbert, Frank",Science Fiction,english,1,Chilton\n'
+            'Untitled,,,,,,0,\n'
+        ))
+        out = io.StringIO()
+        call_command('import_catalog', path, batch_size=2, stdout=out)
+
+        self.assertEqual(Book.objects.count(), 3)
+        self.assertEqual(Author.objects.count(), 2)
+        self.assertEqual(Genre.objects.count(), 3)
+        self.assertEqual(Language.objects.count(), 1)
+        self.assertEqual(BookInstance.objects.count(), 3)
+
+        earthsea = Book.objects.get(title='A Wizard of Earthsea')
+        self.assertEqual(str(earthsea.author), 'Le Guin, Ursula')
+        self.assertEqual(sorted(g.name for g in earthsea.genre.all()), ['Coming of age', 'Fantasy'])
+        self.assertEqual(earthsea.bookinstance_set.count(), 2)
+        self.assertEqual((earthsea.copies_total, earthsea.copies_available), (2, 2))
+        self.assertIn('rows/sec', out.getvalue())
+
+    def test_import_jsonl_resumes_from_progress_file(self):
+        rows = [{'title': 'Book %s' % n, 'author': 'Smith, John', 'genres': ['Poetry'], 'copies': 1} for n in range(5)]
+        path = self.write('catalog.jsonl', '\n'.join(json.dumps(row) for row in rows))
+        progress = self.write('progress', '3')
+
+        call_command('import_catalog', path, progress_file=progress, stdout=io.StringIO())
+
+        self.assertEqual(list(Book.objects.values_list('title', flat=True)), ['Book 3', 'Book 4'])
+        with open(progress) as f:
+            self.assertEqual(f.read(), '5')
+
+    def test_malformed_rows_report_line(self):
+        header = 'title,author,copies\n'
+        cases = [
+            ('missing_title.csv', header + 'Dune,"Herbert, Frank",1\n,"Herbert, Frank",1\n', 'Line 3: missing title.'),
+            ('bad_copies.csv', header + 'Dune,"Herbert, Frank",two\n', "Line 2: copies must be a non-negative integer, got 'two'."),
+            ('bad_copies.jsonl', '{"title": "Dune"}\n\n{"title": "Emma", "copies": 1.5}\n', 'Line 3: copies must be'),
+            ('bad_json.jsonl', '{"title": "Dune"}\n{"title": \n', 'Line 2: invalid JSON'),
+            ('long_isbn.jsonl', '{"title": "Dune", "isbn": 97804410135930}\n', 'Line 1: isbn is longer than 13 characters.'),
+            ('long_genre.csv', 'title,genres\nDune,Fiction;' + 'x' * 201 + '\n', 'Line 2: genre is longer than 200 characters.'),
+        ]
+        for name, content, message in cases:
+            with self.subTest(name):
+                with self.assertRaisesMessage(CommandError, message):
+                    call_command('import_catalog', self.write(name, content), batch_size=1, stdout=io.StringIO())
+        self.assertEqual(list(Book.objects.values_list('title', flat=True).distinct()), ['Dune'])
+
+    def test_failed_import_invalidates_committed_batches(self):
+        path = self.write('catalog.csv', 'title,copies\nDune,1\nEmma,many\n')
+        version = model_version('book')
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(CommandError):
+                call_command('import_catalog', path, batch_size=1, stdout=io.StringIO())
+        self.assertGreater(model_version('book'), version)
+
+
+class ExportCatalogCommandTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(first_name='John', last_name='Smith')
+        for book_num in range(5):
+            Book.objects.create(title='Book %s' % book_num, summary='summary', isbn='ABCDEFG', author=author)
+
+    def test_export_books_in_small_chunks(self):
+        out = io.StringIO()
+        with self.assertNumQueries(1 + 3):
+            call_command('export_catalog', 'books', format='jsonl', chunk_size=2, stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([row['title'] for row in rows], ['Book %s' % n for n in range(5)])
+        self.assertEqual(rows[0]['author'], 'Smith, John')
+
+
+class ReconcileCopyCountersCommandTest(TestCase):
+
+    def test_fixes_drift(self):
+        book = Book.objects.create(title='Book', summary='summary', isbn='ABCDEFG')
+        for status in 'aaom':
+            BookInstance.objects.create(book=book, imprint='Imprint', status=status)
+        BookInstance.objects.filter(status='m').update(status='a')
+        Book.objects.create(title='Other', summary='summary', isbn='ABCDEFG')
+
+        out = io.StringIO()
+        call_command('reconcile_copy_counters', dry_run=True, stdout=out)
+        self.assertIn('Checked 2 books', out.getvalue())
+        self.assertIn('found 1', out.getvalue())
+        book.refresh_from_db()
+        self.assertEqual(book.copies_available, 2)
+
+        out = io.StringIO()
+        call_command('reconcile_copy_counters', stdout=out)
+        self.assertIn('fixed 1', out.getvalue())
+        book.refresh_from_db()
+        self.assertEqual((book.copies_total, book.copies_available, book.copies_on_loan), (4, 3, 1))
+
+
+class ScanOverdueCommandTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        book = Book.objects.create(title='Overdue Book', summary='summary', isbn='ABCDEFG')
+        past = datetime.date.today() - datetime.timedelta(days=3)
+        for username, email, loans in [('alice', 'alice@example.com', 3), ('bob', 'bob@example.com', 1), ('carol', '', 2)]:
+            user = User.objects.create_user(username=username, email=email, password='12345')
+            for _ in range(loans):
+                BookInstance.objects.create(book=book, imprint='Imprint', status='o', borrower=user, due_back=past)
+        BookInstance.objects.create(book=book, imprint='Imprint', status='o', borrower=user,
+                                    due_back=datetime.date.today() + datetime.timedelta(days=3))
+
+    def test_sends_one_digest_per_borrower(self):
+        out = io.StringIO()
+        call_command('scan_overdue', send_batch=1, stdout=out)
+
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['alice@example.com', 'bob@example.com'])
+        alice = next(message for message in mail.outbox if message.to == ['alice@example.com'])
+        self.assertEqual(alice.body.count('Overdue Book (due'), 3)
+        self.assertIn('Scanned 6 overdue loans for 3 borrowers', out.getvalue())
+        self.assertIn('sent 2 digests, skipped 1', out.getvalue())
+
+    def test_dry_run(self):
+        out = io.StringIO()
+        call_command('scan_overdue', dry_run=True, stdout=out)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertIn('sent 0 digests', out.getvalue())
+
+
+class BenchmarkDbConcurrencyCommandTest(TransactionTestCase):
+    # The database is copied with the SQLite backup API, which needs it outside a transaction.
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # The command registers a temporary connection alias per mode.
+        cls.databases = cls.databases | {'benchmark_default', 'benchmark_tuned'}
+
+
+    def test_compares_default_and_tuned_settings(self):
+        book = Book.objects.create(title='Book', summary='summary', isbn='ABCDEFG')
+        BookInstance.objects.create(book=book, imprint='Imprint', status='o', due_back=datetime.date.today())
+
+        out = io.StringIO()
+        call_command('benchmark_db_concurrency', threads=2, operations=20, write_ratio=0.5, stdout=out)
+        rows = [line.split() for line in out.getvalue().splitlines()[1:]]
+        self.assertEqual([row[0] for row in rows], ['default', 'tuned'])
+        self.assertEqual([row[-1] for row in rows], ['0', '0'])
+        self.assertEqual(BookInstance.objects.get().due_back, datetime.date.today())
+
+
+class FlushVisitsCommandTest(TestCase):
+
+    def test_flush(self):
+        cache.clear()
+        record_visit('index')
+        record_visit('index')
+        out = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('flush_visits', stdout=out)
+        self.assertIn('Flushed 2 visits', out.getvalue())
+        self.assertEqual(PageVisits.objects.get().count, 2)
+        self.assertFalse(pending_visits())
+
+
+class BenchmarkCatalogCommandTest(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def run_benchmark(self, **options):
+        call_command('benchmark_catalog', current_db=True, books=20, copies=2, users=5, genres=3,
+                     iterations=1, only=['book'], stdout=io.StringIO(), **options)
+
+    def test_seeds_measures_and_compares(self):
+        output = os.path.join(self.tmpdir.name, 'results.json')
+        self.run_benchmark(output=output)
+
+        self.assertEqual(Book.objects.count(), 20)
+        self.assertEqual(BookInstance.objects.count(), 40)
+        book = Book.objects.first()
+        self.assertEqual(book.copies_total, 2)
+
+        with open(output) as f:
+            results = json.load(f)['results']
+        self.assertIn('book-detail', results)
+        self.assertIn('admin:catalog_book_changelist', results)
+        self.assertEqual(results['book-detail']['status'], 200)
+        self.assertGreater(results['book-detail']['queries'], 0)
+
+        results['book-detail']['queries'] -= 1
+        baseline = os.path.join(self.tmpdir.name, 'baseline.json')
+        with open(baseline, 'w') as f:
+            json.dump({'results': results}, f)
+        cache.clear()
+        with self.assertRaisesMessage(CommandError, 'book-detail'):
+            self.run_benchmark(baseline=baseline, keepdb=True)
+
+
+class LoanReportCommandTest(TestCase):
+
+    def test_report(self):
+        book = Book.objects.create(title='Report Book', summary='summary', isbn='ABCDEFG')
+        copy = BookInstance.objects.create(book=book, imprint='Imprint', status='a')
+        user = User.objects.create_user(username='reader', password='12345')
+        ledger = LoanLedger()
+        ledger.record('checkout', copy, user.pk, datetime.date(2032, 4, 1),
+                      datetime.datetime(2032, 3, 10, tzinfo=datetime.timezone.utc))
+        ledger.record('return', copy, user.pk, datetime.date(2032, 4, 1),
+                      datetime.datetime(2032, 4, 2, tzinfo=datetime.timezone.utc))
+        ledger.flush()
+
+        out = io.StringIO()
+        call_command('loan_report', '--start=2032-03', '--end=2032-04', f'--book={book.pk}', stdout=out)
+        lines = out.getvalue().split()
+        self.assertEqual(lines[:4], ['month', 'checkout', 'renew', 'return'])
+        self.assertEqual(lines[4:], ['2032-03', '1', '0', '0', '2032-04', '0', '0', '1'])
+
+    def test_create_partitions_ahead(self):
+        call_command('create_loan_partitions', months=2, stdout=io.StringIO())
+        call_command('create_loan_partitions', months=2, stdout=io.StringIO())
+        month = partition_month(timezone.now())
+        self.assertTrue({month, next_month(month)} <= set(existing_partitions()))
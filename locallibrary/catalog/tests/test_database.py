@@ -0,0 +1,208 @@
+import os
+import sqlite3
+import tempfile
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.db import connection, connections, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from catalog.models import Author, Book, Genre, Hold, PageVisits, TableVersion
+from locallibrary import replicas
+from locallibrary.caches import cache_settings
+from locallibrary.database import database_settings, replica_settings
+
+
+class DatabaseSettingsTest(SimpleTestCase):
+
+    def test_sqlite_defaults(self):
+        database = database_settings(Path('/srv/app'), {})
+        self.assertEqual(database['NAME'], '/srv/app/db.sqlite3')
+        self.assertEqual(database['CONN_MAX_AGE'], 60)
+        self.assertTrue(database['CONN_HEALTH_CHECKS'])
+        self.assertEqual(database['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+        self.assertNotIn('journal_mode', database['OPTIONS']['init_command'])
+        self.assertIn('PRAGMA busy_timeout=5000', database['OPTIONS']['init_command'])
+
+    def test_sqlite_journal_mode_opt_in(self):
+        database = database_settings(Path('/srv/app'), {'LOCALLIBRARY_DB_SQLITE_JOURNAL_MODE': 'WAL'})
+        self.assertIn('PRAGMA journal_mode=WAL', database['OPTIONS']['init_command'])
+
+    def test_sqlite_overrides(self):
+        database = database_settings(Path('/srv/app'), {
+            'LOCALLIBRARY_DB_SQLITE_BUSY_TIMEOUT': '20000',
+            'LOCALLIBRARY_DB_CONN_MAX_AGE': '0',
+        })
+        self.assertIn('PRAGMA busy_timeout=20000', database['OPTIONS']['init_command'])
+        self.assertEqual(database['CONN_MAX_AGE'], 0)
+
+        database = database_settings(Path('/srv/app'), {'LOCALLIBRARY_DB_SQLITE_TUNING': 'off'})
+        self.assertEqual(database['OPTIONS'], {})
+
+    def test_postgresql_pool(self):
+        database = database_settings(Path('/srv/app'), {
+            'LOCALLIBRARY_DB_ENGINE': 'postgresql',
+            'LOCALLIBRARY_DB_HOST': 'db',
+            'LOCALLIBRARY_DB_POOL': '1',
+            'LOCALLIBRARY_DB_POOL_MAX_SIZE': '20',
+        })
+        self.assertEqual(database['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual(database['HOST'], 'db')
+        self.assertEqual(database['OPTIONS']['pool']['max_size'], 20)
+        self.assertEqual(database['CONN_MAX_AGE'], 0)
+
+        database = database_settings(Path('/srv/app'), {'LOCALLIBRARY_DB_ENGINE': 'postgresql'})
+        self.assertNotIn('pool', database['OPTIONS'])
+        self.assertEqual(database['CONN_MAX_AGE'], 60)
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            database_settings(Path('/srv/app'), {'LOCALLIBRARY_DB_ENGINE': 'oracle'})
+
+
+class CacheSettingsTest(SimpleTestCase):
+
+    def test_defaults(self):
+        self.assertEqual(cache_settings(True, {})['BACKEND'], 'django.core.cache.backends.locmem.LocMemCache')
+        self.assertEqual(cache_settings(False, {'LOCALLIBRARY_CACHE_BACKEND': 'memcached'}), {
+            'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+            'LOCATION': '127.0.0.1:11211',
+        })
+
+    def test_production_requires_shared_backend(self):
+        for environ in [{}, {'LOCALLIBRARY_CACHE_BACKEND': 'locmem'}, {'LOCALLIBRARY_CACHE_BACKEND': 'database'}]:
+            with self.subTest(environ=environ), self.assertRaises(ValueError):
+                cache_settings(False, environ)
+
+    def test_shared_backend(self):
+        self.assertEqual(cache_settings(True, {
+            'LOCALLIBRARY_CACHE_BACKEND': 'redis',
+            'LOCALLIBRARY_CACHE_LOCATION': 'redis://cache:6379/1',
+        }), {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': 'redis://cache:6379/1',
+        })
+        with self.assertRaises(ValueError):
+            cache_settings(False, {'LOCALLIBRARY_CACHE_BACKEND': 'file'})
+
+
+class ReplicaSettingsTest(SimpleTestCase):
+
+    def test_sqlite_replicas(self):
+        primary = database_settings(Path('/srv/app'), {})
+        databases = replica_settings(primary, {'LOCALLIBRARY_DB_REPLICAS': '/srv/r1.sqlite3, /srv/r2.sqlite3'})
+        self.assertEqual(list(databases), ['replica1', 'replica2'])
+        self.assertEqual(databases['replica2']['NAME'], '/srv/r2.sqlite3')
+        self.assertEqual(databases['replica1']['OPTIONS'], primary['OPTIONS'])
+        self.assertEqual(databases['replica1']['TEST'], {'MIRROR': 'default'})
+        self.assertEqual(replica_settings(primary, {}), {})
+
+    def test_postgresql_replicas(self):
+        primary = database_settings(Path('/srv/app'), {'LOCALLIBRARY_DB_ENGINE': 'postgresql', 'LOCALLIBRARY_DB_HOST': 'db'})
+        databases = replica_settings(primary, {'LOCALLIBRARY_DB_REPLICAS': 'db-r1,db-r2:5433'})
+        self.assertEqual((databases['replica1']['HOST'], databases['replica1']['PORT']), ('db-r1', ''))
+        self.assertEqual((databases['replica2']['HOST'], databases['replica2']['PORT']), ('db-r2', '5433'))
+        self.assertEqual(primary['HOST'], 'db')
+
+
+class ReplicaRouterTest(TransactionTestCase):
+    # Each replica is a second SQLite file copied from the test database, which
+    # then does not see later writes to the primary, like a lagging replica.
+    replica_aliases = ['test_replica1', 'test_replica2']
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.databases = cls.databases | set(cls.replica_aliases)
+
+    def setUp(self):
+        self.author = Author.objects.using('default').create(first_name='John', last_name='Smith')
+        self.book = Book.objects.using('default').create(title='Replicated', summary='summary', isbn='ABCDEFG',
+                                                         author=self.author)
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        connection.ensure_connection()
+        for alias in self.replica_aliases:
+            path = os.path.join(tmpdir.name, alias + '.sqlite3')
+            target = sqlite3.connect(path)
+            connection.connection.backup(target)
+            target.close()
+            connections.settings[alias] = connections.configure_settings({
+                'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': path},
+            })['default']
+            self.addCleanup(self.remove_alias, alias)
+
+        settings_override = override_settings(DATABASE_REPLICAS=self.replica_aliases)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.router = replicas.ReplicaRouter()
+
+        # The primary moves on without the replicas.
+        self.fresh = Book.objects.using('default').create(title='Fresh', summary='summary', isbn='ABCDEFH',
+                                                          author=self.author)
+
+    def remove_alias(self, alias):
+        connections[alias].close()
+        del connections[alias]
+        del connections.settings[alias]
+
+    def test_reads_round_robin_over_replicas(self):
+        with replicas.routing_state():
+            aliases = [self.router.db_for_read(Book) for _ in range(4)]
+            self.assertEqual(set(aliases), {'test_replica1', 'test_replica2'})
+            self.assertNotEqual(aliases[0], aliases[1])
+            self.assertEqual(aliases[0], aliases[2])
+            self.assertIsNone(self.router.db_for_read(User))
+
+            self.assertFalse(Book.objects.filter(pk=self.fresh.pk).exists())
+            self.assertTrue(Book.objects.filter(pk=self.book.pk).exists())
+
+    def test_unhealthy_replica_skipped(self):
+        connections['test_replica2'].settings_dict['NAME'] = '/nonexistent/replica.sqlite3'
+        with replicas.routing_state():
+            self.assertEqual({self.router.db_for_read(Book) for _ in range(4)}, {'test_replica1'})
+            connections['test_replica1'].settings_dict['NAME'] = '/nonexistent/replica.sqlite3'
+            connections['test_replica1'].close()
+            self.router._health.clear()
+            self.assertEqual(self.router.db_for_read(Book), 'default')
+
+    def test_reads_after_write_and_in_transactions_use_primary(self):
+        with replicas.routing_state():
+            with transaction.atomic():
+                self.assertTrue(Book.objects.filter(pk=self.fresh.pk).exists())
+            self.assertFalse(Book.objects.filter(pk=self.fresh.pk).exists())
+            Genre.objects.create(name='Fantasy')
+            self.assertTrue(Book.objects.filter(pk=self.fresh.pk).exists())
+
+    def test_bookkeeping_writes_do_not_pin(self):
+        with replicas.routing_state() as state:
+            self.router.db_for_write(PageVisits)
+            self.router.db_for_write(TableVersion)
+            self.assertFalse(state.wrote)
+            self.router.db_for_write(Hold)
+            self.assertTrue(state.wrote)
+
+    def test_request_pinned_after_write(self):
+        detail = reverse('book-detail', kwargs={'pk': self.fresh.pk})
+        self.assertEqual(self.client.get(detail).status_code, 404)
+
+        user = User.objects.create_user(username='patron', password='12345')
+        self.client.force_login(user)
+        response = self.client.post(reverse('book-hold', kwargs={'pk': self.fresh.pk}))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(replicas.REPLICA_PIN_COOKIE, response.cookies)
+        self.assertEqual(self.client.get(detail).status_code, 200)
+
+        self.client.cookies.pop(replicas.REPLICA_PIN_COOKIE)
+        self.assertEqual(self.client.get(detail).status_code, 404)
+
+
+class SqliteConnectionTest(TestCase):
+
+    def test_pragmas_applied(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
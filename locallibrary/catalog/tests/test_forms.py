@@ -2,7 +2,11 @@ from django.test import TestCase
 
 import datetime
 from django.utils import timezone
-from catalog.forms import RenewBookModelForm
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from catalog.forms import RenewBookModelForm, BookForm
+from catalog.models import Author, Genre, Language, Book
 
 class RenewBookFormTest(TestCase):
 
@@ -36,4 +40,46 @@ class RenewBookFormTest(TestCase):
         date = timezone.now() + datetime.timedelta(weeks=4)
         form_data = {'due_back': date}
         form = RenewBookModelForm(data=form_data)
-        self.assertTrue(form.is_valid())
\ No newline at end of file
+        self.assertTrue(form.is_valid())
+
+class BookFormTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(first_name='Ursula', last_name='Le Guin')
+        cls.genres = [Genre.objects.create(name='Fantasy'), Genre.objects.create(name='Science Fiction')]
+        cls.language = Language.objects.create(name='English')
+        Author.objects.bulk_create([Author(first_name='First', last_name=f'Last {n}') for n in range(50)])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_renders_selected_values_only(self):
+        book = Book.objects.create(title='The Dispossessed', summary='summary', isbn='ABCDEFG',
+                                   author=self.author, language=self.language)
+        book.genre.set(self.genres)
+        html = BookForm(instance=book).as_table()
+        self.assertIn('Le Guin, Ursula', html)
+        self.assertIn('Science Fiction', html)
+        self.assertNotIn('Last 1', html)
+        self.assertNotIn('<select name="author"', html)
+
+        with CaptureQueriesContext(connection) as captured:
+            BookForm(instance=book).as_table()
+        self.assertEqual([q['sql'] for q in captured.captured_queries if 'catalog_author' in q['sql']], [])
+
+    def test_submits_ids(self):
+        form = BookForm(data={
+            'title': 'The Dispossessed', 'summary': 'summary', 'isbn': 'ABCDEFG',
+            'author': str(self.author.pk), 'genre': [str(genre.pk) for genre in self.genres],
+            'language': str(self.language.pk),
+        })
+        self.assertTrue(form.is_valid(), form.errors)
+        book = form.save()
+        self.assertEqual(book.author, self.author)
+        self.assertEqual(set(book.genre.all()), set(self.genres))
+
+    def test_rejects_unknown_id(self):
+        form = BookForm(data={'title': 'Title', 'summary': 'summary', 'isbn': 'ABCDEFG', 'author': '999999'})
+        self.assertFalse(form.is_valid())
+        self.assertIn('author', form.errors)
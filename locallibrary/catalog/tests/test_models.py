@@ -1,8 +1,16 @@
-from django.test import TestCase
-
-from catalog.models import BookInstance, Book, Author, Language, Genre
+from django.test import TestCase, TransactionTestCase
+
+from catalog.models import BookInstance, Book, Author, Language, Genre, Hold
+from catalog.circulation import circulate
+from catalog.holds import place_hold, cancel_hold
+from catalog import ledger as loan_ledger
+from catalog.ledger import LoanLedger, circulation_report, existing_partitions, loan_events
+import threading
+import time
 import uuid
-from datetime import date
+from datetime import date, datetime, timedelta, timezone
+from django.contrib.auth.models import User
+from django.db import connection, OperationalError
 
 class AuthorModelTest(TestCase):
 
@@ -256,4 +264,322 @@ class BookInstanceModelTest(TestCase):
         book_instance = BookInstance(
             due_back=None
         )
-        self.assertFalse(book_instance.is_overdue)
\ No newline at end of file
+        self.assertFalse(book_instance.is_overdue)
+
+class BookInstanceIndexTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='testuser1', password='12345')
+        book = Book.objects.create(title='test title', summary='test summary', isbn='9780486400595')
+        for copy_num in range(20):
+            BookInstance.objects.create(
+                book=book,
+                imprint='test imprint',
+                due_back=date(2030, 1, 1 + copy_num),
+                borrower=cls.user if copy_num % 2 else None,
+                status='o' if copy_num % 3 else 'a',
+            )
+
+    def test_all_borrowed_uses_status_due_index(self):
+        plan = BookInstance.objects.filter(status__exact='o').order_by('due_back').explain()
+        self.assertIn('bookinstance_status_due_idx', plan)
+
+    def test_borrowed_by_user_uses_borrower_due_index(self):
+        plan = BookInstance.objects.filter(borrower=self.user).filter(status__exact='o').order_by('due_back').explain()
+        self.assertIn('bookinstance_borrower_due_idx', plan)
+
+
+class BookCopyCountersTest(TestCase):
+
+    def setUp(self):
+        self.book = Book.objects.create(title='test title', summary='test summary', isbn='9780486400595')
+        self.other_book = Book.objects.create(title='other title', summary='test summary', isbn='9780486400596')
+
+    def assertCounters(self, book, total, available, on_loan):
+        book.refresh_from_db()
+        self.assertEqual((book.copies_total, book.copies_available, book.copies_on_loan), (total, available, on_loan))
+
+    def test_create_and_status_changes(self):
+        copy = BookInstance.objects.create(book=self.book, imprint='test imprint', status='a')
+        BookInstance.objects.create(book=self.book, imprint='test imprint', status='m')
+        self.assertCounters(self.book, 2, 1, 0)
+
+        copy.status = 'o'
+        copy.save()
+        self.assertCounters(self.book, 2, 0, 1)
+
+        copy = BookInstance.objects.get(pk=copy.pk)
+        copy.status = 'a'
+        copy.save()
+        copy.save()
+        self.assertCounters(self.book, 2, 1, 0)
+
+    def test_copy_moved_to_other_book(self):
+        copy = BookInstance.objects.create(book=self.book, imprint='test imprint', status='o')
+        copy.book = self.other_book
+        copy.save()
+        self.assertCounters(self.book, 0, 0, 0)
+        self.assertCounters(self.other_book, 1, 0, 1)
+
+    def test_stale_instances_apply_one_delta(self):
+        copy = BookInstance.objects.create(book=self.book, imprint='test imprint', status='a')
+        first, second = BookInstance.objects.get(pk=copy.pk), BookInstance.objects.get(pk=copy.pk)
+        for stale in (first, second):
+            stale.status = 'o'
+            stale.save()
+        self.assertCounters(self.book, 1, 0, 1)
+
+        first.delete()
+        second.delete()
+        self.assertCounters(self.book, 0, 0, 0)
+
+    def test_drifted_counter_does_not_block_writes(self):
+        copy = BookInstance.objects.create(book=self.book, imprint='test imprint', status='a')
+        Book.objects.filter(pk=self.book.pk).update(copies_available=0)
+        circulate('checkout', [str(copy.pk)], date(2030, 1, 1), User.objects.create_user(username='patron'))
+        self.assertCounters(self.book, 1, 0, 1)
+
+    def test_deferred_instance_update(self):
+        copy = BookInstance.objects.create(book=self.book, imprint='test imprint', status='o')
+        copy = BookInstance.objects.only('imprint').get(pk=copy.pk)
+        copy.status = 'a'
+        copy.save()
+        self.assertCounters(self.book, 1, 1, 0)
+
+    def test_delete(self):
+        copy = BookInstance.objects.create(book=self.book, imprint='test imprint', status='a')
+        BookInstance.objects.create(book=self.book, imprint='test imprint', status='o')
+        copy.status = 'o'
+        copy.delete()
+        self.assertCounters(self.book, 1, 0, 1)
+
+        BookInstance.objects.filter(book=self.book).delete()
+        self.assertCounters(self.book, 0, 0, 0)
+
+
+class BookInstanceOverdueQuerySetTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        book = Book.objects.create(title='test title', summary='test summary', isbn='9780486400595')
+        cls.overdue = BookInstance.objects.create(book=book, imprint='test imprint', status='o', due_back=date(2020, 1, 1))
+        BookInstance.objects.create(book=book, imprint='test imprint', status='o', due_back=date(2100, 1, 1))
+        BookInstance.objects.create(book=book, imprint='test imprint', status='a', due_back=date(2020, 1, 1))
+        BookInstance.objects.create(book=book, imprint='test imprint', status='o', due_back=None)
+
+    def test_overdue(self):
+        self.assertEqual(list(BookInstance.objects.overdue()), [self.overdue])
+
+    def test_overdue_as_of_date(self):
+        self.assertEqual(BookInstance.objects.overdue(date(2019, 1, 1)).count(), 0)
+        self.assertEqual(BookInstance.objects.overdue(date(2200, 1, 1)).count(), 2)
+
+    def test_overdue_uses_status_due_index(self):
+        self.assertIn('bookinstance_status_due_idx', BookInstance.objects.overdue().explain())
+
+
+class HoldQueueTest(TestCase):
+
+    def setUp(self):
+        self.book = Book.objects.create(title='test title', summary='test summary', isbn='9780486400595')
+        self.patrons = [User.objects.create_user(username=f'patron{n}', password='12345') for n in range(3)]
+        self.copy = BookInstance.objects.create(book=self.book, imprint='test imprint', status='o',
+                                                borrower=self.patrons[0], due_back=date(2030, 1, 1))
+
+    def test_place_hold_once_per_patron(self):
+        hold, created = place_hold(self.book, self.patrons[1])
+        self.assertTrue(created)
+        self.assertEqual(hold.status, 'w')
+        self.assertEqual(place_hold(self.book, self.patrons[1]), (hold, False))
+
+    def test_place_hold_reserves_available_copy(self):
+        self.copy.status = 'a'
+        self.copy.save()
+        hold, _ = place_hold(self.book, self.patrons[1])
+        self.assertEqual((hold.status, hold.copy_id), ('r', self.copy.pk))
+        self.copy.refresh_from_db()
+        self.assertEqual((self.copy.status, self.copy.borrower), ('r', self.patrons[1]))
+
+    def test_return_goes_to_oldest_hold(self):
+        first, _ = place_hold(self.book, self.patrons[1])
+        second, _ = place_hold(self.book, self.patrons[2])
+
+        [result] = circulate('return', [str(self.copy.pk)])
+        self.assertEqual(result['status'], 'r')
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.status, first.copy_id), ('r', self.copy.pk))
+        self.assertEqual(second.status, 'w')
+
+        self.book.refresh_from_db()
+        self.assertEqual((self.book.copies_available, self.book.copies_on_loan), (0, 0))
+
+    def test_reserved_copy_only_checks_out_to_patron(self):
+        hold, _ = place_hold(self.book, self.patrons[1])
+        circulate('return', [str(self.copy.pk)])
+
+        [result] = circulate('checkout', [str(self.copy.pk)], date(2030, 1, 1), self.patrons[2])
+        self.assertEqual(result['error'], 'Copy is reserved for another patron')
+        [result] = circulate('checkout', [str(self.copy.pk)], date(2030, 1, 1), self.patrons[1])
+        self.assertEqual(result['status'], 'o')
+        hold.refresh_from_db()
+        self.assertEqual(hold.status, 'f')
+
+    def test_cancel_ready_hold_passes_copy_on(self):
+        first, _ = place_hold(self.book, self.patrons[1])
+        second, _ = place_hold(self.book, self.patrons[2])
+        circulate('return', [str(self.copy.pk)])
+
+        cancel_hold(first)
+        second.refresh_from_db()
+        self.assertEqual((second.status, second.copy_id), ('r', self.copy.pk))
+        self.copy.refresh_from_db()
+        self.assertEqual(self.copy.borrower, self.patrons[2])
+
+    def test_copy_saved_available_is_allocated(self):
+        hold, _ = place_hold(self.book, self.patrons[1])
+        copy = BookInstance.objects.create(book=self.book, imprint='test imprint', status='a')
+        hold.refresh_from_db()
+        self.assertEqual(hold.copy_id, copy.pk)
+        self.book.refresh_from_db()
+        self.assertEqual((self.book.copies_total, self.book.copies_available), (2, 0))
+
+    def test_deleting_reserved_copy_requeues_hold(self):
+        first, _ = place_hold(self.book, self.patrons[1])
+        second, _ = place_hold(self.book, self.patrons[2])
+        circulate('return', [str(self.copy.pk)])
+
+        self.copy.delete()
+        first.refresh_from_db()
+        self.assertEqual((first.status, first.copy, first.ready), ('w', None, None))
+
+        copy = BookInstance.objects.create(book=self.book, imprint='test imprint', status='a')
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.status, first.copy_id, second.status), ('r', copy.pk, 'w'))
+
+    def test_deleting_reserved_copy_moves_hold_to_available_copy(self):
+        self.copy.status = 'a'
+        self.copy.save()
+        hold, _ = place_hold(self.book, self.patrons[1])
+        spare = BookInstance.objects.create(book=self.book, imprint='test imprint', status='a')
+
+        self.copy.delete()
+        hold.refresh_from_db()
+        self.assertEqual((hold.status, hold.copy_id), ('r', spare.pk))
+        self.book.refresh_from_db()
+        self.assertEqual((self.book.copies_total, self.book.copies_available), (1, 0))
+
+    def test_queue_head_uses_queue_index(self):
+        plan = Hold.objects.filter(book=self.book, status='w').order_by('placed', 'id').explain()
+        self.assertIn('hold_queue_idx', plan)
+
+
+class LoanLedgerTest(TestCase):
+
+    def setUp(self):
+        self.book = Book.objects.create(title='test title', summary='test summary', isbn='9780486400595')
+        self.patron = User.objects.create_user(username='patron', password='12345')
+        self.copy = BookInstance.objects.create(book=self.book, imprint='test imprint', status='a')
+
+    def events(self, start=datetime(2000, 1, 1, tzinfo=timezone.utc), end=datetime(2100, 1, 1, tzinfo=timezone.utc)):
+        return [(event.action, event.borrower_id, event.due_back)
+                for queryset in loan_events(start, end, copy_id=self.copy.pk) for event in queryset]
+
+    def test_circulation_is_recorded(self):
+        copy_id = str(self.copy.pk)
+        circulate('checkout', [copy_id], date(2030, 1, 1), self.patron)
+        circulate('renew', [copy_id], date(2030, 2, 1))
+        circulate('return', [copy_id])
+        self.assertEqual(self.events(), [
+            ('checkout', self.patron.pk, date(2030, 1, 1)),
+            ('renew', self.patron.pk, date(2030, 2, 1)),
+            ('return', self.patron.pk, date(2030, 2, 1)),
+        ])
+
+    def test_saves_are_recorded(self):
+        self.copy.status = 'o'
+        self.copy.borrower = self.patron
+        self.copy.due_back = date(2030, 1, 1)
+        self.copy.save()
+        self.copy.imprint = 'new imprint'
+        self.copy.save()
+        copy = BookInstance.objects.get(pk=self.copy.pk)
+        copy.due_back = date(2030, 2, 1)
+        copy.save()
+        self.assertEqual([action for action, _, _ in self.events()], ['checkout', 'renew'])
+
+    def test_events_are_partitioned_by_month(self):
+        ledger = LoanLedger()
+        for event_time in [datetime(2031, 1, 31, 23, tzinfo=timezone.utc), datetime(2031, 2, 1, tzinfo=timezone.utc),
+                           datetime(2031, 2, 2, tzinfo=timezone.utc), datetime(2031, 4, 1, tzinfo=timezone.utc)]:
+            ledger.record('checkout', self.copy, self.patron.pk, date(2031, 5, 1), event_time)
+        ledger.record('return', self.copy, self.patron.pk, date(2031, 5, 1), datetime(2031, 2, 3, tzinfo=timezone.utc))
+        ledger.flush()
+
+        self.assertTrue({date(2031, 1, 1), date(2031, 2, 1), date(2031, 4, 1)} <= set(existing_partitions()))
+        self.assertEqual(len(self.events(datetime(2031, 2, 1, tzinfo=timezone.utc),
+                                         datetime(2031, 3, 1, tzinfo=timezone.utc))), 3)
+        report = circulation_report(datetime(2031, 1, 1, tzinfo=timezone.utc),
+                                    datetime(2031, 5, 1, tzinfo=timezone.utc), book_id=self.book.pk)
+        self.assertEqual(list(report), [date(2031, 1, 1), date(2031, 2, 1), date(2031, 4, 1)])
+        self.assertEqual((report[date(2031, 2, 1)]['checkout'], report[date(2031, 2, 1)]['return']), (2, 1))
+
+    def test_partition_created_twice(self):
+        # Another worker created the month's table after this process last looked.
+        month = date(2033, 6, 1)
+        loan_ledger._create_partition(loan_ledger.partition_model(month))
+        loan_ledger._known_partitions.discard(month)
+        ledger = LoanLedger()
+        ledger.record('checkout', self.copy, self.patron.pk, date(2033, 7, 1), datetime(2033, 6, 5, tzinfo=timezone.utc))
+        ledger.flush()
+        self.assertEqual(len(self.events(datetime(2033, 6, 1, tzinfo=timezone.utc),
+                                         datetime(2033, 7, 1, tzinfo=timezone.utc))), 1)
+
+    def test_partition_has_book_and_borrower_indexes(self):
+        circulate('checkout', [str(self.copy.pk)], date(2030, 1, 1), self.patron)
+        now = datetime.now(timezone.utc)
+        [queryset] = loan_events(now - timedelta(hours=1), now + timedelta(hours=1), borrower_id=self.patron.pk)
+        self.assertIn('_borrower', queryset.explain())
+
+
+class HoldQueueConcurrencyTest(TransactionTestCase):
+
+    def test_parallel_returns_never_double_allocate(self):
+        book = Book.objects.create(title='test title', summary='test summary', isbn='9780486400595')
+        patrons = [User.objects.create_user(username=f'patron{n}', password='12345') for n in range(12)]
+        copies = [BookInstance.objects.create(book=book, imprint='test imprint', status='o', borrower=patrons[0],
+                                              due_back=date(2030, 1, 1)) for _ in range(8)]
+        for patron in patrons[1:]:
+            place_hold(book, patron)
+
+        errors = []
+
+        def return_copy(copy):
+            try:
+                for attempt in range(50):
+                    try:
+                        circulate('return', [str(copy.pk)])
+                        return
+                    except OperationalError:
+                        # Shared-cache SQLite reports lock contention instead of waiting.
+                        time.sleep(0.01 * attempt)
+                errors.append(copy.pk)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=return_copy, args=(copy,)) for copy in copies]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+        ready = list(Hold.objects.filter(status='r').values_list('patron_id', 'copy_id'))
+        self.assertEqual(len(ready), len(copies))
+        self.assertEqual(len({copy_id for _, copy_id in ready}), len(copies))
+        self.assertEqual(sorted(patron for patron, _ in ready), [patron.pk for patron in patrons[1:9]])
+        for copy in BookInstance.objects.all():
+            self.assertEqual(copy.status, 'r')
+            self.assertIn((copy.borrower_id, copy.pk), ready)
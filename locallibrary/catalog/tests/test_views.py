@@ -1,12 +1,124 @@
-from django.test import TestCase
+from django.test import TestCase, LiveServerTestCase, override_settings
 
-from catalog.models import Author, BookInstance, Book, Genre, Language
-from django.urls import reverse
+from catalog.models import Author, BookInstance, Book, Genre, Language, PageVisits, Hold, TableVersion
+from django.urls import reverse, resolve
+import asyncio
 import datetime
 from django.utils import timezone
 from django.contrib.auth.models import User, Permission
 from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+from catalog.tests.helpers import QueryCountMixin
+from catalog.pagination import EstimatedCountPaginator
+from catalog.visits import flush_visits, pending_visits
+from catalog.circulation import circulate
+from catalog.fragments import VERSION_KEY, bump_cache_versions
+from catalog.autocomplete import AUTOCOMPLETE_INDEXES, AUTOCOMPLETE_RELOAD_SECONDS
+from catalog.statistics import STATS_VERSION_KEY
+from catalog.ledger import loan_events
+from django.conf import settings
+import io
+import json
+import time
 import uuid
+from unittest import mock
+
+
+def catalog_queries(captured):
+    return [q['sql'] for q in captured.captured_queries if 'catalog_' in q['sql']]
+
+class IndexViewTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(first_name='John', last_name='Smith')
+        Genre.objects.create(name='Epic Fantasy')
+        Genre.objects.create(name='Poetry')
+        book = Book.objects.create(title='book1 and more', summary='summary', isbn='ABCDEFG', author=author)
+        Book.objects.create(title='Other title', summary='summary', isbn='ABCDEFH', author=author)
+        BookInstance.objects.create(book=book, imprint='Imprint', status='a')
+        BookInstance.objects.create(book=book, imprint='Imprint', status='o')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_counters(self):
+        resp = self.client.get(reverse('index'))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context['num_books'], 2)
+        self.assertEqual(resp.context['num_instances'], 2)
+        self.assertEqual(resp.context['num_instances_available'], 1)
+        self.assertEqual(resp.context['num_authors'], 1)
+        self.assertEqual(resp.context['num_books_contain_search'], 1)
+        self.assertEqual(resp.context['num_genres_contain_search'], 1)
+
+    def test_counters_use_one_query_cold_and_none_warm(self):
+        with CaptureQueriesContext(connection) as cold:
+            self.client.get(reverse('index'))
+        self.assertEqual(len(catalog_queries(cold)), 1)
+
+        with CaptureQueriesContext(connection) as warm:
+            self.client.get(reverse('index'))
+        self.assertEqual(len(catalog_queries(warm)), 0)
+
+    def test_visits_do_not_touch_the_session_or_database(self):
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(3):
+                resp = self.client.get(reverse('index'))
+        self.assertEqual(resp.context['num_visits'], 2)
+        self.assertFalse([q for q in queries.captured_queries
+                          if 'django_session' in q['sql'] or 'catalog_pagevisits' in q['sql']])
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, self.client.cookies)
+        self.assertEqual(pending_visits(), {('index', timezone.localdate()): 3})
+
+    def test_visits_flushed_in_bulk(self):
+        for _ in range(3):
+            self.client.get(reverse('index'))
+        self.assertFalse(PageVisits.objects.exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(flush_visits(), 3)
+        self.assertEqual(flush_visits(), 0)
+        self.client.get(reverse('index'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(flush_visits(), 1)
+        self.assertEqual(PageVisits.objects.get(page='index', date=timezone.localdate()).count, 4)
+
+    def test_failed_flush_keeps_visits_pending(self):
+        self.client.get(reverse('index'))
+        with mock.patch.object(PageVisits.objects, 'bulk_create', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                flush_visits()
+        self.assertEqual(pending_visits(), {('index', timezone.localdate()): 1})
+
+    def test_tampered_visit_cookie_ignored(self):
+        self.client.cookies['num_visits'] = '41'
+        resp = self.client.get(reverse('index'))
+        self.assertEqual(resp.context['num_visits'], 0)
+
+    def test_counters_invalidated_on_change(self):
+        self.client.get(reverse('index'))
+        with self.captureOnCommitCallbacks(execute=True):
+            Author.objects.create(first_name='Jane', last_name='Doe')
+            # Not before commit, when other requests still see the old rows.
+            resp = self.client.get(reverse('index'))
+            self.assertEqual(resp.context['num_authors'], 1)
+        resp = self.client.get(reverse('index'))
+        self.assertEqual(resp.context['num_authors'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            BookInstance.objects.filter(status='o').get().delete()
+        resp = self.client.get(reverse('index'))
+        self.assertEqual(resp.context['num_instances'], 1)
+
+    def test_counters_invalidated_after_version_evicted(self):
+        self.client.get(reverse('index'))
+        cache.delete(STATS_VERSION_KEY)
+        Author.objects.create(first_name='Jane', last_name='Doe')
+        resp = self.client.get(reverse('index'))
+        self.assertEqual(resp.context['num_authors'], 2)
 
 class AuthorListViewTest(TestCase):
 
@@ -263,6 +375,17 @@ class RenewBookInstancesViewTest(TestCase):
         )
         self.assertRedirects(response, reverse('all-borrowed-books'))
 
+    def test_renewal_is_recorded_in_loan_ledger(self):
+        self.client.login(username='testuser2', password='2HJ1vRV0Z&3iD')
+        renewal_date = datetime.date.today() + datetime.timedelta(weeks=2)
+        self.client.post(reverse('renew-book-librarian', kwargs={'pk': self.test_bookinstance1.pk}),
+                         {'due_back': renewal_date})
+
+        now = timezone.now()
+        [events] = loan_events(now - datetime.timedelta(days=1), now + datetime.timedelta(days=1),
+                               copy_id=self.test_bookinstance1.pk)
+        self.assertEqual([(event.action, event.due_back) for event in events][-1], ('renew', renewal_date))
+
     def test_HTTP404_for_invalid_book_if_logged_in(self):
         test_uid = uuid.uuid4()
         login = self.client.login(
@@ -340,4 +463,868 @@ class AuthorCreateViewTest(TestCase):
         response = self.client.post(reverse('author-create'),
                                     {'first_name': 'Christian Name', 'last_name': 'Surname'})
         self.assertEqual(response.status_code, 302)
-        self.assertTrue(response.url.startswith('/catalog/author/'))
\ No newline at end of file
+        self.assertTrue(response.url.startswith('/catalog/author/'))
+
+class BookDetailViewTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(first_name='John', last_name='Smith')
+        language = Language.objects.create(name='English')
+        cls.book = Book.objects.create(title='Book Title', summary='My book summary', isbn='ABCDEFG', author=author, language=language)
+        cls.book.genre.add(Genre.objects.create(name='Fantasy'), Genre.objects.create(name='Poetry'))
+
+        statuses = ['a', 'a', 'o', 'm', 'r']
+        for copy_num in range(60):
+            BookInstance.objects.create(book=cls.book, imprint='Imprint %s' % copy_num, status=statuses[copy_num % 5])
+
+        cls.small_book = Book.objects.create(title='Small', summary='summary', isbn='ABCDEFH', author=author, language=language)
+        BookInstance.objects.create(book=cls.small_book, imprint='Imprint', status='a')
+
+    def test_copies_summary(self):
+        resp = self.client.get(self.book.get_absolute_url())
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context['copies_summary'], {
+            'total': 60, 'available': 24, 'on_loan': 12, 'maintenance': 12, 'reserved': 12,
+        })
+
+    def test_copies_are_paginated(self):
+        resp = self.client.get(self.book.get_absolute_url())
+        self.assertEqual(len(resp.context['copies']), 50)
+
+        resp = self.client.get(self.book.get_absolute_url() + '?copies_page=2')
+        self.assertEqual(len(resp.context['copies']), 10)
+
+    def test_query_count_does_not_grow_with_copies(self):
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(self.small_book.get_absolute_url())
+        with CaptureQueriesContext(connection) as large:
+            self.client.get(self.book.get_absolute_url())
+        self.assertEqual(len(small), len(large))
+        # One of these is the conditional GET validator query.
+        self.assertLessEqual(len(large), 5)
+
+
+class AuthorDetailViewTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.prolific_author = Author.objects.create(first_name='Prolific', last_name='Writer')
+        cls.author = Author.objects.create(first_name='John', last_name='Smith')
+
+        for book_num in range(30):
+            book = Book.objects.create(title='Book %s' % book_num, summary='summary', isbn='ABCDEFG', author=cls.prolific_author)
+            BookInstance.objects.create(book=book, imprint='Imprint', status='a')
+            BookInstance.objects.create(book=book, imprint='Imprint', status='o')
+
+        book = Book.objects.create(title='Only book', summary='summary', isbn='ABCDEFH', author=cls.author)
+        BookInstance.objects.create(book=book, imprint='Imprint', status='m')
+
+    def test_books_carry_copy_counts(self):
+        resp = self.client.get(self.author.get_absolute_url())
+        self.assertEqual(resp.status_code, 200)
+        book = resp.context['books'][0]
+        self.assertEqual(book.copies_total, 1)
+        self.assertEqual(book.copies_available, 0)
+
+    def test_query_count_does_not_grow_with_books(self):
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(self.author.get_absolute_url())
+        with CaptureQueriesContext(connection) as large:
+            resp = self.client.get(self.prolific_author.get_absolute_url())
+        self.assertEqual(len(resp.context['books']), 30)
+        self.assertEqual(len(small), len(large))
+        # One of these is the conditional GET validator query.
+        self.assertEqual(len(large), 3)
+
+
+class CursorPaginationTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for author_num in range(23):
+            Author.objects.create(first_name='Christian %s' % author_num, last_name='Surname %s' % (author_num % 4))
+
+        book = Book.objects.create(title='Book Title', summary='summary', isbn='ABCDEFG')
+        for copy_num in range(25):
+            due_back = None if copy_num % 3 == 0 else datetime.date(2030, 1, 1) + datetime.timedelta(days=copy_num % 5)
+            BookInstance.objects.create(book=book, imprint='Imprint', due_back=due_back)
+
+    def walk(self, url, list_name):
+        seen = []
+        resp = self.client.get(url + '?cursor=')
+        pages = [resp.context[list_name]]
+        while resp.context['page_obj'].has_next():
+            resp = self.client.get(url, {'cursor': resp.context['page_obj'].next_cursor})
+            pages.append(resp.context[list_name])
+        for page in pages:
+            seen.extend(obj.pk for obj in page)
+
+        back = []
+        while resp.context['page_obj'].has_previous():
+            resp = self.client.get(url, {'cursor': resp.context['page_obj'].previous_cursor})
+            back = [obj.pk for obj in resp.context[list_name]] + back
+        return seen, back
+
+    def test_walks_authors_in_ordering(self):
+        seen, back = self.walk(reverse('authors'), 'author_list')
+        expected = list(Author.objects.order_by('last_name', 'pk').values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+        self.assertEqual(back, expected[:len(back)])
+        self.assertEqual(len(back), 20)
+
+    def test_walks_bookinstances_with_null_due_back(self):
+        seen, back = self.walk(reverse('bookinstances'), 'bookinstance_list')
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(len(set(seen)), 25)
+        self.assertEqual(back, seen[:len(back)])
+
+    def test_no_count_query(self):
+        with CaptureQueriesContext(connection) as captured:
+            resp = self.client.get(reverse('authors') + '?cursor=')
+        self.assertTrue(resp.context['is_paginated'])
+        self.assertEqual(len(resp.context['author_list']), 10)
+        self.assertFalse(any('COUNT(' in q['sql'] for q in captured.captured_queries))
+
+    def test_invalid_cursor(self):
+        resp = self.client.get(reverse('authors'), {'cursor': 'garbage'})
+        self.assertEqual(resp.status_code, 404)
+
+    def test_offset_pagination_is_default(self):
+        resp = self.client.get(reverse('authors'))
+        self.assertFalse(resp.context['cursor_pagination'])
+        self.assertEqual(resp.context['page_obj'].number, 1)
+
+
+class BookSearchViewTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(first_name='Ursula', last_name='Le Guin')
+        other_author = Author.objects.create(first_name='John', last_name='Smith')
+        cls.fantasy = Genre.objects.create(name='Fantasy')
+        cls.earthsea = Book.objects.create(title='A Wizard of Earthsea', summary='A young mage', isbn='9780553383041', author=cls.author)
+        cls.earthsea.genre.add(cls.fantasy)
+        Book.objects.create(title='The Dispossessed', summary='An anarchist physicist', isbn='9780060512750', author=cls.author)
+        for book_num in range(12):
+            Book.objects.create(title='Wizard handbook %s' % book_num, summary='Spells', isbn='ABCDEFG', author=other_author)
+
+    def search(self, query, **params):
+        return self.client.get(reverse('book-search'), {'q': query, **params})
+
+    def test_searches_title_author_genre_and_isbn(self):
+        self.assertEqual(list(self.search('earthsea').context['book_list']), [self.earthsea])
+        self.assertEqual(len(self.search('guin').context['book_list']), 2)
+        self.assertEqual(list(self.search('fantasy').context['book_list']), [self.earthsea])
+        self.assertEqual(list(self.search('9780553383041').context['book_list']), [self.earthsea])
+
+    def test_results_are_paginated(self):
+        resp = self.search('wizard')
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.context['is_paginated'])
+        self.assertEqual(resp.context['paginator'].count, 13)
+        self.assertEqual(len(self.search('wizard', page=2).context['book_list']), 3)
+
+    def test_index_follows_changes(self):
+        self.author.last_name = 'LeGuin'
+        self.author.save()
+        self.assertEqual(len(self.search('leguin').context['book_list']), 2)
+
+        self.earthsea.genre.remove(self.fantasy)
+        self.assertEqual(len(self.search('fantasy').context['book_list']), 0)
+
+        Book.objects.filter(title='The Dispossessed').get().delete()
+        self.assertEqual(len(self.search('anarchist').context['book_list']), 0)
+
+    def test_index_follows_genre_delete(self):
+        self.fantasy.delete()
+        self.assertEqual(len(self.search('fantasy').context['book_list']), 0)
+        self.assertEqual(list(self.search('earthsea').context['book_list']), [self.earthsea])
+
+    def test_empty_and_punctuation_queries(self):
+        self.assertEqual(len(self.search('').context['book_list']), 0)
+        self.assertEqual(self.search('"wizard* OR').status_code, 200)
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM catalog_book_search')
+        self.assertEqual(len(self.search('earthsea').context['book_list']), 0)
+
+        call_command('rebuild_search_index', stdout=io.StringIO())
+        self.assertEqual(list(self.search('earthsea').context['book_list']), [self.earthsea])
+
+    def test_failed_rebuild_keeps_index(self):
+        with mock.patch('catalog.search.reindex_books', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                call_command('rebuild_search_index', stdout=io.StringIO())
+        self.assertEqual(list(self.search('earthsea').context['book_list']), [self.earthsea])
+
+
+class ExportCatalogViewTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='testuser1', password='1X<ISRUkw+tuK')
+        cls.librarian = User.objects.create_user(username='testuser2', password='2HJ1vRV0Z&3iD')
+        cls.librarian.user_permissions.add(
+            Permission.objects.get(codename='view_book'),
+            Permission.objects.get(codename='view_bookinstance'),
+        )
+
+        author = Author.objects.create(first_name='John', last_name='Smith')
+        language = Language.objects.create(name='English')
+        genres = [Genre.objects.create(name='Poetry'), Genre.objects.create(name='Fantasy')]
+        for book_num in range(7):
+            book = Book.objects.create(title='Book %s' % book_num, summary='summary', isbn='ABCDEFG', author=author, language=language)
+            book.genre.set(genres)
+            BookInstance.objects.create(book=book, imprint='Imprint', status='o', borrower=cls.user,
+                                        due_back=datetime.date(2030, 1, 1))
+
+    def export(self, dataset, fmt):
+        return self.client.get(reverse('catalog-export', kwargs={'dataset': dataset, 'fmt': fmt}))
+
+    def test_requires_view_permission(self):
+        self.assertEqual(self.export('books', 'csv').status_code, 302)
+        self.client.login(username='testuser1', password='1X<ISRUkw+tuK')
+        self.assertEqual(self.export('books', 'csv').status_code, 403)
+
+    def test_books_csv(self):
+        self.client.login(username='testuser2', password='2HJ1vRV0Z&3iD')
+        resp = self.export('books', 'csv')
+        self.assertEqual(resp.status_code, 200)
+        lines = b''.join(resp.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,title,author,summary,isbn,language,genres')
+        self.assertEqual(len(lines), 8)
+        self.assertTrue(lines[1].endswith(',"Smith, John",summary,ABCDEFG,English,Fantasy; Poetry'))
+
+    def test_bookinstances_jsonl_query_count_is_constant(self):
+        self.client.login(username='testuser2', password='2HJ1vRV0Z&3iD')
+        resp = self.export('bookinstances', 'jsonl')
+        with CaptureQueriesContext(connection) as captured:
+            lines = b''.join(resp.streaming_content).decode().splitlines()
+        self.assertEqual(len(captured), 1)
+        self.assertEqual(len(lines), 7)
+        self.assertEqual(json.loads(lines[0])['borrower'], 'testuser1')
+
+    def test_unknown_dataset(self):
+        self.client.login(username='testuser2', password='2HJ1vRV0Z&3iD')
+        self.assertEqual(self.export('users', 'csv').status_code, 404)
+
+
+class FragmentCacheTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(first_name='John', last_name='Smith')
+        for book_num in range(3):
+            Book.objects.create(title='Book %s' % book_num, summary='summary', isbn='ABCDEFG', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_warm_list_page_skips_row_query(self):
+        self.client.get(reverse('books'))
+        with CaptureQueriesContext(connection) as warm:
+            resp = self.client.get(reverse('books'))
+        self.assertContains(resp, 'Book 2')
+        self.assertFalse(any('"catalog_author"' in q['sql'] for q in warm.captured_queries))
+
+    def test_list_page_invalidated_on_change(self):
+        self.client.get(reverse('books'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.last_name = 'Jones'
+            self.author.save()
+            self.assertNotContains(self.client.get(reverse('books')), 'Jones, John')
+        self.assertContains(self.client.get(reverse('books')), 'Jones, John')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Book.objects.create(title='Newest', summary='summary', isbn='ABCDEFG', author=self.author)
+        self.assertContains(self.client.get(reverse('books')), 'Newest')
+
+    def test_list_page_invalidated_after_version_evicted(self):
+        self.client.get(reverse('books'))
+        cache.delete(VERSION_KEY.format('book'))
+        Book.objects.create(title='Newest', summary='summary', isbn='ABCDEFG', author=self.author)
+        self.assertContains(self.client.get(reverse('books')), 'Newest')
+
+    def test_pages_cached_separately(self):
+        for book_num in range(3, 12):
+            Book.objects.create(title='Book %s' % book_num, summary='summary', isbn='ABCDEFG', author=self.author)
+        self.client.get(reverse('books'))
+        resp = self.client.get(reverse('books') + '?page=2')
+        self.assertContains(resp, 'Book 9')
+        self.assertNotContains(resp, 'Book 0<')
+
+    def test_staff_sidebar_varies_on_staff(self):
+        User.objects.create_user(username='staff', password='1X<ISRUkw+tuK', is_staff=True)
+        User.objects.create_user(username='patron', password='2HJ1vRV0Z&3iD')
+
+        self.client.login(username='staff', password='1X<ISRUkw+tuK')
+        self.assertContains(self.client.get(reverse('books')), 'All borrowed')
+        self.client.login(username='patron', password='2HJ1vRV0Z&3iD')
+        self.assertNotContains(self.client.get(reverse('books')), 'All borrowed')
+
+    def test_benchmark_command(self):
+        out = io.StringIO()
+        call_command('benchmark_list_pages', iterations=1, stdout=out)
+        self.assertIn('bookinstances', out.getvalue())
+
+
+class CatalogPageQueryCountTest(QueryCountMixin, TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser1', password='1X<ISRUkw+tuK', is_staff=True)
+        self.user.user_permissions.add(Permission.objects.get(codename='can_mark_returned'))
+        self.client.login(username='testuser1', password='1X<ISRUkw+tuK')
+        self.language = Language.objects.create(name='English')
+        self.genre = Genre.objects.create(name='Fantasy')
+        self.add_rows(2)
+
+    def add_rows(self, count=8):
+        for row_num in range(count):
+            author = Author.objects.create(first_name='John', last_name='Smith %s' % row_num)
+            book = Book.objects.create(title='Book', summary='summary', isbn='ABCDEFG', author=author, language=self.language)
+            book.genre.add(self.genre)
+            BookInstance.objects.create(book=book, imprint='Imprint', status='o', borrower=self.user,
+                                        due_back=datetime.date.today() + datetime.timedelta(days=row_num))
+            Genre.objects.create(name='Genre %s %s' % (count, row_num))
+            Language.objects.create(name='Language %s %s' % (count, row_num))
+
+    def assertPagesQueryCountConstant(self, urls):
+        for url in urls:
+            with self.subTest(url), transaction.atomic():
+                self.assertQueryCountConstant(url, self.add_rows)
+                transaction.set_rollback(True)
+
+    def test_list_pages(self):
+        self.assertPagesQueryCountConstant([
+            reverse(name) for name in
+            ['books', 'authors', 'genres', 'languages', 'bookinstances', 'my-borrowed', 'all-borrowed-books']
+        ])
+
+    def test_cursor_list_pages(self):
+        self.assertPagesQueryCountConstant([
+            reverse(name) + '?cursor=' for name in ['books', 'authors', 'bookinstances']
+        ])
+
+    def test_detail_pages(self):
+        book = Book.objects.first()
+        self.assertQueryCountConstant(book.get_absolute_url(), lambda: [
+            BookInstance.objects.create(book=book, imprint='Imprint', status='a') for _ in range(8)])
+
+        author = Author.objects.first()
+        self.assertQueryCountConstant(author.get_absolute_url(), lambda: [
+            Book.objects.create(title='Book', summary='summary', isbn='ABCDEFG', author=author) for _ in range(8)])
+
+        self.assertPagesQueryCountConstant([self.genre.get_absolute_url(), self.language.get_absolute_url()])
+
+
+class AdminChangelistQueryCountTest(QueryCountMixin, TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_superuser(username='admin', password='1X<ISRUkw+tuK')
+        self.client.login(username='admin', password='1X<ISRUkw+tuK')
+        self.genres = [Genre.objects.create(name='Genre %s' % n) for n in range(4)]
+        self.add_rows(2)
+
+    def add_rows(self, count=8):
+        for row_num in range(count):
+            author = Author.objects.create(first_name='John', last_name='Smith')
+            book = Book.objects.create(title='Book', summary='summary', isbn='ABCDEFG', author=author)
+            book.genre.set(self.genres)
+            BookInstance.objects.create(book=book, imprint='Imprint', status='o', borrower=self.user)
+
+    def test_book_changelist(self):
+        self.assertQueryCountConstant(reverse('admin:catalog_book_changelist'), self.add_rows)
+        resp = self.client.get(reverse('admin:catalog_book_changelist'))
+        self.assertContains(resp, 'Genre 0, Genre 1, Genre 2<')
+
+    def test_book_changelist_genre_names_with_commas(self):
+        book = Book.objects.create(title='Commas', summary='summary', isbn='ABCDEFG')
+        book.genre.add(Genre.objects.create(name='Science Fiction, Hard'))
+        Book.objects.create(title='No genre', summary='summary', isbn='ABCDEFG')
+        resp = self.client.get(reverse('admin:catalog_book_changelist'))
+        self.assertContains(resp, '>Science Fiction, Hard<')
+        self.assertContains(resp, 'class="field-display_genre">-<')
+
+    def test_bookinstance_changelist(self):
+        self.assertQueryCountConstant(reverse('admin:catalog_bookinstance_changelist'), self.add_rows)
+
+    def test_book_form_uses_autocomplete(self):
+        resp = self.client.get(reverse('admin:catalog_book_add'))
+        self.assertContains(resp, 'data-ajax--url="/admin/autocomplete/"')
+        self.assertNotContains(resp, '>Smith, John</option>')
+
+
+class EstimatedCountPaginatorTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        book = Book.objects.create(title='Book', summary='summary', isbn='ABCDEFG')
+        for copy_num in range(5):
+            BookInstance.objects.create(book=book, imprint='Imprint', status='a' if copy_num % 2 else 'o')
+
+    def test_unfiltered_count_is_estimated(self):
+        paginator = EstimatedCountPaginator(BookInstance.objects.all(), 2)
+        paginator.exact_count_threshold = 0
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(paginator.count, 5)
+        self.assertNotIn('COUNT(', captured.captured_queries[0]['sql'])
+
+    def test_filtered_count_is_exact(self):
+        paginator = EstimatedCountPaginator(BookInstance.objects.filter(status='a'), 2)
+        paginator.exact_count_threshold = 0
+        self.assertEqual(paginator.count, 2)
+
+
+class CirculationBatchViewTest(TestCase):
+
+    def setUp(self):
+        self.patron = User.objects.create_user(username='testuser1', password='1X<ISRUkw+tuK')
+        self.librarian = User.objects.create_user(username='testuser2', password='2HJ1vRV0Z&3iD')
+        self.librarian.user_permissions.add(Permission.objects.get(name='Set book as returned'))
+
+        self.book = Book.objects.create(title='Book Title', summary='My book summary', isbn='ABCDEFG')
+        self.available = [BookInstance.objects.create(book=self.book, imprint='Imprint', status='a') for _ in range(3)]
+        self.on_loan = BookInstance.objects.create(book=self.book, imprint='Imprint', status='o', borrower=self.patron,
+                                                   due_back=datetime.date.today())
+
+    def post(self, payload):
+        return self.client.post(reverse('circulation-batch'), json.dumps(payload), content_type='application/json')
+
+    def test_requires_permission(self):
+        self.client.login(username='testuser1', password='1X<ISRUkw+tuK')
+        self.assertEqual(self.post({'action': 'renew', 'ids': [str(self.on_loan.pk)]}).status_code, 403)
+
+    def test_checkout_many(self):
+        self.client.login(username='testuser2', password='2HJ1vRV0Z&3iD')
+        due_back = datetime.date.today() + datetime.timedelta(weeks=2)
+        ids = [str(copy.pk) for copy in self.available] + [str(self.on_loan.pk), str(uuid.uuid4()), 'garbage']
+
+        with CaptureQueriesContext(connection) as captured:
+            resp = self.post({'action': 'checkout', 'ids': ids, 'borrower': self.patron.pk, 'due_back': due_back.isoformat()})
+        self.assertEqual(resp.status_code, 200)
+
+        results = resp.json()['results']
+        self.assertEqual([r['ok'] for r in results], [True, True, True, False, False, False])
+        self.assertEqual(results[3]['error'], 'Copy is on loan')
+        self.assertEqual(BookInstance.objects.filter(status='o', borrower=self.patron, due_back=due_back).count(), 3)
+
+        self.book.refresh_from_db()
+        self.assertEqual((self.book.copies_available, self.book.copies_on_loan), (0, 4))
+        self.assertEqual(len([q for q in captured.captured_queries if 'UPDATE "catalog_bookinstance"' in q['sql']]), 1)
+
+    def test_return_and_renew(self):
+        self.client.login(username='testuser2', password='2HJ1vRV0Z&3iD')
+        resp = self.post({'action': 'renew', 'ids': [str(self.on_loan.pk)]})
+        self.assertEqual(resp.json()['results'][0]['due_back'],
+                         (datetime.date.today() + datetime.timedelta(weeks=3)).isoformat())
+
+        resp = self.post({'action': 'return', 'ids': [str(self.on_loan.pk), str(self.on_loan.pk)]})
+        self.assertEqual([r['ok'] for r in resp.json()['results']], [True, False])
+        self.on_loan.refresh_from_db()
+        self.assertEqual((self.on_loan.status, self.on_loan.borrower), ('a', None))
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.copies_available, 4)
+
+    def test_renewal_date_rules(self):
+        self.client.login(username='testuser2', password='2HJ1vRV0Z&3iD')
+        too_late = datetime.date.today() + datetime.timedelta(weeks=5)
+        resp = self.post({'action': 'renew', 'ids': [str(self.on_loan.pk)], 'due_back': too_late.isoformat()})
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.json()['errors']['due_back'], ['Invalid date - renewal more than 4 weeks ahead'])
+
+    def test_checkout_requires_borrower(self):
+        self.client.login(username='testuser2', password='2HJ1vRV0Z&3iD')
+        resp = self.post({'action': 'checkout', 'ids': [str(self.available[0].pk)]})
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('borrower', resp.json()['errors'])
+
+
+@override_settings(ROOT_URLCONF='locallibrary.asgi_urls')
+class AsyncViewsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.author = Author.objects.create(first_name='John', last_name='Smith')
+            cls.genre = Genre.objects.create(name='Fantasy')
+            cls.language = Language.objects.create(name='English')
+            for book_num in range(12):
+                book = Book.objects.create(title='Book %s' % book_num, summary='summary', isbn='ABCDEFG',
+                                           author=cls.author, language=cls.language)
+                book.genre.add(cls.genre)
+                BookInstance.objects.create(book=book, imprint='Imprint', status='a')
+        cls.book = book
+
+    def setUp(self):
+        cache.clear()
+
+    def test_views_are_async(self):
+        match = resolve(reverse('books'))
+        self.assertTrue(asyncio.iscoroutinefunction(match.func))
+        self.assertFalse(asyncio.iscoroutinefunction(resolve(reverse('book-create')).func))
+
+    async def test_index(self):
+        resp = await self.async_client.get(reverse('index'))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context['num_books'], 12)
+        resp = await self.async_client.get(reverse('index'))
+        self.assertEqual(resp.context['num_visits'], 1)
+
+    async def test_list_pages(self):
+        for name, list_name, total in [('books', 'book_list', 12), ('authors', 'author_list', 1),
+                                       ('genres', 'genre_list', 1), ('languages', 'language_list', 1),
+                                       ('bookinstances', 'bookinstance_list', 12)]:
+            resp = await self.async_client.get(reverse(name))
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(resp.context['paginator'].count, total)
+            self.assertEqual(len(resp.context[list_name]), min(total, 10))
+
+        resp = await self.async_client.get(reverse('books') + '?page=2')
+        self.assertEqual(len(resp.context['book_list']), 2)
+        resp = await self.async_client.get(reverse('books') + '?page=9')
+        self.assertEqual(resp.status_code, 404)
+
+    async def test_detail_pages(self):
+        for obj in [self.book, self.author, self.genre, self.language]:
+            resp = await self.async_client.get(obj.get_absolute_url())
+            self.assertEqual(resp.status_code, 200)
+        resp = await self.async_client.get(self.book.get_absolute_url())
+        self.assertEqual(resp.context['copies_summary']['available'], 1)
+        self.assertContains(resp, 'Fantasy')
+
+        resp = await self.async_client.get(reverse('book-detail', kwargs={'pk': 999}))
+        self.assertEqual(resp.status_code, 404)
+
+    async def test_not_modified(self):
+        for url in [reverse('books'), reverse('bookinstances'), self.book.get_absolute_url(),
+                    self.author.get_absolute_url(), self.genre.get_absolute_url()]:
+            resp = await self.async_client.get(url)
+            self.assertEqual(resp.status_code, 200)
+            resp = await self.async_client.get(url, headers={'if-none-match': resp['ETag']})
+            self.assertEqual(resp.status_code, 304)
+
+    def walk(self, name, params):
+        pages = []
+        while params is not None:
+            resp = self.client.get(reverse(name), params)
+            self.assertEqual(resp.status_code, 200)
+            pages.append([str(obj) for obj in resp.context['object_list']])
+            if resp.context['cursor_pagination']:
+                next_cursor = resp.context['page_obj'].next_cursor
+                params = {'cursor': next_cursor} if next_cursor else None
+            else:
+                params = {'page': 2} if len(pages) == 1 else None
+        return pages
+
+    def test_pages_match_sync_views(self):
+        Genre.objects.bulk_create([Genre(name='Genre %s' % n) for n in range(11, 0, -1)])
+        for name in ['books', 'genres', 'bookinstances']:
+            for params in [{'cursor': ''}, {}]:
+                with self.subTest(name=name, params=params):
+                    pages = self.walk(name, params)
+                    self.assertEqual(len(pages), 2)
+                    with self.settings(ROOT_URLCONF='locallibrary.urls'):
+                        self.assertEqual(self.walk(name, params), pages)
+
+
+class LoadTestCommandTest(LiveServerTestCase):
+    # Outside a test transaction catalog reads go to any configured replicas.
+    databases = '__all__'
+
+    def test_reports_each_target(self):
+        out = io.StringIO()
+        call_command('loadtest', target=['wsgi=' + self.live_server_url], paths=['/catalog/books/'],
+                     requests=4, concurrency=2, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[1].startswith('wsgi'))
+        self.assertTrue(lines[1].endswith(' 0'))
+
+
+class ConditionalGetTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # The list pages validate against version rows written on commit.
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.author = Author.objects.create(first_name='John', last_name='Smith')
+            cls.genre = Genre.objects.create(name='Fantasy')
+            cls.language = Language.objects.create(name='English')
+            cls.book = Book.objects.create(title='Book', summary='summary', isbn='ABCDEFG',
+                                           author=cls.author, language=cls.language)
+            cls.book.genre.add(cls.genre)
+            cls.copy = BookInstance.objects.create(book=cls.book, imprint='Imprint', status='a')
+
+    def setUp(self):
+        cache.clear()
+
+    def assertNotModified(self, url, response):
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(url, headers={'if-none-match': response['ETag']})
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(len(queries), 1)
+
+    def assertModified(self, url, response):
+        resp = self.client.get(url, headers={'if-none-match': response['ETag']})
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp['ETag'], response['ETag'])
+        return resp
+
+    def test_detail_pages(self):
+        for obj in [self.book, self.author, self.genre, self.language]:
+            resp = self.client.get(obj.get_absolute_url())
+            self.assertEqual(resp.status_code, 200)
+            self.assertTrue(resp.has_header('Last-Modified'))
+            self.assertNotModified(obj.get_absolute_url(), resp)
+
+    def test_book_detail_follows_related_changes(self):
+        url = self.book.get_absolute_url()
+        resp = self.client.get(url)
+
+        self.author.first_name = 'Jane'
+        self.author.save()
+        resp = self.assertModified(url, resp)
+
+        self.book.genre.remove(self.genre)
+        resp = self.assertModified(url, resp)
+
+        self.copy.due_back = datetime.date.today()
+        self.copy.save()
+        resp = self.assertModified(url, resp)
+
+        self.copy.delete()
+        self.assertModified(url, resp)
+
+    def test_author_detail_follows_books(self):
+        url = self.author.get_absolute_url()
+        resp = self.client.get(url)
+
+        circulate('checkout', [str(self.copy.pk)], datetime.date.today(), None)
+        resp = self.assertModified(url, resp)
+
+        Book.objects.create(title='Second', summary='summary', isbn='ABCDEFH', author=self.author)
+        self.assertModified(url, resp)
+
+    def test_list_pages(self):
+        url = reverse('books')
+        resp = self.client.get(url)
+        self.assertNotModified(url, resp)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Author.objects.filter(pk=self.author.pk).get().save()
+        resp = self.assertModified(url, resp)
+
+        resp = self.client.get(url, headers={'if-modified-since': resp['Last-Modified']})
+        self.assertEqual(resp.status_code, 304)
+
+    def test_bookinstance_list_follows_borrowers_and_date(self):
+        url = reverse('bookinstances')
+        resp = self.client.get(url)
+        self.assertNotModified(url, resp)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create_user(username='borrower', password='secret')
+        resp = self.assertModified(url, resp)
+
+        tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+        with mock.patch('catalog.conditional.datetime.date', wraps=datetime.date) as date:
+            date.today.return_value = tomorrow
+            resp = self.client.get(url, headers={'if-modified-since': resp['Last-Modified']})
+        self.assertEqual(resp.status_code, 200)
+
+    def test_hold_reserving_copy_invalidates(self):
+        url = reverse('bookinstances')
+        resp = self.client.get(url)
+        self.assertEqual(self.client.get(reverse('index')).context['num_instances_available'], 1)
+
+        User.objects.create_user(username='patron', password='secret')
+        self.client.login(username='patron', password='secret')
+        resp = self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('book-hold', kwargs={'pk': self.book.pk}))
+
+        self.assertEqual(self.client.get(reverse('index')).context['num_instances_available'], 0)
+        resp = self.assertModified(url, resp)
+        self.assertContains(resp, 'Reserved')
+
+    def test_version_rows_bumped_after_commit(self):
+        version = TableVersion.objects.get(table='bookinstance').version
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.copy.save()
+            self.assertEqual(TableVersion.objects.get(table='bookinstance').version, version)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(TableVersion.objects.get(table='bookinstance').version, version + 1)
+
+    def test_user_changes_etag(self):
+        url = reverse('books')
+        resp = self.client.get(url)
+        User.objects.create_user(username='reader', password='secret')
+        self.client.login(username='reader', password='secret')
+        self.assertModified(url, resp)
+
+    def test_missing_object(self):
+        resp = self.client.get(reverse('book-detail', kwargs={'pk': 999}))
+        self.assertEqual(resp.status_code, 404)
+
+
+class GenreLanguageDetailViewTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(first_name='John', last_name='Smith')
+        cls.genre = Genre.objects.create(name='Fantasy')
+        cls.language = Language.objects.create(name='English')
+        cls.empty_genre = Genre.objects.create(name='Poetry')
+        for book_num in range(60):
+            book = Book.objects.create(title='Book %02d' % book_num, summary='summary', isbn='ABCDEFG',
+                                       author=cls.author, language=cls.language)
+            book.genre.add(cls.genre)
+
+        cls.user = User.objects.create_user(username='librarian', password='1X<ISRUkw+tuK')
+        cls.user.user_permissions.add(*Permission.objects.filter(codename__in=['delete_genre', 'delete_language']))
+
+    def test_books_are_paginated(self):
+        for obj in [self.genre, self.language]:
+            resp = self.client.get(obj.get_absolute_url())
+            self.assertEqual(len(resp.context['books']), 50)
+            self.assertEqual(resp.context['books'][0].title, 'Book 00')
+            self.assertContains(resp, '?books_page=2')
+
+            resp = self.client.get(obj.get_absolute_url() + '?books_page=2')
+            self.assertEqual(len(resp.context['books']), 10)
+        self.assertContains(resp, 'Book 59')
+
+    def test_genre_books_show_author(self):
+        resp = self.client.get(self.genre.get_absolute_url())
+        self.assertContains(resp, '(Smith, John)')
+
+    def test_delete_link_only_when_empty(self):
+        self.client.login(username='librarian', password='1X<ISRUkw+tuK')
+        resp = self.client.get(self.genre.get_absolute_url())
+        self.assertNotContains(resp, reverse('genre-delete', args=[self.genre.pk]))
+
+        resp = self.client.get(self.empty_genre.get_absolute_url())
+        self.assertFalse(resp.context['has_books'])
+        self.assertContains(resp, reverse('genre-delete', args=[self.empty_genre.pk]))
+
+
+class HoldViewTest(TestCase):
+
+    def setUp(self):
+        self.patron = User.objects.create_user(username='testuser1', password='1X<ISRUkw+tuK')
+        self.other = User.objects.create_user(username='testuser2', password='2HJ1vRV0Z&3iD')
+        self.book = Book.objects.create(title='Book Title', summary='My book summary', isbn='ABCDEFG')
+        BookInstance.objects.create(book=self.book, imprint='Imprint', status='o', borrower=self.other,
+                                    due_back=datetime.date.today())
+
+    def test_place_hold_requires_login_and_post(self):
+        resp = self.client.post(reverse('book-hold', kwargs={'pk': self.book.pk}))
+        self.assertRedirects(resp, '/accounts/login/?next=' + reverse('book-hold', kwargs={'pk': self.book.pk}))
+        self.client.login(username='testuser1', password='1X<ISRUkw+tuK')
+        self.assertEqual(self.client.get(reverse('book-hold', kwargs={'pk': self.book.pk})).status_code, 405)
+
+    def test_place_and_cancel_hold(self):
+        self.client.login(username='testuser1', password='1X<ISRUkw+tuK')
+        resp = self.client.post(reverse('book-hold', kwargs={'pk': self.book.pk}))
+        self.assertRedirects(resp, reverse('my-borrowed'))
+        hold = Hold.objects.get(patron=self.patron)
+        self.assertEqual(hold.status, 'w')
+
+        resp = self.client.get(reverse('my-borrowed'))
+        self.assertEqual(list(resp.context['holds']), [hold])
+        self.assertContains(resp, 'Book Title')
+
+        self.client.post(reverse('hold-cancel', kwargs={'pk': hold.pk}))
+        hold.refresh_from_db()
+        self.assertEqual(hold.status, 'c')
+
+    def test_cannot_cancel_other_patrons_hold(self):
+        hold = Hold.objects.create(book=self.book, patron=self.other)
+        self.client.login(username='testuser1', password='1X<ISRUkw+tuK')
+        self.assertEqual(self.client.post(reverse('hold-cancel', kwargs={'pk': hold.pk})).status_code, 404)
+
+
+class AutocompleteViewTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(first_name='Ursula', last_name='Le Guin')
+        Author.objects.create(first_name='Ursula', last_name='Vernon')
+        Author.objects.create(first_name='Terry', last_name='Pratchett')
+        cls.librarian = User.objects.create_user(username='testuser2', password='2HJ1vRV0Z&3iD',
+                                                 first_name='Lucy', last_name='Librarian')
+        cls.librarian.user_permissions.add(Permission.objects.get(name='Set book as returned'))
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, source, q, **params):
+        return self.client.get(reverse('autocomplete', kwargs={'source': source}), {'q': q, **params})
+
+    def texts(self, response):
+        return [result['text'] for result in response.json()['results']]
+
+    def test_prefix_on_any_name(self):
+        self.assertEqual(self.texts(self.search('authors', 'ursula')), ['Le Guin, Ursula', 'Vernon, Ursula'])
+        self.assertEqual(self.texts(self.search('authors', 'le gu')), ['Le Guin, Ursula'])
+        self.assertEqual(self.texts(self.search('authors', 'ursula', limit=1)), ['Le Guin, Ursula'])
+        self.assertEqual(self.search('authors', 'pratchett').json()['results'][0]['id'],
+                         Author.objects.get(last_name='Pratchett').pk)
+        self.assertEqual(self.texts(self.search('authors', '')), [])
+
+    def test_served_from_memory(self):
+        self.search('authors', 'u')
+        with self.assertNumQueries(0):
+            self.search('authors', 'ursula')
+
+    def test_follows_saves_and_deletes(self):
+        self.search('authors', 'u')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.first_name = 'Ursula K.'
+            self.author.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            Author.objects.filter(last_name='Vernon').delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.texts(self.search('authors', 'ursula')), ['Le Guin, Ursula K.'])
+
+    def test_changes_compacted_into_table(self):
+        self.search('authors', 'u')
+        index = AUTOCOMPLETE_INDEXES['authors']
+        with mock.patch.object(index, 'COMPACT_AFTER', 1):
+            for first_name in ['Ursula K.', 'Ursula']:
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.author.first_name = first_name
+                    self.author.save()
+            with self.captureOnCommitCallbacks(execute=True):
+                Author.objects.create(first_name='Ursula', last_name='Andress')
+        self.assertEqual((index._added, index._hidden), ([], set()))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.texts(self.search('authors', 'ursula')),
+                             ['Andress, Ursula', 'Le Guin, Ursula', 'Vernon, Ursula'])
+
+    def test_reloads_after_other_process_change(self):
+        self.search('authors', 'u')
+        Author.objects.create(first_name='Ursula', last_name='Andress')
+        self.assertNotIn('Andress, Ursula', self.texts(self.search('authors', 'ursula')))
+        # What another worker's commit does to the shared version counter.
+        bump_cache_versions('author')
+        self.assertIn('Andress, Ursula', self.texts(self.search('authors', 'ursula')))
+
+    def test_reloads_after_interval(self):
+        self.search('authors', 'u')
+        # queryset.update() sends no signals and bumps no version.
+        Author.objects.filter(last_name='Vernon').update(last_name='Vernon-Smith')
+        self.assertIn('Vernon, Ursula', self.texts(self.search('authors', 'ursula')))
+        with mock.patch('catalog.autocomplete.time.monotonic',
+                        return_value=time.monotonic() + AUTOCOMPLETE_RELOAD_SECONDS):
+            self.assertIn('Vernon-Smith, Ursula', self.texts(self.search('authors', 'ursula')))
+
+    def test_borrowers_require_permission(self):
+        self.assertEqual(self.search('borrowers', 'lucy').status_code, 403)
+        self.client.login(username='testuser2', password='2HJ1vRV0Z&3iD')
+        self.assertEqual(self.texts(self.search('borrowers', 'lucy')), ['testuser2 (Lucy Librarian)'])
+
+    def test_unknown_source(self):
+        self.assertEqual(self.search('copies', 'a').status_code, 404)
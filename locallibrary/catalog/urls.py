@@ -1,9 +1,10 @@
 from django.urls import path
-from . import views
+from . import views, api
 
 urlpatterns = [
     path('', views.index, name='index'),
     path('books/', views.BookListView.as_view(), name='books'),
+    path('search/', views.BookSearchView.as_view(), name='book-search'),
     path('book/<int:pk>', views.BookDetailView.as_view(), name='book-detail'),
     path('authors/', views.AuthorListView.as_view(), name='authors'),
     path('author/<int:pk>',views.AuthorDetailView.as_view(), name='author-detail'),
@@ -11,11 +12,24 @@ urlpatterns = [
 
 urlpatterns += [
     path('mybooks/', views.LoanedBooksByUserListView.as_view(), name='my-borrowed'),
+    path('book/<int:pk>/hold/', views.book_hold, name='book-hold'),
+    path('hold/<int:pk>/cancel/', views.hold_cancel, name='hold-cancel'),
     path('allborrowedbooks/', views.AllBorrowedBooksListView.as_view(), name='all-borrowed-books'),
 ]
 
 urlpatterns += [
     path('book/<uuid:pk>/renew/', views.renew_book_librarian, name='renew-book-librarian'),
+    path('circulation/', views.circulation_batch, name='circulation-batch'),
+]
+
+urlpatterns += [
+    path('autocomplete/<str:source>/', views.autocomplete, name='autocomplete'),
+    path('api/<str:resource>/', api.api_collection, name='api-collection'),
+    path('api/<str:resource>/<str:pk>/', api.api_item, name='api-item'),
+]
+
+urlpatterns += [
+    path('export/<str:dataset>.<str:fmt>', views.export_catalog, name='catalog-export'),
 ]
 
 urlpatterns += [
@@ -1,77 +1,172 @@
 from django.shortcuts import render
 from django.views import generic
-from .models import Book, Author, BookInstance, Genre, Language
+from .models import Book, Author, BookInstance, Genre, Language, Hold
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
 from django.contrib.auth.decorators import permission_required, login_required
 
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponseRedirect
+from django.core.paginator import Paginator
+from django.http import HttpResponseRedirect, StreamingHttpResponse, Http404, JsonResponse
+from django.views.decorators.http import require_POST
+from django.core.exceptions import PermissionDenied
 from django.urls import reverse, reverse_lazy
 import datetime
-
-from .forms import RenewBookModelForm
+import json
+
+from .forms import RenewBookModelForm, CirculationForm, BookForm, BookInstanceForm, BookInstanceUpdateForm
+from .circulation import circulate
+from .holds import place_hold, cancel_hold, ACTIVE_HOLD_STATUSES
+from .statistics import get_library_stats
+from .pagination import CursorPaginationMixin
+from .search import search_books
+from .conditional import conditional_get, book_state, books_state, table_state, dated
+from .visits import record_visit, visitor_visits, set_visitor_visits
+from .exports import EXPORTS, EXPORT_FORMATS, export_lines
+from .autocomplete import AUTOCOMPLETE_INDEXES, AUTOCOMPLETE_LIMIT, AUTOCOMPLETE_MAX_LIMIT
 
 def index(request):
-    num_books=Book.objects.all().count()
-    num_instances=BookInstance.objects.all().count()
-
-    num_instances_available=BookInstance.objects.filter(status__exact='a').count()
-    num_authors=Author.objects.count()
-
     search_for_book = 'book1'
     search_for_genre = 'fantasy'
 
-    num_books_contain_search = Book.objects.filter(title__icontains=search_for_book).count()
-    num_genres_contain_search = Genre.objects.filter(name__icontains=search_for_genre).count()
+    stats = get_library_stats(search_for_book, search_for_genre)
 
-    num_visits = request.session.get('num_visits', 0)
-    request.session['num_visits'] = num_visits + 1
+    # The per-visitor count lives in a signed cookie and the site-wide count
+    # in the cache, so a homepage hit does not write a session row.
+    num_visits = visitor_visits(request)
+    record_visit('index')
 
-    return render(
+    response = render(
         request,
         'index.html',
-        context={'num_books':num_books,'num_instances':num_instances,'num_instances_available':num_instances_available,
-                 'num_authors':num_authors,'search_for_book':search_for_book,'search_for_genre':search_for_genre,
-                 'num_books_contain_search':num_books_contain_search, 'num_genres_contain_search':num_genres_contain_search,
+        context={**stats, 'search_for_book':search_for_book,'search_for_genre':search_for_genre,
                  'num_visits':num_visits},
     )
+    set_visitor_visits(response, num_visits + 1)
+    return response
 
 
-class BookListView(generic.ListView):
+@conditional_get(table_state('book', 'author'))
+class BookListView(CursorPaginationMixin, generic.ListView):
     model = Book
     paginate_by = 10
+    queryset = Book.objects.select_related('author').only(
+        'title', 'author__first_name', 'author__last_name')
+
+class BookSearchView(generic.ListView):
+    template_name = 'catalog/book_search.html'
+    context_object_name = 'book_list'
+    paginate_by = 10
+
+    def get_search_query(self):
+        return self.request.GET.get('q', '').strip()
+
+    def get_queryset(self):
+        return search_books(self.get_search_query())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.get_search_query()
+        return context
 
+@conditional_get(book_state)
 class BookDetailView(generic.DetailView):
     model = Book
+    copies_paginate_by = 50
 
-
-class AuthorListView(generic.ListView):
+    def get_queryset(self):
+        queryset = Book.objects.select_related('author', 'language').prefetch_related('genre')
+        if not self.copies_paginate_by:
+            queryset = queryset.prefetch_related('bookinstance_set')
+        return queryset
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        summary = self.object.copies_summary()
+        context['copies_summary'] = summary
+
+        if not self.copies_paginate_by:
+            context['copies'] = self.object.bookinstance_set.all()
+            return context
+
+        copies = self.object.bookinstance_set.order_by('due_back', 'id')
+        paginator = Paginator(copies, self.copies_paginate_by)
+        paginator.count = summary['total']
+        copies_page = paginator.get_page(self.request.GET.get('copies_page'))
+        context['copies'] = copies_page
+        context['copies_page'] = copies_page
+        return context
+
+
+@conditional_get(table_state('author'))
+class AuthorListView(CursorPaginationMixin, generic.ListView):
     model = Author
     paginate_by = 10
 
+@conditional_get(books_state(Author, 'author'))
 class AuthorDetailView(generic.DetailView):
     model = Author
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['books'] = self.object.book_set.all()
+        return context
+
+
+class BookSetPageMixin:
+    """Shows one page of the object's books instead of the whole book_set."""
+    books_paginate_by = 50
+    book_fields = ('title',)
 
-class GenreDetailView(generic.DetailView):
+    def get_books(self):
+        return self.object.book_set.only(*self.book_fields).order_by('title', 'pk')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        paginator = Paginator(self.get_books(), self.books_paginate_by)
+        books_page = paginator.get_page(self.request.GET.get('books_page'))
+        context['books'] = books_page
+        context['books_page'] = books_page
+        # The paginator has already counted the books, so the delete check is free.
+        context['has_books'] = paginator.count > 0
+        return context
+
+
+@conditional_get(books_state(Genre, 'genre'))
+class GenreDetailView(BookSetPageMixin, generic.DetailView):
     model = Genre
 
-class GenreListView(generic.ListView):
+    book_fields = ('title', 'author__first_name', 'author__last_name')
+
+    def get_books(self):
+        return super().get_books().select_related('author')
+
+@conditional_get(table_state('genre'))
+class GenreListView(CursorPaginationMixin, generic.ListView):
     model = Genre
     paginate_by = 10
+    ordering = ['pk']
 
 
-class LanguageDetailView(generic.DetailView):
+@conditional_get(books_state(Language, 'language'))
+class LanguageDetailView(BookSetPageMixin, generic.DetailView):
     model = Language
+    # The reverse FK manager attaches the language to each book.
+    book_fields = ('title', 'language')
 
-class LanguageListView(generic.ListView):
+@conditional_get(table_state('language'))
+class LanguageListView(CursorPaginationMixin, generic.ListView):
     model = Language
     paginate_by = 10
+    ordering = ['pk']
 
 
-class BookInstanceListView(generic.ListView):
+# The list shows borrowers' usernames and marks overdue loans.
+@conditional_get(dated(table_state('bookinstance', 'book', 'user')))
+class BookInstanceListView(CursorPaginationMixin, generic.ListView):
     model = BookInstance
     paginate_by = 10
+    queryset = BookInstance.objects.select_related('book', 'borrower').only(
+        'status', 'due_back', 'book__title', 'borrower__username')
 
 class BookInstanceDetailView(generic.DetailView):
     model = BookInstance
@@ -83,7 +178,29 @@ class LoanedBooksByUserListView(LoginRequiredMixin, generic.ListView):
     paginate_by = 10
 
     def get_queryset(self):
-        return BookInstance.objects.filter(borrower=self.request.user).filter(status__exact='o').order_by('due_back')
+        return BookInstance.objects.filter(borrower=self.request.user).filter(status__exact='o').order_by('due_back').select_related('book').only(
+            'due_back', 'book__title')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['holds'] = Hold.objects.filter(
+            patron=self.request.user, status__in=ACTIVE_HOLD_STATUSES,
+        ).select_related('book').only('status', 'placed', 'book__title').order_by('placed')
+        return context
+
+@login_required
+@require_POST
+def book_hold(request, pk):
+    book = get_object_or_404(Book.objects.only('pk'), pk=pk)
+    place_hold(book, request.user)
+    return HttpResponseRedirect(reverse('my-borrowed'))
+
+@login_required
+@require_POST
+def hold_cancel(request, pk):
+    hold = get_object_or_404(Hold, pk=pk, patron=request.user)
+    cancel_hold(hold)
+    return HttpResponseRedirect(reverse('my-borrowed'))
 
 @login_required
 @permission_required('catalog.can_mark_returned', raise_exception=True)
@@ -106,6 +223,59 @@ def renew_book_librarian(request, pk):
 
     return render(request, 'catalog/book_renew_librarian.html', {'form': form, 'bookinst':book_inst})
 
+@login_required
+@permission_required('catalog.can_mark_returned', raise_exception=True)
+@require_POST
+def circulation_batch(request):
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({'errors': {'__all__': ['Invalid JSON']}}, status=400)
+        if isinstance(data, dict) and 'ids' in data:
+            data['ids'] = json.dumps(data['ids'])
+    else:
+        data = request.POST.copy()
+        data['ids'] = json.dumps(request.POST.getlist('ids'))
+
+    form = CirculationForm(data if isinstance(data, dict) else {})
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+
+    results = circulate(
+        form.cleaned_data['action'],
+        form.cleaned_data['ids'],
+        due_back=form.cleaned_data['due_back'],
+        borrower=form.cleaned_data['borrower'],
+    )
+    return JsonResponse({'action': form.cleaned_data['action'], 'results': results})
+
+def autocomplete(request, source):
+    index = AUTOCOMPLETE_INDEXES.get(source)
+    if index is None:
+        raise Http404('Unknown autocomplete source')
+    if index.permission and not request.user.has_perm(index.permission):
+        raise PermissionDenied
+    try:
+        limit = min(int(request.GET.get('limit', AUTOCOMPLETE_LIMIT)), AUTOCOMPLETE_MAX_LIMIT)
+    except ValueError:
+        limit = AUTOCOMPLETE_LIMIT
+    results = index.search(request.GET.get('q', ''), max(limit, 1))
+    return JsonResponse({'results': [{'id': pk, 'text': label} for pk, label in results]})
+
+@login_required
+def export_catalog(request, dataset, fmt):
+    if dataset not in EXPORTS or fmt not in EXPORT_FORMATS:
+        raise Http404('Unknown export')
+
+    model, rows = EXPORTS[dataset]
+    if not request.user.has_perm(f'catalog.view_{model._meta.model_name}'):
+        raise PermissionDenied
+
+    response = StreamingHttpResponse(export_lines(dataset, fmt), content_type=EXPORT_FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{dataset}.{fmt}"'
+    return response
+
 class AllBorrowedBooksListView(PermissionRequiredMixin, generic.ListView):
     model = BookInstance
     template_name = 'catalog/bookinstance_list_borrowed_all.html'
@@ -114,7 +284,8 @@ class AllBorrowedBooksListView(PermissionRequiredMixin, generic.ListView):
     permission_required = 'catalog.can_mark_returned'
 
     def get_queryset(self):
-        return BookInstance.objects.filter(status__exact='o').order_by('due_back')
+        return BookInstance.objects.filter(status__exact='o').order_by('due_back').select_related('book', 'borrower').only(
+            'due_back', 'book__title', 'borrower__username')
 
 
 class AuthorCreate(PermissionRequiredMixin, generic.CreateView):
@@ -139,13 +310,13 @@ class AuthorDelete(PermissionRequiredMixin, generic.DeleteView):
 
 class BookCreate(PermissionRequiredMixin, generic.CreateView):
     model = Book
-    fields = '__all__'
+    form_class = BookForm
 
     permission_required = 'catalog.add_book'
 
 class BookUpdate(PermissionRequiredMixin, generic.UpdateView):
     model = Book
-    fields = ['title','author','summary','isbn','genre','language']
+    form_class = BookForm
 
     permission_required = 'catalog.change_book'
 
@@ -191,12 +362,12 @@ class LanguageDelete(PermissionRequiredMixin, generic.DeleteView):
 
 class BookInstanceCreate(PermissionRequiredMixin, generic.CreateView):
     model = BookInstance
-    fields = ['book', 'imprint', 'due_back', 'borrower', 'status']
+    form_class = BookInstanceForm
     permission_required = 'catalog.add_bookinstance'
 
 class BookInstanceUpdate(PermissionRequiredMixin, generic.UpdateView):
     model = BookInstance
-    fields = ['imprint', 'due_back', 'borrower', 'status']
+    form_class = BookInstanceUpdateForm
     permission_required = 'catalog.change_bookinstance'
 
 class BookInstanceDelete(PermissionRequiredMixin, generic.DeleteView):
@@ -0,0 +1,92 @@
+import datetime
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import PageVisits
+
+VISIT_PAGES = ('index',)
+PENDING_KEY = 'catalog:visits:{}:{}'
+# Pending counters outlive a missed flush_visits run, then expire.
+PENDING_TIMEOUT = 60 * 60 * 24 * 2
+
+VISITOR_COOKIE = 'num_visits'
+VISITOR_COOKIE_SALT = 'catalog.visits'
+VISITOR_COOKIE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+def _pending_key(page, day):
+    return PENDING_KEY.format(page, day.isoformat())
+
+
+def record_visit(page):
+    """Count a hit in the cache; the flush_visits command writes it to the database."""
+    key = _pending_key(page, timezone.localdate())
+    if not cache.add(key, 1, PENDING_TIMEOUT):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, PENDING_TIMEOUT)
+
+
+def pending_visits():
+    today = timezone.localdate()
+    keys = {
+        _pending_key(page, day): (page, day)
+        for page in VISIT_PAGES
+        for day in (today - datetime.timedelta(days=1), today)
+    }
+    found = cache.get_many(keys)
+    return {keys[key]: count for key, count in found.items() if count}
+
+
+def flush_visits():
+    """Move pending cache counters into PageVisits with one bulk write per batch."""
+    pending = pending_visits()
+    if not pending:
+        return 0
+
+    with transaction.atomic():
+        existing = {
+            (row.page, row.date): row
+            for row in PageVisits.objects.select_for_update().filter(
+                page__in={page for page, _ in pending}, date__in={day for _, day in pending})
+        }
+        updated = []
+        created = []
+        for (page, day), count in pending.items():
+            if (page, day) in existing:
+                row = existing[(page, day)]
+                row.count = F('count') + count
+                updated.append(row)
+            else:
+                created.append(PageVisits(page=page, date=day, count=count))
+        if updated:
+            PageVisits.objects.bulk_update(updated, ['count'])
+        PageVisits.objects.bulk_create(created)
+        # Only written counts leave the cache; hits that landed meanwhile
+        # stay pending for the next flush, and a failed write loses nothing.
+        transaction.on_commit(lambda: _take_pending(pending))
+    return sum(pending.values())
+
+
+def _take_pending(pending):
+    for (page, day), count in pending.items():
+        try:
+            cache.decr(_pending_key(page, day), count)
+        except ValueError:
+            pass
+
+
+def visitor_visits(request):
+    try:
+        return int(request.get_signed_cookie(VISITOR_COOKIE, 0, salt=VISITOR_COOKIE_SALT))
+    except ValueError:
+        return 0
+
+
+def set_visitor_visits(response, num_visits):
+    response.set_signed_cookie(VISITOR_COOKIE, num_visits, salt=VISITOR_COOKIE_SALT,
+                               max_age=VISITOR_COOKIE_MAX_AGE, httponly=True, samesite='Lax')
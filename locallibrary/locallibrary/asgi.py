@@ -12,5 +12,10 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'locallibrary.settings')
+os.environ.setdefault('LOCALLIBRARY_ASYNC_VIEWS', '1')
+# Async views run queries from a thread pool, where persistent connections
+# are not closed at the end of a request and pile up; Django recommends
+# turning them off under ASGI.
+os.environ.setdefault('LOCALLIBRARY_DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
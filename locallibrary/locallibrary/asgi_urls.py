@@ -0,0 +1,14 @@
+"""
+URL configuration used by the ASGI deployment (see asgi.py).
+
+Identical to locallibrary.urls except that the read-only catalog pages are
+served by the async views in catalog.async_views.
+"""
+from django.urls import path
+from django.urls import include
+
+from .urls import urlpatterns as wsgi_urlpatterns
+
+urlpatterns = [
+    path('catalog/', include('catalog.async_urls')),
+] + wsgi_urlpatterns
@@ -0,0 +1,45 @@
+"""
+Cache settings read from the environment.
+
+The catalog invalidates cached statistics, page fragments and autocomplete
+indexes by bumping version counters in the cache, and counts page visits
+there, so every worker process has to share one cache with atomic incr()
+for a change to reach all of them.
+"""
+
+import os
+
+ENV_PREFIX = 'LOCALLIBRARY_CACHE_'
+
+CACHE_BACKENDS = {
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379'),
+    'memcached': ('django.core.cache.backends.memcached.PyMemcacheCache', '127.0.0.1:11211'),
+    # Private to each process: only for development and tests.
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'locallibrary'),
+}
+SHARED_BACKENDS = ('redis', 'memcached')
+
+
+def cache_settings(debug, environ=None):
+    """Build CACHES['default'].
+
+    BACKEND is one of CACHE_BACKENDS and defaults to 'locmem' under DEBUG.
+    Without DEBUG it must name a shared backend; there is no default, so a
+    deployment that forgot to configure one fails at startup. LOCATION
+    overrides the backend's default address.
+    """
+    environ = os.environ if environ is None else environ
+    backend = environ.get(ENV_PREFIX + 'BACKEND', 'locmem' if debug else None)
+    if backend is None:
+        raise ValueError(f'{ENV_PREFIX}BACKEND must be set to one of {", ".join(SHARED_BACKENDS)} without DEBUG.')
+    if backend not in CACHE_BACKENDS:
+        raise ValueError(f'Unsupported {ENV_PREFIX}BACKEND: {backend!r}')
+    if not debug and backend not in SHARED_BACKENDS:
+        raise ValueError(f'{ENV_PREFIX}BACKEND {backend!r} is not shared between workers; '
+                         f'use one of {", ".join(SHARED_BACKENDS)} without DEBUG.')
+
+    engine, location = CACHE_BACKENDS[backend]
+    return {
+        'BACKEND': engine,
+        'LOCATION': environ.get(ENV_PREFIX + 'LOCATION', location),
+    }
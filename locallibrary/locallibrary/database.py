@@ -0,0 +1,138 @@
+"""
+Database settings read from the environment.
+
+LOCALLIBRARY_DB_ENGINE selects 'sqlite3' (the default) or 'postgresql';
+the remaining LOCALLIBRARY_DB_* variables are listed in database_settings()
+and replica_settings().
+"""
+
+import copy
+import os
+
+ENV_PREFIX = 'LOCALLIBRARY_DB_'
+
+# Per connection pragmas.
+SQLITE_PRAGMAS = {
+    'synchronous': 'NORMAL',
+    'mmap_size': 128 * 1024 * 1024,
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+}
+
+
+def _env(environ, name, default=None):
+    return environ.get(ENV_PREFIX + name, default)
+
+
+def _flag(environ, name, default):
+    value = _env(environ, name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def sqlite_init_command(pragmas=None):
+    pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+    return ';'.join(f'PRAGMA {name}={value}' for name, value in pragmas.items())
+
+
+def sqlite_settings(base_dir, environ):
+    pragmas = dict(SQLITE_PRAGMAS)
+    for name in pragmas:
+        value = _env(environ, 'SQLITE_' + name.upper())
+        if value is not None:
+            pragmas[name] = value
+    # journal_mode=WAL lets readers run alongside a single writer. It is
+    # stored in the database file, so it is opt-in: set on every connection
+    # it would rewrite the tracked development database.
+    journal_mode = _env(environ, 'SQLITE_JOURNAL_MODE')
+    if journal_mode is not None:
+        pragmas = {'journal_mode': journal_mode, **pragmas}
+
+    options = {}
+    if _flag(environ, 'SQLITE_TUNING', True):
+        options['init_command'] = sqlite_init_command(pragmas)
+        # Take the write lock when the transaction starts rather than on its
+        # first write, so busy_timeout applies instead of failing with
+        # "database is locked" when a read transaction tries to upgrade.
+        options['transaction_mode'] = _env(environ, 'SQLITE_TRANSACTION_MODE', 'IMMEDIATE')
+
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': _env(environ, 'NAME', str(base_dir / 'db.sqlite3')),
+        'OPTIONS': options,
+    }
+
+
+def postgresql_settings(environ):
+    options = {}
+    if _flag(environ, 'POOL', False):
+        options['pool'] = {
+            'min_size': int(_env(environ, 'POOL_MIN_SIZE', 2)),
+            'max_size': int(_env(environ, 'POOL_MAX_SIZE', 10)),
+            'timeout': float(_env(environ, 'POOL_TIMEOUT', 10)),
+        }
+
+    return {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': _env(environ, 'NAME', 'locallibrary'),
+        'USER': _env(environ, 'USER', ''),
+        'PASSWORD': _env(environ, 'PASSWORD', ''),
+        'HOST': _env(environ, 'HOST', ''),
+        'PORT': _env(environ, 'PORT', ''),
+        'OPTIONS': options,
+    }
+
+
+def database_settings(base_dir, environ=None):
+    """Build DATABASES['default'].
+
+    Common variables: ENGINE, NAME, CONN_MAX_AGE (seconds, default 60; asgi.py
+    sets 0) and CONN_HEALTH_CHECKS (default on). PostgreSQL also reads USER,
+    PASSWORD, HOST, PORT and POOL / POOL_MIN_SIZE / POOL_MAX_SIZE /
+    POOL_TIMEOUT. SQLite reads SQLITE_TUNING (default on),
+    SQLITE_TRANSACTION_MODE, SQLITE_JOURNAL_MODE (set WAL in deployments) and
+    one SQLITE_<PRAGMA> override per entry of SQLITE_PRAGMAS.
+    """
+    environ = os.environ if environ is None else environ
+    engine = _env(environ, 'ENGINE', 'sqlite3')
+
+    if engine == 'sqlite3':
+        database = sqlite_settings(base_dir, environ)
+    elif engine == 'postgresql':
+        database = postgresql_settings(environ)
+    else:
+        raise ValueError(f'Unsupported {ENV_PREFIX}ENGINE: {engine!r}')
+
+    if database['OPTIONS'].get('pool'):
+        # The pool owns connection reuse; Django refuses persistent
+        # connections on top of it.
+        database['CONN_MAX_AGE'] = 0
+    else:
+        database['CONN_MAX_AGE'] = int(_env(environ, 'CONN_MAX_AGE', 60))
+    database['CONN_HEALTH_CHECKS'] = _flag(environ, 'CONN_HEALTH_CHECKS', True)
+    return database
+
+
+def replica_settings(primary, environ=None):
+    """Build one DATABASES entry per replica listed in REPLICAS.
+
+    REPLICAS is comma separated: database files for SQLite, host or
+    host:port for PostgreSQL. Replicas otherwise share the primary's
+    settings, and mirror it under test.
+    """
+    environ = os.environ if environ is None else environ
+    targets = [target.strip() for target in _env(environ, 'REPLICAS', '').split(',') if target.strip()]
+
+    replicas = {}
+    for number, target in enumerate(targets, 1):
+        database = copy.deepcopy(primary)
+        if database['ENGINE'] == 'django.db.backends.sqlite3':
+            database['NAME'] = target
+        else:
+            database['HOST'], _, port = target.partition(':')
+            if port:
+                database['PORT'] = port
+        database['TEST'] = {'MIRROR': 'default'}
+        replicas[f'replica{number}'] = database
+    return replicas
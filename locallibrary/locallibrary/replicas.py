@@ -0,0 +1,132 @@
+"""
+Read replicas for catalog traffic.
+
+ReplicaRouter sends reads of catalog models to the aliases listed in
+settings.DATABASE_REPLICAS, round-robin, skipping replicas that fail a
+health check. Everything else reads from and writes to the primary.
+
+Reads go to the primary instead when replication lag could show stale data:
+inside a transaction, for the rest of a request after it wrote, and for
+REPLICA_PIN_SECONDS after that through a cookie set by
+ReplicaPinningMiddleware. Code outside a request reads from the primary
+once it has written; wrap a unit of work in routing_state() to start afresh.
+"""
+
+import asyncio
+import contextvars
+import itertools
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+REPLICA_APPS = {'catalog'}
+# Bookkeeping written on the side of a request; writing them does not mean
+# the client will expect to read its own write.
+UNPINNED_MODELS = {'catalog.pagevisits', 'catalog.tableversion'}
+REPLICA_PIN_COOKIE = 'primary_pin'
+# Seconds between health checks of a healthy replica, and before a failed
+# one is tried again.
+REPLICA_CHECK_INTERVAL = 5
+REPLICA_RETRY_INTERVAL = 30
+
+_routing = contextvars.ContextVar('replica_routing', default=None)
+
+
+class RoutingState:
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+@contextmanager
+def routing_state(pinned=False):
+    state = RoutingState(pinned)
+    token = _routing.set(state)
+    try:
+        yield state
+    finally:
+        _routing.reset(token)
+
+
+class ReplicaRouter:
+
+    def __init__(self):
+        self._next = itertools.count()
+        self._health = {}
+
+    def _healthy(self, alias):
+        now = time.monotonic()
+        healthy, checked = self._health.get(alias, (True, None))
+        if checked is not None and now - checked < (REPLICA_CHECK_INTERVAL if healthy else REPLICA_RETRY_INTERVAL):
+            return healthy
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            # Async views build querysets on the event loop, which must not
+            # block on a query; the next sync read runs the check.
+            return healthy
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute('SELECT 1')
+            healthy = True
+        except DatabaseError:
+            connections[alias].close()
+            healthy = False
+        self._health[alias] = (healthy, now)
+        return healthy
+
+    def db_for_read(self, model, **hints):
+        replicas = getattr(settings, 'DATABASE_REPLICAS', ())
+        if not replicas or model._meta.app_label not in REPLICA_APPS:
+            return None
+        state = _routing.get()
+        if state is not None and (state.pinned or state.wrote):
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+
+        start = next(self._next)
+        for offset in range(len(replicas)):
+            alias = replicas[(start + offset) % len(replicas)]
+            if self._healthy(alias):
+                return alias
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label in REPLICA_APPS and model._meta.label_lower not in UNPINNED_MODELS:
+            state = _routing.get()
+            if state is None:
+                _routing.set(state := RoutingState())
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *getattr(settings, 'DATABASE_REPLICAS', ())}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in getattr(settings, 'DATABASE_REPLICAS', ()):
+            return False
+        return None
+
+
+class ReplicaPinningMiddleware:
+    """Keep a client on the primary while its writes replicate."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned = request.method not in ('GET', 'HEAD', 'OPTIONS') or REPLICA_PIN_COOKIE in request.COOKIES
+        with routing_state(pinned) as state:
+            response = self.get_response(request)
+        if state.wrote:
+            response.set_cookie(REPLICA_PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
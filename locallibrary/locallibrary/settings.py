@@ -13,6 +13,9 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 
+from .caches import cache_settings
+from .database import database_settings, replica_settings
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -43,6 +46,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'locallibrary.replicas.ReplicaPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -51,7 +55,11 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'locallibrary.urls'
+# The ASGI entry point serves read-only catalog pages with async views.
+if os.environ.get('LOCALLIBRARY_ASYNC_VIEWS') == '1':
+    ROOT_URLCONF = 'locallibrary.asgi_urls'
+else:
+    ROOT_URLCONF = 'locallibrary.urls'
 
 TEMPLATES = [
     {
@@ -63,6 +71,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'catalog.fragments.fragment_cache',
             ],
         },
     },
@@ -74,12 +83,39 @@ WSGI_APPLICATION = 'locallibrary.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Configured from LOCALLIBRARY_DB_* environment variables, see database.py.
+
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_settings(BASE_DIR),
 }
+DATABASES.update(replica_settings(DATABASES['default']))
+
+# Catalog reads are spread over the replicas; a client that wrote stays on
+# the primary for REPLICA_PIN_SECONDS. See locallibrary/replicas.py.
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['locallibrary.replicas.ReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.environ.get('LOCALLIBRARY_DB_REPLICA_PIN_SECONDS', 10))
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# Configured from LOCALLIBRARY_CACHE_* environment variables, see caches.py.
+# Run more than one worker only with a shared backend: cache invalidation
+# reaches the other workers through it.
+
+CACHES = {
+    'default': cache_settings(DEBUG),
+}
+
+
+# Sessions
+# https://docs.djangoproject.com/en/5.2/topics/http/sessions/#configuring-the-session-engine
+
+# 'cached_db' serves session reads from the cache, 'signed_cookies' keeps
+# sessions out of the database entirely.
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + os.environ.get(
+    'LOCALLIBRARY_SESSION_ENGINE', 'cached_db')
 
 
 # Password validation